@@ -0,0 +1,79 @@
+import pandas as pd
+import streamlit as st
+
+import disk_cache
+import metrics
+import upstream
+
+st.set_page_config(layout="wide")
+st.markdown(
+    "<h1 style='text-align: center;'>Admin</h1>",
+    unsafe_allow_html=True
+)
+
+if not metrics.ENABLED:
+    st.info("Instrumentation is off. Start the app with OPTIONLAB_METRICS=1 to collect timings and cache counters.")
+    st.stop()
+
+snap = metrics.snapshot()
+
+st.subheader("Latency by span")
+st.caption(
+    "Every instrumented page, page section, pricing/risk engine call, chain-processing step and upstream "
+    "request of this server process. Times in milliseconds; percentiles are read from log-spaced buckets "
+    "(about 10% resolution)."
+)
+spans = pd.DataFrame.from_dict(snap["spans"], orient="index")
+if spans.empty:
+    st.write("No spans recorded yet.")
+else:
+    ms = ["mean", "p50", "p95", "p99", "max"]
+    spans[ms] = spans[ms] * 1000
+    spans["sum"] = spans["sum"].round(3)
+    group = st.selectbox("Group", ["all"] + sorted({name.split(".")[0] for name in spans.index}))
+    if group != "all":
+        spans = spans[spans.index.str.startswith(group + ".")]
+    st.dataframe(
+        spans[["count", "in_flight", "mean", "p50", "p95", "p99", "max", "sum"]].sort_values("sum", ascending=False),
+        use_container_width=True,
+    )
+
+left, right = st.columns(2)
+with left:
+    st.subheader("Caches")
+    counters = pd.Series(snap["counters"], dtype=float)
+    caches = counters[counters.index.str.startswith("cache.")]
+    if caches.empty:
+        st.write("No cache lookups recorded yet.")
+    else:
+        parts = caches.index.str.rsplit(".", n=1)
+        table = pd.DataFrame({"cache": [p[0][6:] for p in parts], "outcome": [p[1] for p in parts], "n": caches.to_numpy()})
+        table = table.pivot_table(index="cache", columns="outcome", values="n", aggfunc="sum", fill_value=0)
+        table["hit rate"] = table.get("hit", 0) / table.sum(axis=1)
+        st.dataframe(table.style.format({"hit rate": "{:.1%}"}, precision=0), use_container_width=True)
+    st.caption(f"Disk cache size: {disk_cache.get_cache().size() / 1e6:.1f} MB of {disk_cache.MAX_BYTES / 1e6:.0f} MB")
+with right:
+    st.subheader("Upstream providers")
+    st.dataframe(pd.DataFrame([
+        {
+            "provider": name,
+            "circuit": p.breaker.state,
+            "upstream calls": p.upstream_calls,
+            "in flight": p.flight.in_flight(),
+            "errors": snap["counters"].get(f"upstream.{name}.errors", 0),
+        }
+        for name, p in upstream.PROVIDERS.items()
+    ]).set_index("provider"), use_container_width=True)
+    other = {k: v for k, v in snap["counters"].items() if not k.startswith("cache.")}
+    if other:
+        st.dataframe(pd.Series(other, name="count"), use_container_width=True)
+
+st.subheader("Export")
+d1, d2, d3 = st.columns(3)
+d1.download_button("Download JSON", metrics.to_json(), file_name="optionlab-metrics.json", mime="application/json")
+d2.download_button("Download Prometheus text", metrics.to_prometheus(), file_name="optionlab-metrics.prom", mime="text/plain")
+if d3.button("Reset counters"):
+    metrics.reset()
+    st.rerun()
+if metrics.DUMP_DIR:
+    st.caption(f"Also written to {metrics.DUMP_DIR} every {metrics.DUMP_INTERVAL:.0f} s.")
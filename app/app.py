@@ -1,5 +1,8 @@
 import streamlit as st
 
+import metrics
+import profiler
+
 st.logo("app/assets/logo.png")
 
 main_page = st.Page(
@@ -29,5 +32,13 @@ pricing = st.Page(
 )
 
 
-pg = st.navigation([main_page, news, option_markets, hedge, pricing, idea])
-pg.run()
\ No newline at end of file
+pages = [main_page, news, option_markets, hedge, pricing, idea]
+#instrumentation dashboard, only listed when OPTIONLAB_METRICS is on
+if metrics.ENABLED:
+    pages.append(st.Page(page = "admin.py", title = "Admin"))
+    metrics.start_dumper()
+
+pg = st.navigation(pages)
+#?profile=1 (or OPTIONLAB_PROFILE=1) samples the rerun and lists its hot functions below the page
+with metrics.span(f"page.{pg.title}"), profiler.profile(pg.title):
+    pg.run()
\ No newline at end of file
@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+
+import metrics
+
+COLUMNS = ["check", "expiry", "strikes", "edge", "trade"]
+
+
+#(expiry x strike) bid/ask arrays of both sides over the union of listed strikes;
+#missing quotes are NaN. chains maps expiry -> ChainSnapshot
+@metrics.timed("chain.arbitrage_surface")
+def surface(chains: dict, asof=None) -> dict:
+    asof = pd.Timestamp(asof or pd.Timestamp.today()).normalize()
+    expiries = sorted(chains, key=pd.Timestamp)
+    strikes = np.unique(np.concatenate([snap.strikes for snap in chains.values()])) if chains else np.zeros(0)
+    shape = (len(expiries), len(strikes))
+    out = {name: np.full(shape, np.nan) for name in ("call_bid", "call_ask", "put_bid", "put_ask")}
+    for e, expiry in enumerate(expiries):
+        snap = chains[expiry]
+        j = np.searchsorted(strikes, snap.strikes)
+        for side, tag in (("call", "C"), ("put", "P")):
+            bid = snap.cols[f"{tag}_bid"].astype(float)
+            ask = snap.cols[f"{tag}_ask"].astype(float)
+            quoted = (ask > 0) & (bid >= 0) & (ask >= bid)
+            out[f"{side}_bid"][e, j[quoted]] = bid[quoted]
+            out[f"{side}_ask"][e, j[quoted]] = ask[quoted]
+    out["strikes"] = strikes
+    out["expiries"] = expiries
+    out["T"] = np.array([max((pd.Timestamp(x) - asof).days, 1) / 365.0 for x in expiries])
+    return out
+
+
+#index of the next / previous quoted cell along the last axis (n / -1 when none)
+def _neighbours(quoted: np.ndarray):
+    n = quoted.shape[-1]
+    pos = np.arange(n)
+    nxt = np.minimum.accumulate(np.where(quoted, pos, n)[..., ::-1], axis=-1)[..., ::-1]
+    prv = np.maximum.accumulate(np.where(quoted, pos, -1), axis=-1)
+    nxt = np.concatenate([nxt[..., 1:], np.full(quoted.shape[:-1] + (1,), n)], axis=-1)
+    prv = np.concatenate([np.full(quoted.shape[:-1] + (1,), -1), prv[..., :-1]], axis=-1)
+    return nxt, prv
+
+
+def _rows(check, expiries, strikes, edge, trade) -> pd.DataFrame:
+    return pd.DataFrame({"check": check, "expiry": expiries, "strikes": strikes, "edge": edge, "trade": trade})
+
+
+def _fmt(x) -> str:
+    return f"{x:g}"
+
+
+#every violation that can be traded at the quoted bid/ask, in one vectorized pass
+#per check. edge is the riskless profit per share (before fees) beyond `tol`
+@metrics.timed("chain.arbitrage_screen")
+def screen(surf: dict, S: float, r: float = 0.0, tol: float = 0.01, q: float = 0.0) -> pd.DataFrame:
+    K = surf["strikes"]
+    exps = np.array(surf["expiries"], dtype=object)
+    found = []
+
+    for side in ("call", "put"):
+        bid, ask = surf[f"{side}_bid"], surf[f"{side}_ask"]
+        quoted = np.isfinite(bid) & np.isfinite(ask)
+        nxt, prv = _neighbours(quoted)
+        tag = side[0].upper()
+
+        #vertical spreads between adjacent quoted strikes
+        e, j = np.nonzero(quoted & (nxt < len(K)))
+        k = nxt[e, j]
+        lo, hi = (j, k) if side == "call" else (k, j) #the option that must be worth more
+        cheap = bid[e, hi] - ask[e, lo] #buy the dearer-by-rule leg for less than the other pays
+        bad = cheap > tol
+        found.append(_rows(
+            f"{side} spread monotonicity", exps[e[bad]],
+            [f"{_fmt(K[a])}/{_fmt(K[b])}" for a, b in zip(j[bad], k[bad])], cheap[bad],
+            [f"buy {tag} {_fmt(K[a])}, sell {tag} {_fmt(K[b])}" for a, b in zip(lo[bad], hi[bad])],
+        ))
+        width = K[k] - K[j]
+        rich = bid[e, lo] - ask[e, hi] - width #spread sold for more than its largest payout
+        bad = rich > tol
+        found.append(_rows(
+            f"{side} spread slope", exps[e[bad]],
+            [f"{_fmt(K[a])}/{_fmt(K[b])}" for a, b in zip(j[bad], k[bad])], rich[bad],
+            [f"sell {tag} {_fmt(K[a])}, buy {tag} {_fmt(K[b])}" for a, b in zip(lo[bad], hi[bad])],
+        ))
+
+        #butterflies on adjacent quoted triples, weights for uneven spacing
+        e, j = np.nonzero(quoted & (nxt < len(K)) & (prv >= 0))
+        i, k = prv[e, j], nxt[e, j]
+        w1 = (K[k] - K[j]) / (K[k] - K[i])
+        w3 = (K[j] - K[i]) / (K[k] - K[i])
+        cost = w1 * ask[e, i] + w3 * ask[e, k] - bid[e, j]
+        bad = -cost > tol
+        found.append(_rows(
+            f"{side} butterfly convexity", exps[e[bad]],
+            [f"{_fmt(K[a])}/{_fmt(K[b])}/{_fmt(K[c])}" for a, b, c in zip(i[bad], j[bad], k[bad])], -cost[bad],
+            [f"buy {w1_:.2f} {tag} {_fmt(K[a])} + {w3_:.2f} {tag} {_fmt(K[c])}, sell 1 {tag} {_fmt(K[b])}"
+             for a, b, c, w1_, w3_ in zip(i[bad], j[bad], k[bad], w1[bad], w3[bad])],
+        ))
+
+        #calendars: same strike, adjacent quoted expiries; longer-dated must be worth more
+        nxt_t, _ = _neighbours(quoted.T)
+        j, e = np.nonzero(quoted.T & (nxt_t < len(exps)))
+        f = nxt_t[j, e]
+        cheap = bid[e, j] - ask[f, j]
+        bad = cheap > tol
+        found.append(_rows(
+            f"{side} calendar", [f"{a}/{b}" for a, b in zip(exps[e[bad]], exps[f[bad]])],
+            [_fmt(x) for x in K[j[bad]]], cheap[bad],
+            [f"buy {tag} {_fmt(K[x])} {b}, sell {tag} {_fmt(K[x])} {a}" for x, a, b in zip(j[bad], exps[e[bad]], exps[f[bad]])],
+        ))
+
+    #put-call parity bounds for American options with dividend yield q:
+    #S e^{-qT} - K <= C - P <= S - K e^{-rT}; dividends only widen the lower bound
+    quoted = np.isfinite(surf["call_bid"]) & np.isfinite(surf["call_ask"]) & np.isfinite(surf["put_bid"]) & np.isfinite(surf["put_ask"])
+    e, j = np.nonzero(quoted)
+    upper = S - K[j] * np.exp(-r * surf["T"][e])
+    over = surf["call_bid"][e, j] - surf["put_ask"][e, j] - upper
+    bad = over > tol
+    found.append(_rows(
+        "put-call parity (upper)", exps[e[bad]], [_fmt(x) for x in K[j[bad]]], over[bad],
+        [f"sell C {_fmt(K[x])}, buy P {_fmt(K[x])}, buy stock" for x in j[bad]],
+    ))
+    lower = S * np.exp(-q * surf["T"][e]) - K[j]
+    under = lower - (surf["call_ask"][e, j] - surf["put_bid"][e, j])
+    bad = under > tol
+    found.append(_rows(
+        "put-call parity (lower)", exps[e[bad]], [_fmt(x) for x in K[j[bad]]], under[bad],
+        [f"buy C {_fmt(K[x])}, sell P {_fmt(K[x])}, short stock" for x in j[bad]],
+    ))
+
+    found = [frame for frame in found if not frame.empty]
+    if not found:
+        return pd.DataFrame(columns=COLUMNS)
+    return pd.concat(found, ignore_index=True).sort_values("edge", ascending=False, ignore_index=True)
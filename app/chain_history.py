@@ -0,0 +1,330 @@
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+
+import market_data
+import metrics
+
+DATA_DIR = os.environ.get("OPTIONLAB_DATA_DIR", ".optionlab")
+HISTORY_DIR = os.path.join(DATA_DIR, "chains")
+WATCHLIST = [s for s in os.environ.get("OPTIONLAB_WATCHLIST", "AAPL,TSLA,NVDA,AMD,META,QQQ").split(",") if s]
+RECORD_INTERVAL = float(os.environ.get("OPTIONLAB_RECORD_INTERVAL", "900")) #seconds; 0 disables the recorder
+MAX_DTE = 120 #expiries recorded per snapshot
+ATM_DTE = 30 #constant maturity of the ATM IV series
+MARKET_TZ = "America/New_York"
+MARKET_OPEN, MARKET_CLOSE = pd.Timedelta(hours=9, minutes=30), pd.Timedelta(hours=16)
+
+log = logging.getLogger(__name__)
+
+#one file per snapshot under date=YYYY-MM-DD/ticker=XYZ/, one row per strike and expiry
+COLUMNS = ["C_bid", "C_ask", "C_IV", "C_vol", "C_OI", "P_bid", "P_ask", "P_IV", "P_vol", "P_OI"]
+SCHEMA = pa.schema(
+    [("expiry", pa.string()), ("dte", pa.int16()), ("strike", pa.float64()), ("spot", pa.float64())]
+    + [(name, pa.float32()) for name in COLUMNS]
+)
+PARTITIONING = ds.partitioning(pa.schema([("date", pa.string()), ("ticker", pa.string())]), flavor="hive")
+
+
+def _spot(symbol: str) -> float:
+    hist = market_data.history(symbol, period="5d")
+    return float(hist["Close"].iloc[-1]) if hist is not None and not hist.empty else np.nan
+
+
+#one snapshot of every expiry within MAX_DTE, as a table in SCHEMA
+def snapshot_table(symbol: str, now=None) -> pa.Table:
+    now = pd.Timestamp(now or pd.Timestamp.now())
+    spot = _spot(symbol)
+    parts = []
+    for exp in market_data.expirations(symbol) or ():
+        dte = (pd.Timestamp(exp) - now.normalize()).days
+        if dte < 0:
+            continue
+        if dte > MAX_DTE:
+            break
+        snap = market_data.chain_snapshot(symbol, exp)
+        n = len(snap)
+        parts.append(pa.table(
+            {"expiry": pa.array([exp] * n, pa.string()), "dte": pa.array(np.full(n, dte, dtype=np.int16)),
+             "strike": snap.strikes, "spot": np.full(n, spot)}
+            | {name: snap.cols[name] for name in COLUMNS},
+            schema=SCHEMA,
+        ))
+    return pa.concat_tables(parts) if parts else SCHEMA.empty_table()
+
+
+#cache versions of the chains snapshot_table would record; unchanged versions mean a
+#new snapshot would repeat the last one
+def chain_versions(symbol: str, now=None) -> tuple:
+    today = pd.Timestamp(now or pd.Timestamp.now()).normalize()
+    return tuple(
+        market_data.chain_version(symbol, exp)
+        for exp in market_data.expirations(symbol) or ()
+        if 0 <= (pd.Timestamp(exp) - today).days <= MAX_DTE
+    )
+
+
+#naive times are local, like the snapshot times of this module
+def _market_time(now=None) -> pd.Timestamp:
+    now = pd.Timestamp(now or pd.Timestamp.now())
+    if now.tzinfo is None:
+        now = pd.Timestamp(now.to_pydatetime().astimezone())
+    return now.tz_convert(MARKET_TZ)
+
+
+#regular session on weekdays; exchange holidays are not known here and only cost
+#one redundant snapshot, since their chains do not change
+def market_open(now=None) -> bool:
+    now = _market_time(now)
+    return now.weekday() < 5 and MARKET_OPEN <= now - now.normalize() < MARKET_CLOSE
+
+
+#the latest session close at or before `now`
+def last_close(now=None) -> pd.Timestamp:
+    now = _market_time(now)
+    close = now.normalize() + MARKET_CLOSE
+    while close > now or close.weekday() >= 5:
+        close -= pd.Timedelta(days=1)
+    return close
+
+
+def write_snapshot(symbol: str, table: pa.Table, now=None, root: str = HISTORY_DIR) -> str | None:
+    if table.num_rows == 0:
+        return None
+    now = pd.Timestamp(now or pd.Timestamp.now())
+    folder = os.path.join(root, f"date={now:%Y-%m-%d}", f"ticker={symbol}")
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{now:%H%M%S}.parquet")
+    tmp = path + ".tmp"
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, path)
+    return path
+
+
+@metrics.timed("chain.history_record")
+def record(symbols=None, now=None, root: str = HISTORY_DIR) -> int:
+    written = 0
+    for symbol in symbols or WATCHLIST:
+        try:
+            written += write_snapshot(symbol, snapshot_table(symbol, now), now, root) is not None
+        except Exception:
+            #one bad symbol must not stop the rest of the watchlist
+            continue
+    return written
+
+
+#retention: once a day is over only its last snapshot per ticker is kept, which is
+#the one atm_iv reads; returns the number of files removed
+def compact(before: str | None = None, root: str = HISTORY_DIR) -> int:
+    before = before or pd.Timestamp.now().strftime("%Y-%m-%d")
+    if not os.path.isdir(root):
+        return 0
+    removed = 0
+    for day in os.scandir(root):
+        if not day.name.startswith("date=") or day.name[5:] >= before:
+            continue
+        for folder in os.scandir(day.path):
+            names = sorted(n for n in os.listdir(folder.path) if n.endswith(".parquet"))
+            for name in names[:-1]:
+                os.remove(os.path.join(folder.path, name))
+                removed += 1
+    return removed
+
+
+#the newest snapshot of each (date, ticker) partition in range, as (date, ticker, path).
+#Pruning happens on the directory names, so partitions outside the query (or in
+#`skip`) are never listed
+def _latest_files(tickers, start: str, end: str, root: str, skip=frozenset()) -> list[tuple]:
+    if not os.path.isdir(root):
+        return []
+    files = []
+    for entry in sorted(os.scandir(root), key=lambda e: e.name):
+        if not entry.name.startswith("date=") or not (start <= entry.name[5:] <= end):
+            continue
+        for ticker in tickers:
+            if (entry.name[5:], ticker) in skip:
+                continue
+            folder = os.path.join(entry.path, f"ticker={ticker}")
+            if os.path.isdir(folder):
+                names = sorted(n for n in os.listdir(folder) if n.endswith(".parquet"))
+                if names:
+                    files.append((entry.name[5:], ticker, os.path.join(folder, names[-1])))
+    return files
+
+
+#ATM_DTE-day ATM implied vol of the given snapshot files: IV interpolated to the spot
+#within each expiry, then linearly in total variance across the two expiries around
+#ATM_DTE. Only the five columns it needs are read, memory-mapped
+def _compute_atm(files: list[str], root: str) -> pd.DataFrame:
+    dataset = ds.dataset(
+        files, format="parquet", filesystem=pafs.LocalFileSystem(use_mmap=True),
+        partitioning=PARTITIONING, partition_base_dir=root,
+    )
+    frame = dataset.to_table(columns=["ticker", "date", "dte", "strike", "spot", "C_IV", "P_IV"]).to_pandas()
+
+    iv = frame[["C_IV", "P_IV"]].astype(float)
+    frame["iv"] = iv.where(iv > 0).mean(axis=1)
+    frame["k"] = np.log(frame["strike"] / frame["spot"])
+    frame = frame.dropna(subset=["iv", "k"]).sort_values(["ticker", "date", "dte", "k"])
+
+    #nearest strikes either side of the spot within each expiry
+    keys = ["ticker", "date", "dte"]
+    below = frame[frame["k"] <= 0].drop_duplicates(keys, keep="last")[keys + ["k", "iv"]]
+    above = frame[frame["k"] > 0].drop_duplicates(keys, keep="first")[keys + ["k", "iv"]]
+    per_exp = below.merge(above, on=keys, how="outer", suffixes=("_lo", "_hi"))
+    weight = (-per_exp["k_lo"] / (per_exp["k_hi"] - per_exp["k_lo"])).fillna(0.0)
+    per_exp["iv"] = per_exp["iv_lo"] + weight * (per_exp["iv_hi"] - per_exp["iv_lo"])
+    per_exp["iv"] = per_exp["iv"].fillna(per_exp["iv_lo"]).fillna(per_exp["iv_hi"])
+    per_exp["w"] = per_exp["iv"] ** 2 * per_exp["dte"].clip(lower=1) / 365.0
+    per_exp = per_exp.sort_values(keys)
+
+    #the expiries either side of ATM_DTE
+    keys = ["ticker", "date"]
+    near = per_exp[per_exp["dte"] <= ATM_DTE].drop_duplicates(keys, keep="last")[keys + ["dte", "w", "iv"]]
+    far = per_exp[per_exp["dte"] > ATM_DTE].drop_duplicates(keys, keep="first")[keys + ["dte", "w", "iv"]]
+    term = near.merge(far, on=keys, how="outer", suffixes=("_lo", "_hi"))
+    weight = (ATM_DTE - term["dte_lo"]) / (term["dte_hi"] - term["dte_lo"])
+    w = term["w_lo"] + weight * (term["w_hi"] - term["w_lo"])
+    term["atm_iv"] = np.sqrt(w.clip(lower=0) * 365.0 / ATM_DTE)
+    #only one side of ATM_DTE listed: flat extrapolation in vol
+    term["atm_iv"] = term["atm_iv"].fillna(term["iv_hi"]).fillna(term["iv_lo"])
+    return term[["ticker", "date", "atm_iv"]]
+
+
+_summary_lock = threading.Lock()
+
+
+#closed days never change, so their ATM IV is kept in a small summary file next to
+#the partitions and only partitions not summarized yet are read; today's partitions
+#are always recomputed since the recorder is still adding snapshots
+@metrics.timed("chain.history_atm_iv")
+def atm_iv(tickers, start, end=None, root: str = HISTORY_DIR) -> pd.Series:
+    start = pd.Timestamp(start).strftime("%Y-%m-%d")
+    end = pd.Timestamp(end or pd.Timestamp.now()).strftime("%Y-%m-%d")
+    today = pd.Timestamp.now().strftime("%Y-%m-%d")
+    tickers = list(tickers)
+    path = os.path.join(root, "_atm_iv.parquet")
+
+    with _summary_lock:
+        summary = pd.read_parquet(path) if os.path.exists(path) else pd.DataFrame(
+            {"ticker": pd.Series(dtype=str), "date": pd.Series(dtype=str), "atm_iv": pd.Series(dtype=float)}
+        )
+        files = _latest_files(tickers, start, end, root, skip=set(zip(summary["date"], summary["ticker"])))
+        missing = [(d, t, f) for d, t, f in files if d < today]
+        if missing:
+            fresh = pd.DataFrame([(t, d) for d, t, _ in missing], columns=["ticker", "date"])
+            #partitions without a usable ATM quote are stored as NaN so they are not reread
+            fresh = fresh.merge(_compute_atm([f for _, _, f in missing], root), on=["ticker", "date"], how="left")
+            summary = pd.concat([summary, fresh], ignore_index=True)
+            tmp = path + ".tmp"
+            summary.to_parquet(tmp, index=False)
+            os.replace(tmp, path)
+
+    live = [f for d, _, f in files if d >= today]
+    parts = [summary[summary["ticker"].isin(tickers) & summary["date"].between(start, min(end, today))]]
+    if live:
+        parts.append(_compute_atm(live, root))
+    frame = pd.concat(parts, ignore_index=True).dropna(subset=["atm_iv"])
+    frame = frame[frame["date"].between(start, end)]
+    frame["date"] = pd.to_datetime(frame["date"])
+    return frame.drop_duplicates(["ticker", "date"], keep="last").set_index(["ticker", "date"])["atm_iv"].sort_index()
+
+
+#IV rank (where today's ATM IV sits between the lookback's low and high) and IV
+#percentile (share of earlier days with a lower ATM IV), both 0-100
+def iv_rank(tickers, lookback_days: int = 365, end=None, root: str = HISTORY_DIR) -> pd.DataFrame:
+    end = pd.Timestamp(end or pd.Timestamp.now())
+    series = atm_iv(tickers, end - pd.Timedelta(days=lookback_days), end, root)
+    by_ticker = series.groupby(level="ticker")
+    current = by_ticker.last()
+    low, high = by_ticker.min(), by_ticker.max()
+    #days before the last one with a lower ATM IV
+    below = (series < current.reindex(series.index.get_level_values("ticker")).to_numpy()).groupby(level="ticker").sum()
+    days = by_ticker.size()
+    out = pd.DataFrame({
+        "atm_iv": current,
+        "low": low,
+        "high": high,
+        "iv_rank": (100.0 * (current - low) / (high - low)).where(high > low),
+        "iv_percentile": (100.0 * below / (days - 1)).where(days > 1),
+        "days": days,
+    })
+    out = out.reindex(pd.Index(list(tickers), name="ticker"))
+    out["days"] = out["days"].fillna(0).astype(int)
+    return out
+
+
+#background thread that snapshots the watchlist every `interval` seconds, once per process.
+#A symbol is recorded only when its chains moved, and outside market hours only once
+#after the close, so nights and weekends add no duplicate files
+class Recorder:
+    def __init__(self, symbols=None, interval: float = RECORD_INTERVAL, root: str = HISTORY_DIR):
+        self.symbols = list(symbols or WATCHLIST)
+        self.interval = interval
+        self.root = root
+        self.last_run = None
+        self.last_written = 0
+        self.last_error = None
+        self._versions = {} #symbol -> chain versions of its last snapshot
+        self._recorded = {} #symbol -> time of its last snapshot
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _due(self, now: pd.Timestamp) -> list:
+        is_open, close = market_open(now), last_close(now)
+        due = []
+        for symbol in self.symbols:
+            recorded = self._recorded.get(symbol)
+            if not is_open and recorded is not None and recorded > close:
+                continue
+            try:
+                versions = chain_versions(symbol, now)
+            except Exception:
+                versions = None #let record() try, and skip the symbol if it fails
+            if versions is None or versions != self._versions.get(symbol):
+                due.append((symbol, versions))
+        return due
+
+    def run_once(self, now=None):
+        now = pd.Timestamp(now or pd.Timestamp.now())
+        written = 0
+        for symbol, versions in self._due(now):
+            if record([symbol], now, self.root):
+                written += 1
+                self._versions[symbol] = versions
+                self._recorded[symbol] = _market_time(now)
+        compact(now.strftime("%Y-%m-%d"), self.root)
+        self.last_written = written
+
+    def _loop(self):
+        while True:
+            try:
+                self.run_once()
+                self.last_error = None
+            except Exception as e:
+                #one failed pass must not end the thread
+                self.last_error = e
+                log.exception("chain history recording failed")
+            self.last_run = time.time()
+            time.sleep(self.interval)
+
+    def start(self):
+        with self._lock:
+            if self._thread is None and self.interval > 0:
+                self._thread = threading.Thread(target=self._loop, name="chain-recorder", daemon=True)
+                self._thread.start()
+
+
+_recorder = Recorder()
+
+
+def start_recorder() -> Recorder:
+    _recorder.start()
+    return _recorder
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+import metrics
+
+#yfinance chain column -> display suffix; every one is held as float32
+FIELDS = {
+    "lastPrice": "last",
+    "bid": "bid",
+    "ask": "ask",
+    "volume": "vol",
+    "openInterest": "OI",
+    "impliedVolatility": "IV",
+}
+DISPLAY = [
+    "C_last", "C_bid", "C_ask", "C_vol", "C_OI", "C_IV", "C_ITM",
+    "strike",
+    "P_last", "P_bid", "P_ask", "P_vol", "P_OI", "P_IV", "P_ITM",
+]
+
+
+#one expiry's calls and puts aligned on a single sorted float64 strike array:
+#float32 columns (C_bid, P_IV, ...) and boolean masks (C_ITM, C_listed, ...),
+#NaN where a side has no contract at that strike
+class ChainSnapshot:
+    def __init__(self, strikes: np.ndarray, cols: dict, masks: dict):
+        self.strikes = strikes
+        self.cols = cols
+        self.masks = masks
+
+    @classmethod
+    @metrics.timed("chain.from_chain")
+    def from_chain(cls, calls: pd.DataFrame, puts: pd.DataFrame) -> "ChainSnapshot":
+        strikes = np.union1d(calls["strike"].to_numpy(dtype=float), puts["strike"].to_numpy(dtype=float))
+        cols, masks = {}, {}
+        for tag, side in (("C", calls), ("P", puts)):
+            j = np.searchsorted(strikes, side["strike"].to_numpy(dtype=float))
+            for field, name in FIELDS.items():
+                col = np.full(len(strikes), np.nan, dtype=np.float32)
+                if field in side:
+                    col[j] = pd.to_numeric(side[field], errors="coerce").to_numpy(dtype=np.float32, na_value=np.nan)
+                cols[f"{tag}_{name}"] = col
+            listed = np.zeros(len(strikes), dtype=bool)
+            listed[j] = True
+            itm = np.zeros(len(strikes), dtype=bool)
+            if "inTheMoney" in side:
+                itm[j] = side["inTheMoney"].fillna(False).to_numpy(dtype=bool)
+            masks[f"{tag}_listed"] = listed
+            masks[f"{tag}_ITM"] = itm
+        return cls(strikes, cols, masks)
+
+    def __len__(self) -> int:
+        return len(self.strikes)
+
+    @property
+    def nbytes(self) -> int:
+        return self.strikes.nbytes + sum(a.nbytes for a in self.cols.values()) + sum(a.nbytes for a in self.masks.values())
+
+    def take(self, rows) -> "ChainSnapshot":
+        return ChainSnapshot(
+            self.strikes[rows],
+            {name: col[rows] for name, col in self.cols.items()},
+            {name: mask[rows] for name, mask in self.masks.items()},
+        )
+
+    #strikes with a bid and an ask on both sides
+    def quoted(self) -> np.ndarray:
+        return (
+            np.isfinite(self.cols["C_bid"]) & np.isfinite(self.cols["C_ask"])
+            & np.isfinite(self.cols["P_bid"]) & np.isfinite(self.cols["P_ask"])
+        )
+
+    def mid(self, tag: str) -> np.ndarray:
+        return (self.cols[f"{tag}_bid"].astype(float) + self.cols[f"{tag}_ask"]) / 2
+
+    #mean of the call and put IV, skipping a missing side
+    def avg_iv(self) -> np.ndarray:
+        iv = np.stack([self.cols["C_IV"], self.cols["P_IV"]]).astype(float)
+        count = np.isfinite(iv).sum(axis=0)
+        total = np.where(np.isfinite(iv), iv, 0.0).sum(axis=0)
+        return np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+    #row indices of the n strikes closest to S among `valid` rows: a binary search
+    #for S, then only the n candidates on either side are compared
+    def nearest(self, S: float, n: int, valid=None) -> np.ndarray:
+        rows = np.arange(len(self)) if valid is None else np.flatnonzero(valid)
+        i = np.searchsorted(self.strikes[rows], S)
+        window = rows[max(i - n, 0): i + n]
+        order = np.argsort(np.abs(self.strikes[window] - S), kind="stable")[:n]
+        return np.sort(window[order])
+
+    #pandas only for display: `columns` (the chain layout by default) of `rows`,
+    #taken from the snapshot or from the extra aligned arrays
+    def to_frame(self, rows=None, columns=None, **extra) -> pd.DataFrame:
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows)
+        data = {}
+        for name in columns or DISPLAY:
+            if name == "strike":
+                data[name] = self.strikes[rows]
+            elif name in self.cols:
+                data[name] = self.cols[name][rows]
+            elif name in self.masks:
+                data[name] = self.masks[name][rows]
+            else:
+                data[name] = np.asarray(extra[name])[rows]
+        return pd.DataFrame(data)
@@ -0,0 +1,129 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from pricers import bs_greeks, bs_price
+
+TRADING_DAYS = 252
+CHUNK_PATHS = 5_000 #paths simulated together; memory is O(chunk x rebalance schedules)
+PARALLEL_MIN = 50_000 #below this many paths a process pool costs more than it saves
+
+
+#one chunk of paths, stepped day by day without storing the paths; every
+#rebalance schedule hedges the same paths so their errors are directly comparable
+def _run_chunk(job: dict) -> dict:
+    rng = np.random.default_rng(job["seed"])
+    n, steps, S0, K, r, iv = job["n"], job["steps"], job["S0"], job["K"], job["r"], job["iv"]
+    kind, q = job["kind"], job["quantity"] * job["multiplier"]
+    dt = 1.0 / TRADING_DAYS
+    every = np.asarray(job["rebalance_days"])[:, None]
+    fee = job["cost_bps"] / 1e4
+
+    S = np.full(n, float(S0))
+    hedge = np.broadcast_to(-q * job["delta0"], (len(every), n)).copy() #shares held
+    cost = np.abs(hedge) * S0 * fee
+    cash = -q * job["premium"] - hedge * S0 - cost
+    turnover = np.abs(hedge)
+    growth = np.exp(r * dt)
+
+    for step in range(1, steps + 1):
+        if job["returns"] is None:
+            S *= np.exp((job["mu"] - 0.5 * job["vol"] ** 2) * dt + job["vol"] * np.sqrt(dt) * rng.standard_normal(n))
+        else:
+            S *= np.exp(rng.choice(job["returns"], n))
+        cash *= growth
+        if step == steps:
+            break
+        due = (step % every == 0)[:, 0]
+        if due.any():
+            target = -q * bs_greeks(S, K, r, iv, (steps - step) * dt, kind)["delta"]
+            trade = target[None, :] - hedge[due]
+            fees = np.abs(trade) * S * fee
+            cash[due] -= trade * S + fees
+            cost[due] += fees
+            turnover[due] += np.abs(trade)
+            hedge[due] = target
+
+    payoff = np.maximum(S - K, 0.0) if kind == "call" else np.maximum(K - S, 0.0)
+    #the remaining hedge is marked at the final price; it settles against the option
+    pnl = cash + hedge * S + q * payoff
+    return {"pnl": pnl, "cost": cost, "turnover": turnover}
+
+
+#hedging error of holding `quantity` options (bought or sold at the implied-vol
+#BS price) and delta-hedging them with stock on every schedule in
+#`rebalance_days`. Paths are GBM at `realized_vol`/`mu`, or bootstrapped from
+#`returns` (daily log returns) when given. Result arrays have shape (schedules, paths)
+@metrics.timed("risk.delta_hedge_sim")
+def simulate(
+    kind: str,
+    K: float,
+    S0: float,
+    T: float,
+    r: float,
+    iv: float,
+    quantity: float = -1.0,
+    multiplier: float = 100.0,
+    realized_vol: float | None = None,
+    mu: float = 0.0,
+    returns=None,
+    rebalance_days=(1, 5, 10),
+    cost_bps: float = 0.0,
+    n_paths: int = 10_000,
+    seed: int = 0,
+    chunk_paths: int = CHUNK_PATHS,
+    workers: int | None = None,
+) -> dict:
+    kind = kind.lower()
+    steps = max(1, int(round(T * TRADING_DAYS)))
+    T = steps / TRADING_DAYS
+    rebalance_days = tuple(int(d) for d in rebalance_days)
+    if returns is not None:
+        returns = np.asarray(returns, dtype=float)
+        returns = returns[np.isfinite(returns)]
+        if len(returns) < 2:
+            raise ValueError("not enough return history to bootstrap paths.")
+
+    base = {
+        "steps": steps, "S0": S0, "K": K, "r": r, "iv": iv, "kind": kind,
+        "quantity": quantity, "multiplier": multiplier,
+        "vol": iv if realized_vol is None else realized_vol, "mu": mu, "returns": returns,
+        "rebalance_days": rebalance_days, "cost_bps": cost_bps,
+        "premium": float(bs_price(S0, K, r, iv, T, kind)),
+        "delta0": float(bs_greeks(S0, K, r, iv, T, kind)["delta"]),
+    }
+    #independent, reproducible streams per chunk, so results do not depend on the worker count
+    sizes = [min(chunk_paths, n_paths - start) for start in range(0, n_paths, chunk_paths)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [{**base, "n": n, "seed": s} for n, s in zip(sizes, seeds)]
+
+    workers = workers if workers is not None else (os.cpu_count() or 1)
+    if workers > 1 and len(jobs) > 1 and n_paths >= PARALLEL_MIN:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            results = list(pool.map(_run_chunk, jobs))
+    else:
+        results = [_run_chunk(job) for job in jobs]
+
+    out = {key: np.concatenate([res[key] for res in results], axis=1) for key in results[0]}
+    out["rebalance_days"] = rebalance_days
+    out["premium"] = base["premium"] * quantity * multiplier
+    return out
+
+
+def summarize(result: dict, alpha: float = 0.05) -> pd.DataFrame:
+    rows = {}
+    for i, days in enumerate(result["rebalance_days"]):
+        pnl = result["pnl"][i]
+        var = np.quantile(pnl, alpha)
+        rows[f"every {days} day{'s' if days > 1 else ''}"] = {
+            "mean P&L": pnl.mean(),
+            "std of hedge error": pnl.std(),
+            f"VaR {alpha:.0%}": var,
+            f"ES {alpha:.0%}": pnl[pnl <= var].mean(),
+            "mean transaction cost": result["cost"][i].mean(),
+            "mean shares traded": result["turnover"][i].mean(),
+        }
+    return pd.DataFrame(rows).T
@@ -0,0 +1,128 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+import metrics
+
+CACHE_DIR = os.environ.get("OPTIONLAB_CACHE_DIR", os.path.join(".cache", "optionlab"))
+MAX_BYTES = int(float(os.environ.get("OPTIONLAB_CACHE_MAX_MB", "512")) * 1024 * 1024)
+
+#seconds an entry is served without touching the network
+TTLS = {
+    "history": 300,
+    "option_chain": 300,
+    "chain_snapshot": 300,
+    "expirations": 3600,
+    "news": 300,
+}
+
+
+class DiskCache:
+    def __init__(self, path: str, max_bytes: int = MAX_BYTES, ttls: dict | None = None):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = dict(TTLS if ttls is None else ttls)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                dataset TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                stored REAL NOT NULL,
+                accessed REAL NOT NULL,
+                PRIMARY KEY (dataset, key)
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed)")
+
+    #returns (value, age in seconds) or (None, None); ignores TTL so callers can
+    #use a stale entry as the base of an incremental refresh
+    def get_any(self, dataset: str, key: str):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, stored FROM entries WHERE dataset=? AND key=?", (dataset, key)
+            ).fetchone()
+            if row is None:
+                return None, None
+            now = time.time()
+            self._db.execute(
+                "UPDATE entries SET accessed=? WHERE dataset=? AND key=?", (now, dataset, key)
+            )
+        try:
+            return pickle.loads(row[0]), now - row[1]
+        except Exception:
+            self.delete(dataset, key)
+            return None, None
+
+    def get(self, dataset: str, key: str):
+        value, age = self.get_any(dataset, key)
+        if value is None or age > self.ttls.get(dataset, 0):
+            metrics.count(f"cache.{dataset}.{'miss' if value is None else 'stale'}")
+            return None
+        metrics.count(f"cache.{dataset}.hit")
+        return value
+
+    def put(self, dataset: str, key: str, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (dataset, key, blob, len(blob), now, now),
+            )
+            self._evict()
+
+    #(stored time, age in seconds) of an entry without loading its value, or (None, None);
+    #the stored time doubles as the version of the data
+    def stamp(self, dataset: str, key: str):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT stored FROM entries WHERE dataset=? AND key=?", (dataset, key)
+            ).fetchone()
+        if row is None:
+            return None, None
+        return row[0], time.time() - row[0]
+
+    def delete(self, dataset: str, key: str):
+        with self._lock:
+            self._db.execute("DELETE FROM entries WHERE dataset=? AND key=?", (dataset, key))
+
+    #least recently accessed entries go first until the file fits the budget
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for dataset, key, size in self._db.execute(
+            "SELECT dataset, key, size FROM entries ORDER BY accessed ASC"
+        ):
+            victims.append((dataset, key))
+            total -= size
+            if total <= self.max_bytes:
+                break
+        self._db.executemany("DELETE FROM entries WHERE dataset=? AND key=?", victims)
+
+    def size(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> DiskCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DiskCache(os.path.join(CACHE_DIR, "cache.sqlite3"))
+        return _cache
@@ -0,0 +1,164 @@
+from collections import namedtuple
+from functools import lru_cache
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from pricers import bs_price
+
+#offline stand-ins for yfinance.Ticker and finnhub.Client with deterministic
+#synthetic data per symbol, for load tests and demos without network access.
+#Only the calls the app makes are implemented; install() patches both libraries
+YEARS = 11 #covers the longest history the pages request ("10y")
+EXPIRIES = 16
+NEWS_PER_CATEGORY = 60
+
+Options = namedtuple("Options", ["calls", "puts", "underlying"])
+_latency = 0.0
+
+
+def _seed(*parts) -> int:
+    return zlib.crc32("|".join(map(str, parts)).encode())
+
+
+def _wait():
+    if _latency > 0:
+        time.sleep(_latency)
+
+
+#daily OHLCV bars ending today, the same for a symbol in every process
+@lru_cache(maxsize=None)
+def _daily(symbol: str) -> pd.DataFrame:
+    rng = np.random.default_rng(_seed(symbol))
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=252 * YEARS, tz="America/New_York")
+    vol = rng.uniform(0.12, 0.55) / np.sqrt(252)
+    close = rng.uniform(20, 600) * np.exp(np.cumsum(rng.normal(0, vol, len(index))))
+    open_ = close * np.exp(rng.normal(0, vol / 3, len(index)))
+    swing = np.abs(rng.normal(0, vol, len(index)))
+    return pd.DataFrame({
+        "Open": open_,
+        "High": np.maximum(open_, close) * np.exp(swing),
+        "Low": np.minimum(open_, close) * np.exp(-swing),
+        "Close": close,
+        "Volume": rng.integers(1_000_000, 50_000_000, len(index)).astype(float),
+        "Dividends": 0.0,
+        "Stock Splits": 0.0,
+    }, index=pd.Index(index, name="Date"))
+
+
+def _expiries() -> list[str]:
+    today = pd.Timestamp.today().normalize()
+    fridays = pd.date_range(today + pd.Timedelta(days=1), periods=8, freq="W-FRI")
+    monthly = pd.date_range(today + pd.Timedelta(days=60), periods=EXPIRIES - len(fridays), freq="WOM-3FRI")
+    return sorted({d.strftime("%Y-%m-%d") for d in fridays.append(monthly)})
+
+
+class FakeTicker:
+    def __init__(self, symbol: str, session=None):
+        self.ticker = symbol.upper()
+
+    def history(self, period: str = "1mo", interval: str = "1d", start=None, end=None, **kwargs) -> pd.DataFrame:
+        _wait()
+        bars = _daily(self.ticker)
+        if interval == "1wk":
+            bars = bars.resample("W-FRI").agg({"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"})
+        elif interval == "1mo":
+            bars = bars.resample("MS").agg({"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"})
+        if start is not None:
+            start = pd.Timestamp(start)
+            start = start.tz_localize(bars.index.tz) if start.tzinfo is None else start.tz_convert(bars.index.tz)
+            return bars[bars.index >= start].copy()
+        if period == "max":
+            return bars.copy()
+        if period == "ytd":
+            return bars[bars.index.year == bars.index[-1].year].copy()
+        n, unit = int(period.rstrip("dwkmoy")), period.lstrip("0123456789")
+        if unit == "d":
+            return bars.tail(n).copy()
+        days = n * {"wk": 7, "mo": 31, "y": 365}[unit]
+        return bars[bars.index > bars.index[-1] - pd.Timedelta(days=days)].copy()
+
+    @property
+    def options(self) -> tuple:
+        _wait()
+        return tuple(_expiries())
+
+    @property
+    def fast_info(self) -> dict:
+        _wait()
+        return {"last_price": float(_daily(self.ticker)["Close"].iloc[-1])}
+
+    #SVI-like smile around the spot with a put skew; bid/ask around the Black-Scholes price
+    def option_chain(self, date: str) -> Options:
+        _wait()
+        spot = float(_daily(self.ticker)["Close"].iloc[-1])
+        rng = np.random.default_rng(_seed(self.ticker, date))
+        T = max((pd.Timestamp(date) + pd.Timedelta(hours=16) - pd.Timestamp.now()).total_seconds(), 3600.0) / (365 * 86400)
+        step = 10 ** np.floor(np.log10(spot)) / 20
+        strikes = np.arange(np.floor(spot * 0.6 / step), np.ceil(spot * 1.4 / step) + 1) * step
+        k = np.log(strikes / spot)
+        base = 0.12 + _seed(self.ticker) % 40 / 100
+        iv = np.clip(base * (1 - 0.8 * k + 1.5 * k * k) + 0.02 * np.sqrt(0.1 / max(T, 0.01)), 0.05, 3.0)
+
+        frames = []
+        for kind in ("call", "put"):
+            price = bs_price(spot, strikes, 0.0, iv, T, kind)
+            spread = np.maximum(0.01, 0.03 * price)
+            bid = np.round(np.maximum(price - spread / 2, 0.0), 2)
+            frames.append(pd.DataFrame({
+                "contractSymbol": [f"{self.ticker}{pd.Timestamp(date):%y%m%d}{kind[0].upper()}{int(K * 1000):08d}" for K in strikes],
+                "lastTradeDate": pd.Timestamp.now(tz="UTC").floor("min"),
+                "strike": strikes,
+                "lastPrice": np.round(price, 2),
+                "bid": bid,
+                "ask": np.round(bid + spread, 2),
+                "change": 0.0,
+                "percentChange": 0.0,
+                "volume": rng.integers(0, 5000, len(strikes)).astype(float),
+                "openInterest": rng.integers(0, 20000, len(strikes)),
+                "impliedVolatility": iv * rng.normal(1.0, 0.01, len(strikes)),
+                "inTheMoney": strikes < spot if kind == "call" else strikes > spot,
+                "contractSize": "REGULAR",
+                "currency": "USD",
+            }))
+        return Options(frames[0], frames[1], {"regularMarketPrice": spot})
+
+
+class FakeFinnhubClient:
+    def __init__(self, api_key: str = "", **kwargs):
+        pass
+
+    #newest first, ids above min_id only, like the real endpoint
+    def general_news(self, category: str, min_id: int = 0) -> list[dict]:
+        _wait()
+        now = int(time.time())
+        base = _seed(category) % 100_000 * 1000
+        return [
+            {
+                "id": base + i,
+                "category": category,
+                "datetime": now - 600 * (NEWS_PER_CATEGORY - i),
+                "headline": f"{category.title()} headline {i}",
+                "summary": f"<p>Synthetic {category} story number {i} for offline runs.</p>",
+                "source": "OptionLab",
+                "url": f"https://example.com/{category}/{i}",
+                "image": "",
+                "related": "",
+            }
+            for i in range(NEWS_PER_CATEGORY, 0, -1)
+            if base + i > min_id
+        ]
+
+
+#route every yfinance/finnhub call of this process to the fakes; `latency` seconds
+#are slept per call to stand in for the network round trip
+def install(latency: float = 0.0):
+    global _latency
+    import finnhub
+    import yfinance
+
+    _latency = latency
+    yfinance.Ticker = FakeTicker
+    finnhub.Client = FakeFinnhubClient
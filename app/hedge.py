@@ -1,6 +1,18 @@
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
 import streamlit as st
 
+import delta_hedge
+import hedge_solver
+import market_data
+import metrics
+import position_store
+import scenarios
+import var
+
 st.set_page_config(layout="wide")
+sections = metrics.sections("hedge")
 st.markdown(
     "<h1 style='text-align: center;'>Risk & Hedge Engine</h1>",
     unsafe_allow_html=True
@@ -95,4 +107,337 @@ elif greek_choice == "Vega":
         else:
             hedge_contracts = (target_greek - pos_greek) / hedge_g_per_contract
             st.success(f"Trade {hedge_contracts:.3f} hedge option contracts (negative = sell, positive = buy, contract multiplier = {mult}).")
-            st.write(f"New vega ≈ {pos_greek + hedge_contracts*hedge_g_per_contract:.3f}")
\ No newline at end of file
+            st.write(f"New vega ≈ {pos_greek + hedge_contracts*hedge_g_per_contract:.3f}")
+
+sections.end("single_greek")
+
+st.markdown(
+    "<h1 style='text-align: center;'>Portfolio book</h1>",
+    unsafe_allow_html=True
+)
+
+store = position_store.get_store()
+if "book" not in st.session_state:
+    st.session_state["book"] = store.load_book()
+book = st.session_state["book"]
+
+
+def latest_close(symbol: str) -> float:
+    return float(market_data.history(symbol, "5d")["Close"].dropna().iloc[-1])
+
+
+def has_spot(symbol: str) -> bool:
+    return symbol in book.underlyings and np.isfinite(book.spot[book.underlyings.index(symbol)])
+
+
+with st.form("add_position"):
+    c1, c2, c3, c4 = st.columns(4)
+    with c1:
+        underlying = st.text_input("Underlying", value="SPY").strip().upper()
+        kind = st.selectbox("Instrument", ["call", "put", "stock"])
+    with c2:
+        quantity = st.number_input("Quantity (contracts or shares, negative = short)", value=1, step=1)
+        strike = st.number_input("Strike", value=500.0, step=1.0)
+    with c3:
+        expiry = st.date_input("Expiry", value=pd.Timestamp.today() + pd.Timedelta(days=30))
+        iv = st.number_input("Implied volatility", value=0.20, step=0.01, format="%.2f")
+    with c4:
+        cost = st.number_input("Entry price per unit", value=0.0, step=0.01)
+        spot = st.number_input("Spot (0 = latest close)", value=0.0, step=1.0)
+    if st.form_submit_button("Add position"):
+        try:
+            if spot <= 0 and not has_spot(underlying):
+                spot = latest_close(underlying)
+            position_id = store.open(
+                underlying=underlying, kind=kind, quantity=quantity, strike=strike, expiry=expiry, iv=iv, cost=cost,
+            )
+            book.add(
+                underlying, kind, quantity, strike=strike, expiry=expiry, iv=iv, cost=cost,
+                spot=spot if spot > 0 else None, position_id=position_id,
+            )
+            store.save_marks({underlying: book.spot[book.underlyings.index(underlying)]})
+        except Exception as e:
+            st.error(f"Could not add position: {e}")
+
+with st.expander("Import positions from CSV or Parquet"):
+    st.caption(
+        "Columns: underlying, kind (call/put/stock), quantity; optional strike, expiry, iv, multiplier, cost. "
+        "Positions are saved locally and reloaded on the next visit."
+    )
+    upload = st.file_uploader("Positions file", type=["csv", "parquet"])
+    if upload is not None and st.button("Import"):
+        try:
+            imported = store.import_file(upload, upload.name)
+            spots = {u: latest_close(u) for u in imported["underlying"].unique() if not has_spot(u)}
+            book.add_many(imported, spots=spots)
+            store.save_marks(spots)
+            st.success(f"Imported {len(imported):,} positions.")
+        except Exception as e:
+            st.error(f"Could not import positions: {e}")
+
+if len(book) == 0:
+    st.info("Add positions to see aggregate Greeks per underlying.")
+else:
+    st.markdown(
+        "<h3 style='text-align: center;'>Aggregate Greeks per underlying</h3>",
+        unsafe_allow_html=True
+    )
+    st.caption("Delta in shares, gamma per $1 move, vega per vol point, theta per calendar day.")
+    st.dataframe(book.summary().style.format("{:,.2f}"), use_container_width=True)
+
+    with st.expander("Positions", expanded=False):
+        st.dataframe(book.positions().set_index("id"), use_container_width=True)
+    with st.expander("Trade log", expanded=False):
+        st.dataframe(store.trades(), use_container_width=True, hide_index=True)
+
+    c1, c2 = st.columns(2)
+    with c1:
+        to_close = st.selectbox("Position to close", book.positions()["id"].tolist())
+        if st.button("Close position"):
+            store.close(int(to_close))
+            book.close(int(to_close))
+            st.rerun()
+    with c2:
+        st.write("")
+        if "repriced" in st.session_state:
+            st.caption(f"Last refresh repriced {st.session_state.pop('repriced'):,} positions.")
+        if st.button("Revalue at latest prices"):
+            try:
+                spots = {symbol: latest_close(symbol) for symbol in book.summary().index}
+                for symbol, value in spots.items():
+                    book.set_spot(symbol, value)
+                store.save_marks(spots)
+                #only underlyings whose price moved are repriced
+                st.session_state["repriced"] = book.refresh()
+                st.rerun()
+            except Exception as e:
+                st.error(f"Could not refresh prices: {e}")
+
+sections.end("book")
+
+if len(book) > 0:
+    st.markdown(
+        "<h1 style='text-align: center;'>Delta–gamma–vega hedge</h1>",
+        unsafe_allow_html=True
+    )
+    st.caption(
+        "Solves all selected Greeks at once with whole option contracts from the listed chain plus "
+        "shares of the underlying, paying the ask on buys and receiving the bid on sells."
+    )
+    summary = book.summary()
+    h1, h2 = st.columns(2)
+    with h1:
+        hedge_symbol = st.selectbox("Underlying to hedge", summary.index.tolist())
+        hedge_greeks = st.multiselect("Greeks to neutralize", ["delta", "gamma", "vega"], default=["delta", "gamma", "vega"])
+        objective = st.radio("Choose trades by", ["Lowest bid/ask cost", "Fewest contracts"], horizontal=True)
+    with h2:
+        try:
+            available = market_data.expirations(hedge_symbol)
+        except Exception as e:
+            available = []
+            st.error(f"Could not load expirations: {e}")
+        hedge_expiries = st.multiselect("Hedge with expirations", available, default=available[:2])
+        min_oi = st.number_input("Minimum open interest", value=10, step=10, min_value=0)
+        max_spread = st.slider("Maximum bid/ask spread (fraction of mid)", 0.05, 1.0, 0.3, 0.05)
+
+    exposure = book.greek_vector(hedge_symbol)
+    t1, t2, t3 = st.columns(3)
+    targets = []
+    for col, name, value in zip((t1, t2, t3), ("delta", "gamma", "vega"), exposure):
+        with col:
+            st.metric(f"Current {name}", f"{value:,.2f}")
+            targets.append(st.number_input(f"Target {name}", value=0.0, step=1.0, key=f"target_{name}"))
+
+    if st.button("Solve hedge"):
+        try:
+            chains = {exp: market_data.option_chain(hedge_symbol, exp) for exp in hedge_expiries}
+            cands = hedge_solver.candidates(
+                chains, float(summary.loc[hedge_symbol, "spot"]), r=book.r, min_oi=min_oi, max_spread=max_spread
+            )
+            if cands.empty and any(g != "delta" for g in hedge_greeks):
+                st.error("No liquid options pass the filters.")
+            else:
+                st.session_state["hedge_result"] = (hedge_symbol, len(cands), hedge_solver.solve(
+                    exposure, cands, target=targets, hedge=hedge_greeks,
+                    objective="cost" if objective == "Lowest bid/ask cost" else "size",
+                ))
+        except Exception as e:
+            st.error(f"Could not solve hedge: {e}")
+
+    if "hedge_result" in st.session_state and st.session_state["hedge_result"][0] == hedge_symbol:
+        _, n_cands, result = st.session_state["hedge_result"]
+        st.write(f"Searched {n_cands} listed options.")
+        if result.empty:
+            st.warning("No hedge found within the contract limit.")
+        else:
+            if not result["within tolerance"].iloc[0]:
+                st.warning("No trade set reaches the targets after rounding; showing the closest.")
+            st.dataframe(result.style.format(precision=2), use_container_width=True)
+
+sections.end("hedge_solver")
+
+if len(book) > 0:
+    st.markdown(
+        "<h1 style='text-align: center;'>Scenarios & stress</h1>",
+        unsafe_allow_html=True
+    )
+    st.caption("Every position is fully repriced in each scenario, so large moves are not approximated by Greeks.")
+    s1, s2, s3 = st.columns(3)
+    with s1:
+        spot_range = st.slider("Spot shock range (%)", -50, 50, (-30, 30), 5)
+    with s2:
+        vol_range = st.slider("Vol shock range (vol points)", -20, 50, (-10, 20), 5)
+    with s3:
+        horizon = st.select_slider("Days forward", options=[0, 1, 5, 10, 21, 63], value=0)
+
+    cube = scenarios.grid(
+        book,
+        spot_shocks=np.arange(spot_range[0], spot_range[1] + 1, 5) / 100.0,
+        vol_shocks=np.arange(vol_range[0], vol_range[1] + 1, 5),
+        days=[horizon],
+    )
+    total = cube["pnl"].sum(axis=0)[:, :, 0]
+    heat = pd.DataFrame(
+        total,
+        index=pd.Index([f"{s:+.0%}" for s in cube["spot_shocks"]], name="spot shock"),
+        columns=[f"{v:+g} vol" for v in cube["vol_shocks"]],
+    )
+    limit = float(np.abs(total).max()) or 1.0
+    st.dataframe(
+        heat.style.format("{:,.0f}").background_gradient(cmap="RdYlGn", vmin=-limit, vmax=limit, axis=None),
+        use_container_width=True
+    )
+
+    st.markdown(
+        "<h3 style='text-align: center;'>Historical stress days</h3>",
+        unsafe_allow_html=True
+    )
+    stress_table = scenarios.stress(book)
+    st.dataframe(
+        stress_table.style.format({"index move": "{:+.1%}", "vol change": "{:+.0f}"}, precision=0, thousands=","),
+        use_container_width=True
+    )
+
+@st.cache_data(ttl=3600)
+def load_book_returns(symbols: tuple, period: str) -> pd.DataFrame:
+    closes = market_data.closes(list(symbols), period=period)
+    return np.log(closes).diff().dropna()
+
+sections.end("scenarios")
+
+if len(book) > 0:
+    st.markdown(
+        "<h1 style='text-align: center;'>Value at risk</h1>",
+        unsafe_allow_html=True
+    )
+    v1, v2, v3, v4 = st.columns(4)
+    with v1:
+        var_method = st.radio("Method", ["Historical", "Monte Carlo"], horizontal=True)
+    with v2:
+        confidence = st.select_slider("Confidence", options=[0.95, 0.975, 0.99, 0.995], value=0.99)
+    with v3:
+        var_horizon = st.number_input("Horizon (trading days)", value=1, step=1, min_value=1, max_value=63)
+    with v4:
+        lookback = st.selectbox("Return history", ["1y", "2y", "5y", "10y"], index=2)
+        if var_method == "Monte Carlo":
+            n_scenarios = st.select_slider("Scenarios", options=[5_000, 10_000, 50_000, 100_000], value=10_000)
+
+    if st.button("Compute VaR"):
+        try:
+            returns = load_book_returns(tuple(book.summary().index), lookback)
+            if len(returns) <= var_horizon:
+                st.error("Not enough price history for the book's underlyings.")
+            elif var_method == "Historical":
+                st.session_state["var_result"] = var.historical_var(book, returns, var_horizon, confidence)
+            else:
+                st.session_state["var_result"] = var.monte_carlo_var(book, returns, var_horizon, confidence, n_scenarios)
+        except Exception as e:
+            st.error(f"Could not compute VaR: {e}")
+
+    if "var_result" in st.session_state:
+        risk = st.session_state["var_result"]
+        m1, m2, m3 = st.columns(3)
+        m1.metric(f"{risk['method']} VaR", f"{risk['var']:,.0f}")
+        m2.metric("Expected shortfall", f"{risk['es']:,.0f}")
+        m3.metric("Scenarios", f"{risk['scenarios']:,}", f"{risk['seconds'] * 1000:,.0f} ms", delta_color="off")
+
+        fig, ax = plt.subplots(figsize=(8, 3))
+        ax.hist(risk["pnl"], bins=80, color="tab:blue", alpha=0.7)
+        ax.axvline(-risk["var"], color="red", linewidth=1, label="VaR")
+        ax.axvline(-risk["es"], color="black", linewidth=1, linestyle="--", label="ES")
+        ax.set_xlabel("Book P&L over the horizon")
+        ax.set_ylabel("Scenarios")
+        ax.legend()
+        st.pyplot(fig, use_container_width=True)
+        plt.close(fig)
+        st.dataframe(risk["contributions"].to_frame().style.format("{:,.0f}"), use_container_width=True)
+
+sections.end("var")
+
+st.markdown(
+    "<h1 style='text-align: center;'>Dynamic delta hedging</h1>",
+    unsafe_allow_html=True
+)
+st.caption(
+    "Trades the option at its implied-vol price, then keeps it delta-hedged with stock along simulated paths. "
+    "The spread of the final P&L is the cost of hedging discretely."
+)
+
+@st.cache_data(ttl=3600)
+def load_returns(ticker: str) -> np.ndarray:
+    hist = market_data.history(ticker, period="10y")
+    return np.diff(np.log(hist["Close"].dropna().to_numpy())) if not hist.empty else np.array([])
+
+d1, d2, d3 = st.columns(3)
+with d1:
+    sim_kind = st.selectbox("Option", ["call", "put"], key="sim_kind")
+    sim_quantity = st.number_input("Contracts (negative = short)", value=-1, step=1, key="sim_quantity")
+    sim_S0 = st.number_input("Spot", value=100.0, step=1.0, key="sim_S0")
+    sim_K = st.number_input("Strike", value=100.0, step=1.0, key="sim_K")
+with d2:
+    sim_days = st.number_input("Trading days to expiry", value=63, step=1, min_value=1, key="sim_days")
+    sim_iv = st.number_input("Implied vol (priced and hedged at)", value=0.20, step=0.01, format="%.2f", key="sim_iv")
+    sim_r = st.number_input("Risk-free rate", value=0.04, step=0.005, format="%.3f", key="sim_r")
+    sim_cost = st.number_input("Transaction cost (bps of traded notional)", value=2.0, step=0.5, key="sim_cost")
+with d3:
+    path_model = st.radio("Paths", ["GBM", "Bootstrapped history"], horizontal=True)
+    if path_model == "GBM":
+        sim_vol = st.number_input("Realized vol", value=0.20, step=0.01, format="%.2f", key="sim_vol")
+        sim_mu = st.number_input("Drift (μ)", value=0.0, step=0.01, key="sim_mu")
+    else:
+        sim_ticker = st.text_input("Ticker for daily returns", value="SPY", key="sim_ticker").strip().upper()
+    sim_every = st.multiselect("Rebalance every (days)", [1, 2, 5, 10, 21], default=[1, 5, 21])
+    sim_paths = st.select_slider("Paths", options=[1_000, 5_000, 10_000, 20_000, 50_000, 100_000], value=10_000)
+
+if st.button("Run simulation"):
+    try:
+        returns = None
+        if path_model != "GBM":
+            returns = load_returns(sim_ticker)
+        sim = delta_hedge.simulate(
+            sim_kind, sim_K, sim_S0, sim_days / delta_hedge.TRADING_DAYS, sim_r, sim_iv,
+            quantity=sim_quantity, multiplier=mult,
+            realized_vol=sim_vol if path_model == "GBM" else None,
+            mu=sim_mu if path_model == "GBM" else 0.0,
+            returns=returns, rebalance_days=sorted(sim_every) or [1], cost_bps=sim_cost, n_paths=sim_paths,
+        )
+        st.session_state["delta_hedge_result"] = sim
+    except Exception as e:
+        st.error(f"Simulation failed: {e}")
+
+if "delta_hedge_result" in st.session_state:
+    sim = st.session_state["delta_hedge_result"]
+    st.write(f"Option premium {'received' if sim['premium'] < 0 else 'paid'}: {abs(sim['premium']):,.2f}")
+    st.dataframe(delta_hedge.summarize(sim).style.format("{:,.2f}"), use_container_width=True)
+
+    fig, ax = plt.subplots(figsize=(8, 3.5))
+    for i, days in enumerate(sim["rebalance_days"]):
+        ax.hist(sim["pnl"][i], bins=80, alpha=0.5, label=f"every {days}d")
+    ax.axvline(0, color="black", linewidth=1)
+    ax.set_xlabel("Final P&L of hedged position")
+    ax.set_ylabel("Paths")
+    ax.legend()
+    st.pyplot(fig, use_container_width=True)
+    plt.close(fig)
+
+sections.end("delta_hedge")
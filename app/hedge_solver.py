@@ -0,0 +1,151 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from optimizer import quotes
+from pricers import bs_greeks
+
+OPTION_GREEKS = ("gamma", "vega") #hedged with options; delta is always squared up with the underlying
+TOLERANCE = {"delta": 0.5, "gamma": 0.5, "vega": 5.0} #largest residual accepted after rounding
+MAX_CONTRACTS = 500 #drops near-singular bases that need absurd sizes
+
+
+#per-contract Greeks of every liquid listed option, in the book's units
+#(delta in shares, gamma per 1.00 move, vega per vol point)
+def candidates(chains: dict, S0: float, r: float = 0.05, asof=None, min_oi: int = 0, max_spread: float = 0.5, multiplier: float = 100.0) -> pd.DataFrame:
+    asof = pd.Timestamp(asof or pd.Timestamp.today()).normalize()
+    frames = []
+    for expiry, (calls, puts) in chains.items():
+        T = max((pd.Timestamp(expiry) - asof).days, 1) / 365.0
+        for kind, side in (("call", calls), ("put", puts)):
+            q = quotes(side, min_oi, max_spread)
+            ok = q["iv"] > 0.01 #yfinance reports ~0 for stale quotes
+            if not ok.any():
+                continue
+            g = bs_greeks(S0, q["strike"][ok], r, q["iv"][ok], T, kind)
+            frames.append(pd.DataFrame({
+                "expiry": pd.Timestamp(expiry).date(),
+                "kind": kind,
+                "strike": q["strike"][ok],
+                "bid": q["bid"][ok],
+                "ask": q["ask"][ok],
+                "delta": g["delta"] * multiplier,
+                "gamma": g["gamma"] * multiplier,
+                "vega": g["vega"] / 100.0 * multiplier,
+                "multiplier": multiplier,
+            }))
+    if not frames:
+        return pd.DataFrame(columns=["expiry", "kind", "strike", "bid", "ask", "delta", "gamma", "vega", "multiplier"])
+    return pd.concat(frames, ignore_index=True)
+
+
+#every k-subset of candidate options solved exactly for the option Greeks in one
+#batched linear solve; k = number of option Greeks hedged
+def _basis_solutions(G: np.ndarray, need: np.ndarray):
+    n, k = G.shape
+    if k == 1:
+        idx = np.arange(n)[:, None]
+    else:
+        i, j = np.triu_indices(n, 1)
+        idx = np.stack([i, j], axis=1)
+    A = np.swapaxes(G[idx], 1, 2) #(subsets, greeks, options)
+    det = np.linalg.det(A)
+    ok = np.abs(det) > 1e-12
+    x = np.linalg.solve(np.where(ok[:, None, None], A, np.eye(k)), np.broadcast_to(need, (len(A), k))[..., None])[..., 0]
+    return idx[ok], x[ok]
+
+
+#integer trades that bring (delta, gamma, vega) from `exposure` to `target`.
+#The minimum-cost LP (min sum of spread paid s.t. Greeks hit) has a vertex
+#optimum using at most one option per hedged option Greek plus the underlying,
+#so all such bases are enumerated and solved at once, each rounded to whole
+#contracts (every floor/ceil combination) with the stock leg absorbing delta.
+#objective "cost" ranks by bid/ask spread paid, "size" by the norm of the trade
+@metrics.timed("risk.hedge_solve")
+def solve(
+    exposure,
+    cands: pd.DataFrame,
+    target=(0.0, 0.0, 0.0),
+    hedge=("delta", "gamma", "vega"),
+    objective: str = "cost",
+    stock_spread: float = 0.01, #half spread per share
+    tolerance: dict | None = None,
+    max_contracts: int = MAX_CONTRACTS,
+    top_n: int = 5,
+) -> pd.DataFrame:
+    tolerance = {**TOLERANCE, **(tolerance or {})}
+    exposure = dict(zip(("delta", "gamma", "vega"), np.asarray(exposure, dtype=float)))
+    target = dict(zip(("delta", "gamma", "vega"), np.asarray(target, dtype=float)))
+    greeks = [g for g in OPTION_GREEKS if g in hedge]
+
+    D = cands[["delta", "gamma", "vega"]].to_numpy(dtype=float)
+    half_spread = 0.5 * (cands["ask"] - cands["bid"]).to_numpy(dtype=float) * cands["multiplier"].to_numpy(dtype=float)
+
+    if greeks:
+        cols = [("delta", "gamma", "vega").index(g) for g in greeks]
+        need = np.array([target[g] - exposure[g] for g in greeks])
+        idx, x = _basis_solutions(D[:, cols], need)
+        #all floor/ceil roundings of each basis solution
+        signs = np.array(list(itertools.product((0, 1), repeat=len(greeks))))
+        contracts = np.floor(x)[:, None, :] + signs[None, :, :]
+        idx = np.broadcast_to(idx[:, None, :], contracts.shape)
+        idx, contracts = idx.reshape(-1, len(greeks)), contracts.reshape(-1, len(greeks))
+        keep = (np.abs(contracts) <= max_contracts).all(axis=1) & (contracts != 0).any(axis=1)
+        idx, contracts = idx[keep], contracts[keep]
+    else:
+        idx, contracts = np.zeros((0, 0), dtype=int), np.zeros((0, 0))
+    #doing nothing (row 0) and trading stock only (row 1) compete with the option trades,
+    #so a trade is only recommended when it leaves a smaller residual than leaving the book alone
+    idx = np.concatenate([np.zeros((2, len(greeks)), dtype=int), idx])
+    contracts = np.concatenate([np.zeros((2, len(greeks))), contracts])
+
+    after = np.array([exposure["delta"], exposure["gamma"], exposure["vega"]]) + np.einsum("sk,skg->sg", contracts, D[idx])
+    shares = np.round(target["delta"] - after[:, 0]) if "delta" in hedge else np.zeros(len(after))
+    shares[0] = 0.0
+    after[:, 0] += shares
+
+    cost = (np.abs(contracts) * half_spread[idx]).sum(axis=1) + np.abs(shares) * stock_spread
+    size = np.sqrt((contracts ** 2).sum(axis=1))
+    tol = np.array([tolerance[g] for g in ("delta", "gamma", "vega")])
+    miss = np.array([target[g] for g in ("delta", "gamma", "vega")]) - after
+    hedged = np.array([g in hedge for g in ("delta", "gamma", "vega")])
+    excess = (np.abs(miss) / tol * hedged).max(axis=1)
+    feasible = excess <= 1.0
+
+    score = cost if objective == "cost" else size
+    #feasible trades by objective first, then the closest misses
+    order = np.lexsort((score, np.where(feasible, 0.0, excess)))
+
+    rows = []
+    seen = set()
+    for s in order:
+        #bases whose rounding zeroes a leg collapse to the same trade
+        trade = (tuple(sorted((int(i), q) for i, q in zip(idx[s], contracts[s]) if q != 0)), shares[s])
+        if trade in seen:
+            continue
+        seen.add(trade)
+        trades = [
+            f"{int(q):+d} {cands['kind'].iat[i][0].upper()} {cands['strike'].iat[i]:g} {cands['expiry'].iat[i]}"
+            for i, q in zip(idx[s], contracts[s]) if q != 0
+        ]
+        if shares[s] != 0:
+            trades.append(f"{int(shares[s]):+d} shares")
+        premium = sum(
+            q * (cands["ask"].iat[i] if q > 0 else cands["bid"].iat[i]) * cands["multiplier"].iat[i]
+            for i, q in zip(idx[s], contracts[s])
+        )
+        rows.append({
+            "trades": ", ".join(trades) or "no trade",
+            "spread cost": cost[s],
+            "option premium": premium,
+            "contracts": int(np.abs(contracts[s]).sum()),
+            "delta after": after[s, 0],
+            "gamma after": after[s, 1],
+            "vega after": after[s, 2],
+            "within tolerance": bool(feasible[s]),
+        })
+        if len(rows) >= top_n:
+            break
+    return pd.DataFrame(rows)
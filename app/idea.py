@@ -2,7 +2,17 @@ import streamlit as st
 import yfinance as yf
 import numpy as np
 import pandas as pd
+import arbitrage
+import chain_history
+import market_data
+import metrics
+import realized_vol
+import svi
+import upstream
+import variance_term
+from regime import check_market_regime
 st.set_page_config(layout="wide")
+sections = metrics.sections("idea")
 st.markdown(
     "<h1 style='text-align: center;'>Volatility Scanner</h1>",
     unsafe_allow_html=True
@@ -48,17 +58,13 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-def change_step(x:float, small: float = 0.20):
-    if x>small:
-        return 1
-    elif x<-small:
-        return -1
-    return 0
+LIVE_REFRESH = 60 #seconds between polls of the shared cache by the live regions
 
+#`version` (the cached data's stored time) is part of the cache key, so a poll only
+#recomputes after the data actually changed
 @st.cache_data(ttl=300)
-def fetch_tile_yf(symbol: str, period="10d", interval="1d"):
-    t = yf.Ticker(symbol)
-    hist = t.history(period=period, interval=interval)
+def fetch_tile_yf(symbol: str, version=None, period="10d", interval="1d"):
+    hist = market_data.history(symbol, period=period, interval=interval)
     if hist is None or hist.empty:
         return 0.0, 0.0, 0.0, np.array([0.0, 0.0])
     closes = hist["Close"].dropna()
@@ -72,88 +78,16 @@ def fetch_tile_yf(symbol: str, period="10d", interval="1d"):
     series = closes.to_numpy()[-80:]
     return last, change, pct, series
 
-@st.cache_data(ttl=300)
-def check_market_regime(
-        pct_spy: float, pct_qqq: float, pct_iwm: float,
-        pct_vxx: float, pct_tlt: float, pct_gld: float,
-        eps: float = 0.20
-):
-    SPY = change_step(pct_spy, eps)
-    QQQ = change_step(pct_qqq, eps)
-    IWM = change_step(pct_iwm, eps)
-    VXX = change_step(pct_vxx, eps)
-    TLT = change_step(pct_tlt, eps)
-    GLD = change_step(pct_gld, eps)
-
-    equities_up = (SPY == +1 and QQQ==+1)
-    equities_down = (SPY == -1 and QQQ==-1)
-
-    volatility_up = (VXX == +1)
-    volatility_down = (VXX == -1)
-
-    participation_up = (IWM == +1)
-    participation_down = (IWM == -1)
-
-    safety_bid = (TLT == +1)
-    macro_hedging = (GLD == +1)
-
-    if pct_gld>2.0:
-        regime = "Macro Hedge Rotation"
-        scenario = "Capital is rotating into macro hedges. Strong gold inflows indicate rising demand for protection, outweighing short-term equity dispersion and signaling a defensive market posture."
-        return regime, scenario
-    if equities_up and volatility_down:
-        regime = "Equity Expansion and Risk Acceptance"
-        if participation_up and not safety_bid:
-            scenario = "Broad-based risk appetite: equities are advancing with declining implied volatility and limited demand for defensive duration."
-        elif participation_down:
-            scenario = "Concentrated leadership: large caps are driving gains while small caps lag, suggesting narrower participation and a more fragile uptrend."
-        else:
-            scenario = "Risk-on with mixed cross-asset confirmation: trend remains constructive, but monitoring for volatility re-expansion is warranted."
-        return regime, scenario
-
-    if equities_up and volatility_up:
-        regime = "Risk acceptance with Elevated Volatility"
-        if safety_bid or macro_hedging:
-            scenario = "Risk assets are higher, but hedging demand persists: volatility is rising alongside a defensive bid, indicating elevated uncertainty beneath the rally."
-        else:
-            scenario = "Uptrend with volatility expansion: price action is positive, but risk premia are rising, consistent with an unstable or news-driven advance."
-        return regime, scenario
-
-    if equities_down and volatility_up:
-        regime = "Deleveraging Phase"
-        if safety_bid and macro_hedging:
-            scenario = "Systemic risk-off: equities are repricing lower as volatility spikes, accompanied by broad demand for safe-haven duration and macro hedges."
-        elif safety_bid:
-            scenario = "Classic flight-to-quality: equities are weakening while volatility rises and Treasuries rally, consistent with risk aversion and capital preservation."
-        else:
-            scenario = "Equity drawdown with limited duration support: volatility is rising without a meaningful Treasury bid, suggesting a rates/inflation-driven shock risk."
-        return regime, scenario
-
-    if equities_down and volatility_down:
-        regime = "Controlled De-risking"
-        if safety_bid:
-            scenario = "Orderly de-risking: equities are drifting lower with contained volatility and supportive duration, consistent with a controlled rotation into safety."
-        else:
-            scenario = "Low-vol weakness: equities are softer without a volatility spike, indicating complacent selling pressure that can transition quickly if a catalyst emerges."
-        return regime, scenario
-
-    regime = "Mixed Signals"
-    if (SPY != QQQ):
-        scenario = "Divergent leadership: SPY and QQQ are sending conflicting signals, implying an unsettled tape and reduced directional conviction."
-    elif VXX == 0:
-        scenario = "Volatility is broadly unchanged: markets are awaiting information, and near-term regime classification remains low confidence."
-    else:
-        scenario = "Cross-asset signals are mixed: confirmation is limited across risk and defensive assets, indicating a transitional environment."
-    return regime, scenario
-
-last_spy, change_spy, pct_spy, series_spy = fetch_tile_yf("SPY")
-last_qqq, change_qqq, pct_qqq, series_qqq = fetch_tile_yf("QQQ")
-last_iwm, change_iwm, pct_iwm, series_iwm = fetch_tile_yf("IWM")
-last_vxx, change_vxx, pct_vxx, series_vxx = fetch_tile_yf("VXX")
-last_tlt, change_tlt, pct_tlt, series_tlt = fetch_tile_yf("TLT")
-last_gld, change_gld, pct_gld, series_gld = fetch_tile_yf("GLD")
-regime, scenario = check_market_regime(pct_spy,pct_qqq,pct_iwm,pct_vxx,pct_tlt,pct_gld)
-st.markdown(f"""
+@st.fragment(run_every=LIVE_REFRESH)
+def regime_card():
+    last_spy, change_spy, pct_spy, series_spy = fetch_tile_yf("SPY", market_data.history_version("SPY"))
+    last_qqq, change_qqq, pct_qqq, series_qqq = fetch_tile_yf("QQQ", market_data.history_version("QQQ"))
+    last_iwm, change_iwm, pct_iwm, series_iwm = fetch_tile_yf("IWM", market_data.history_version("IWM"))
+    last_vxx, change_vxx, pct_vxx, series_vxx = fetch_tile_yf("VXX", market_data.history_version("VXX"))
+    last_tlt, change_tlt, pct_tlt, series_tlt = fetch_tile_yf("TLT", market_data.history_version("TLT"))
+    last_gld, change_gld, pct_gld, series_gld = fetch_tile_yf("GLD", market_data.history_version("GLD"))
+    regime, scenario = check_market_regime(pct_spy,pct_qqq,pct_iwm,pct_vxx,pct_tlt,pct_gld)
+    st.markdown(f"""
         <div class="card">
           <div style="font-size:24px; font-weight:900; margin-bottom:6px;">Market Regime</div>
           <div class="badge">{regime}</div>
@@ -162,92 +96,103 @@ st.markdown(f"""
           <div class="scenario">{scenario}</div>
         </div>
         """, unsafe_allow_html=True)
+
+regime_card()
+sections.end("regime")
 stock = st.selectbox("Choose stock-option chain",
     ["AAPL", "TSLA", "NVDA", "AMD", "META", "QQQ"])
 t = yf.Ticker(stock)
 
 try:
-    S = float(t.fast_info["last_price"])
+    S = float(upstream.fetch("yfinance", ("last_price", stock), lambda: t.fast_info["last_price"]))
 except:
-    hist = t.history(period="5d")
+    hist = market_data.history(stock, period="5d")
     S = float(hist["Close"].iloc[-1])
 
-expirations = t.options
+expirations = market_data.expirations(stock)
 
 exp = st.selectbox("Expiration", expirations)
-chain = t.option_chain(exp)
-
-calls = chain.calls
-puts  = chain.puts
-
-call_cols = ["lastPrice","bid","ask","volume","openInterest","impliedVolatility","inTheMoney"]
-put_cols  = ["lastPrice","bid","ask","volume","openInterest","impliedVolatility","inTheMoney"]
-
-calls_side = calls[["strike"] + call_cols].rename(columns={
-    "lastPrice":"C_last",
-    "bid":"C_bid",
-    "ask":"C_ask",
-    "volume":"C_vol",
-    "openInterest":"C_OI",
-    "impliedVolatility":"C_IV",
-    "inTheMoney":"C_ITM",
-})
-
-puts_side = puts[["strike"] + put_cols].rename(columns={
-    "lastPrice":"P_last",
-    "bid":"P_bid",
-    "ask":"P_ask",
-    "volume":"P_vol",
-    "openInterest":"P_OI",
-    "impliedVolatility":"P_IV",
-    "inTheMoney":"P_ITM",
-})
-
-grid = pd.merge(calls_side, puts_side, on="strike", how="outer").sort_values("strike")
-
-grid = grid[[
-    "C_last","C_bid","C_ask","C_vol","C_OI","C_IV","C_ITM",
-    "strike",
-    "P_last","P_bid","P_ask","P_vol","P_OI","P_IV","P_ITM"
-]]
-
-grid = grid[
-    (grid["C_bid"].notna() & grid["C_ask"].notna()) &
-    (grid["P_bid"].notna() & grid["P_ask"].notna())
-]
+#both sides aligned on one sorted strike array; only strikes quoted on both sides
+snap = market_data.chain_snapshot(stock, exp)
+snap = snap.take(snap.quoted())
+sections.end("chain")
 
-st.subheader("Option Chains")
+#where today's ATM IV sits in this name's recorded history
+chain_history.start_recorder()
 
-work = grid.copy()
+@st.cache_data(ttl=300)
+def load_iv_rank(symbol: str):
+    return chain_history.iv_rank([symbol]).loc[symbol]
+
+st.subheader("Implied volatility vs its history")
+iv_hist = load_iv_rank(stock)
+m1, m2, m3, m4 = st.columns(4)
+m1.metric(f"{chain_history.ATM_DTE}-day ATM IV", f"{iv_hist['atm_iv']:.1%}" if pd.notna(iv_hist["atm_iv"]) else "–")
+m2.metric("IV rank (1y)", f"{iv_hist['iv_rank']:.0f}" if pd.notna(iv_hist["iv_rank"]) else "–")
+m3.metric("IV percentile (1y)", f"{iv_hist['iv_percentile']:.0f}" if pd.notna(iv_hist["iv_percentile"]) else "–")
+m4.metric("Days recorded", int(iv_hist["days"]))
+st.caption(
+    "IV rank places the latest ATM IV between its 1-year low (0) and high (100); IV percentile is the share "
+    "of recorded days with a lower ATM IV. History builds up as the watchlist's chains are snapshotted locally."
+)
 
-work["AVG_IV"] = work[["C_IV","P_IV"]].mean(axis=1, skipna=True)
-work["DIST"] = (work["strike"] - S).abs()
+sections.end("iv_history")
+
+st.subheader("Option Chains")
+
+avg_iv = snap.avg_iv()
 
 N_LOCAL = 10
-valid = work[work["AVG_IV"].notna()]
-local = valid.nsmallest(min(N_LOCAL, len(valid)), "DIST")
+local = snap.nearest(S, N_LOCAL, valid=np.isfinite(avg_iv))
 
-ref_iv = float(local["AVG_IV"].median()) if len(local) > 0 else np.nan
+ref_iv = float(np.median(avg_iv[local])) if len(local) > 0 else np.nan
 
 if pd.isna(ref_iv) or ref_iv <= 0:
     st.warning("Not enough valid IV data near ATM to compute reference IV.")
     st.stop()
 
-work["IV_SCORE"] = (work["AVG_IV"] - ref_iv) / ref_iv
-work["IV_MULTIPLE"] = work["AVG_IV"] / ref_iv
+iv_score = (avg_iv - ref_iv) / ref_iv
+iv_multiple = avg_iv / ref_iv
 
 THRESH = 0.20
 amount = 15
 MULT_THRESH = 1.0 + THRESH
 
-rich = work[
-    work["IV_MULTIPLE"].notna() &
-    (work["IV_MULTIPLE"] >= MULT_THRESH)
-].copy()
+#richness against a fitted SVI smile of this expiry
+RISK_FREE = 0.04
+T = max((pd.Timestamp(exp) + pd.Timedelta(hours=16) - pd.Timestamp.now()).total_seconds(), 3600) / (365 * 86400)
+fit = svi.fit_chain(
+    stock, exp, snap.strikes, snap.cols["C_IV"], snap.cols["P_IV"], snap.mid("C"), snap.mid("P"),
+    S, T, RISK_FREE,
+)
+if fit is not None:
+    svi_iv = svi.smile_vol(fit, snap.strikes)
+else:
+    svi_iv = np.full(len(snap), np.nan)
+svi_resid = avg_iv - svi_iv
+chain_metrics = {
+    "AVG_IV": avg_iv, "IV_MULTIPLE": iv_multiple, "IV_SCORE": iv_score,
+    "SVI_IV": svi_iv, "SVI_RESID": svi_resid,
+}
+
+rich = np.flatnonzero(np.isfinite(iv_multiple) & (iv_multiple >= MULT_THRESH))
+rich = rich[np.argsort(-iv_multiple[rich], kind="stable")][:amount]
+
+@st.cache_data(ttl=300)
+def chain_frame(symbol: str, expiry: str, version=None):
+    quotes = market_data.chain_snapshot(symbol, expiry)
+    return quotes.take(quotes.quoted()).to_frame().fillna("")
 
-rich = rich.sort_values("IV_MULTIPLE", ascending=False).head(amount)
+#live quotes: redrawn on their own as soon as the cached chain is refreshed; the
+#analytics below follow on the next full rerun
+@st.fragment(run_every=LIVE_REFRESH)
+def chain_table(symbol: str, expiry: str):
+    version = market_data.chain_version(symbol, expiry)
+    st.dataframe(chain_frame(symbol, expiry, version), use_container_width=True, height=600)
+    if version is not None:
+        st.caption(f"Quotes as of {pd.Timestamp.fromtimestamp(version):%H:%M:%S}, checked every {LIVE_REFRESH} s.")
 
-st.dataframe(grid.fillna(""), use_container_width=True, height=600)
+chain_table(stock, exp)
 
 st.subheader("Insights: IV-rich strikes (relative to local ATM region)")
 st.caption(
@@ -259,6 +204,100 @@ st.caption(
 )
 
 st.dataframe(
-    rich[["strike", "AVG_IV", "IV_MULTIPLE", "IV_SCORE", "C_IV", "P_IV"]].fillna(""),
+    snap.to_frame(rich, ["strike", "AVG_IV", "IV_MULTIPLE", "IV_SCORE", "SVI_IV", "SVI_RESID", "C_IV", "P_IV"], **chain_metrics).fillna(""),
     use_container_width=True
-)
\ No newline at end of file
+)
+
+st.subheader("Insights: richness against the fitted SVI smile")
+if fit is None:
+    st.info("Not enough valid quotes to fit a smile for this expiration.")
+else:
+    st.caption(
+        "SVI_RESID is the strike’s implied volatility minus a raw-SVI smile fitted to this expiration’s "
+        "out-of-the-money quotes. Unlike IV_MULTIPLE it accounts for skew, so only strikes that stand out "
+        "from the smile’s shape show up as rich or cheap. "
+        f"Fit: forward {fit['forward']:.2f}, RMSE {fit['rmse_vol']:.2%} vol, {fit['iterations']} iterations"
+        f"{' (warm start)' if fit['warm_start'] else ''}, "
+        f"{'no' if fit['arbitrage_free'] else 'possible'} butterfly arbitrage in the fitted smile."
+    )
+    by_resid = np.flatnonzero(np.isfinite(svi_resid))
+    by_resid = by_resid[np.argsort(-svi_resid[by_resid], kind="stable")]
+    resid_cols = ["strike", "AVG_IV", "SVI_IV", "SVI_RESID", "IV_MULTIPLE"]
+    rich_col, cheap_col = st.columns(2)
+    with rich_col:
+        st.write("Richest to the smile")
+        st.dataframe(snap.to_frame(by_resid[:amount], resid_cols, **chain_metrics), use_container_width=True)
+    with cheap_col:
+        st.write("Cheapest to the smile")
+        st.dataframe(snap.to_frame(by_resid[::-1][:amount], resid_cols, **chain_metrics), use_container_width=True)
+
+sections.end("smile")
+
+@st.cache_data(ttl=300)
+def load_term_structure(symbol: str):
+    return variance_term.for_symbol(symbol, RISK_FREE)
+
+st.subheader("Model-free variance term structure")
+st.caption(
+    "Variance of every expiry from its out-of-the-money quotes with the CBOE VIX method (forward from put-call "
+    "parity, ΔK-weighted strip, zero-bid truncation), interpolated in total variance to constant maturities. "
+    "Vol points, so the 30-day value is this stock's VIX equivalent."
+)
+term = load_term_structure(stock)
+point_cols = st.columns(len(term["points"]))
+for col, (days, vol) in zip(point_cols, term["points"].items()):
+    col.metric(f"{days}-day", f"{vol:.2f}" if pd.notna(vol) else "–")
+st.dataframe(term["expiries"][["expiry", "dte", "forward", "K0", "strikes", "vol"]], use_container_width=True)
+
+sections.end("variance_term")
+
+@st.cache_data(ttl=300)
+def load_realized(symbol: str):
+    bars = realized_vol.load_bars(symbol)
+    return bars, realized_vol.estimators(bars, 21).tail(realized_vol.TRADING_DAYS)
+
+st.subheader("Realized vs implied volatility")
+st.caption(
+    "Realized volatility of the daily bars over 10/21/63 trading days with four estimators: close-to-close, "
+    "Parkinson (high-low range), Garman–Klass (range and open-close) and Yang–Zhang (adds overnight gaps). "
+    f"IV - Nd is this expiration's ATM reference IV ({ref_iv:.1%}) minus the realized vol: positive means "
+    "options are priced above the volatility the stock has actually delivered."
+)
+bars, rolling_rv = load_realized(stock)
+st.dataframe(realized_vol.snapshot(bars, ref_iv).style.format("{:.1%}"), use_container_width=True)
+rv_chart = rolling_rv.copy()
+recorded = chain_history.atm_iv([stock], rv_chart.index[0] if len(rv_chart) else pd.Timestamp.now())
+if len(recorded):
+    rv_chart.index = rv_chart.index.tz_localize(None) if rv_chart.index.tz is not None else rv_chart.index
+    rv_chart[f"ATM IV ({chain_history.ATM_DTE}d, recorded)"] = recorded.xs(stock, level="ticker").reindex(rv_chart.index)
+st.line_chart(rv_chart, use_container_width=True)
+
+sections.end("realized_vol")
+
+st.subheader("Static-arbitrage screen across expirations")
+div_yield = market_data.dividend_yield(stock)
+st.caption(
+    "Checks the whole expiry × strike surface for spreads that can be traded for a riskless profit at the "
+    "quoted bid/ask: call and put spread monotonicity and slope, butterfly convexity, calendar spreads at the "
+    "same strike, and American put-call parity bounds. The parity lower bound assumes the trailing 12-month "
+    f"dividend yield ({div_yield:.2%}) continues; special or changed dividends are not known to it. "
+    "Edge is per share before fees; stale or crossed quotes often show up here, so confirm against a live "
+    "quote before trading."
+)
+#a slider needs a range: with one or two expirations they are all scanned
+if len(expirations) > 2:
+    n_exp = st.slider("Expirations to scan", 2, len(expirations), min(len(expirations), 8))
+else:
+    n_exp = len(expirations)
+    st.caption(
+        f"{stock} lists {n_exp} expiration{'s' if n_exp != 1 else ''}; "
+        + ("calendar checks need at least two." if n_exp == 1 else "both are scanned.")
+    )
+edge_min = st.number_input("Minimum edge per share", min_value=0.0, value=0.01, step=0.01)
+arb_chains = {e: market_data.chain_snapshot(stock, e) for e in expirations[:n_exp]}
+violations = arbitrage.screen(arbitrage.surface(arb_chains), S, RISK_FREE, tol=edge_min, q=div_yield)
+if violations.empty:
+    st.success(f"No static-arbitrage violations above {edge_min:.2f} across {len(arb_chains)} expirations.")
+else:
+    st.dataframe(violations, use_container_width=True)
+sections.end("arbitrage")
@@ -0,0 +1,290 @@
+import argparse
+from contextlib import nullcontext
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+#offline load test: N simulated sessions per page, each running the page and then a
+#series of reruns after random widget changes, against fake_backend's data.
+#Every page runs in its own process (fresh caches, its own CPU and RSS numbers);
+#within it the sessions are threads, as on a Streamlit server.
+#
+#    python app/loadtest.py --sessions 1,2,4,8 --reruns 5 --latency 0.05
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(APP_DIR) #pages resolve assets relative to the repo root, as under `streamlit run app/app.py`
+PAGES = ["main_page", "market_overview", "option_modeling", "hedge", "pricing", "idea"]
+KINDS = ["selectbox", "radio", "select_slider", "multiselect", "slider", "number_input", "checkbox", "toggle", "button"]
+
+
+def _rss() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class PeakRSS:
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.peak = _rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, _rss())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss())
+        return False
+
+
+#AppTest swaps process-wide state (runtime singleton, secrets, config) around every
+#run and resets it afterwards, which breaks sessions running at the same time. Set
+#that state once for the process instead: one runtime, so st.cache_data is shared
+#between sessions like on a real server
+def _pin_apptest_globals():
+    import streamlit as st
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.secrets import Secrets
+    from streamlit.testing.v1 import app_test, util
+
+    runtime = app_test.MagicMock(spec=Runtime)
+    runtime.media_file_mgr = app_test.MediaFileManager(app_test.MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = app_test.MemoryCacheStorageManager()
+    Runtime._instance = runtime
+    #per-run writes go to a subclass attribute and no longer touch the shared instance
+    app_test.Runtime = type("Runtime", (Runtime,), {})
+
+    config.get_option = util.build_mock_config_get_option({"global.appTest": True})
+    app_test.patch_config_options = lambda overrides: nullcontext()
+
+    secrets = Secrets()
+    secrets._secrets = {"FINNHUB_API_KEY": "offline"}
+    st.secrets = secrets
+
+
+#around the widget's first value, so repeated changes cannot drift off to extremes
+def _number(w, rng: random.Random, initial: dict):
+    value = initial.setdefault(w.id, w.value)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    #Streamlit fills in its JS-safe number limits when the page gives no bound
+    lo, hi = (b if b is not None and abs(b) < 2**53 - 1 else None for b in (w.min, w.max))
+    if lo is not None and hi is not None:
+        new = rng.uniform(lo, hi)
+    elif value == 0:
+        new = rng.randint(0, 10) * (w.step or 1)
+    else:
+        new = value * rng.uniform(0.5, 1.5)
+    if lo is not None:
+        new = max(new, lo)
+    if hi is not None:
+        new = min(new, hi)
+    return int(round(new)) if isinstance(value, int) else new
+
+
+#one random widget change; False when the picked widget cannot be driven
+def interact(at, rng: random.Random, initial: dict) -> bool:
+    widgets = [(kind, w) for kind in KINDS for w in getattr(at, kind) if not w.disabled]
+    if not widgets:
+        return False
+    kind, w = rng.choice(widgets)
+    if kind == "button":
+        w.click()
+    elif kind in ("checkbox", "toggle"):
+        w.set_value(not w.value)
+    elif kind == "selectbox":
+        if not w.options:
+            return False
+        w.select_index(rng.randrange(len(w.options)))
+    elif kind in ("radio", "select_slider"):
+        if not w.options:
+            return False
+        w.set_value(rng.choice(w.options))
+    elif kind == "multiselect":
+        if not w.options:
+            return False
+        w.set_value(rng.sample(w.options, rng.randint(1, len(w.options))))
+    elif kind == "slider":
+        if not isinstance(w.value, (int, float)):
+            return False
+        steps = int((w.max - w.min) / w.step)
+        value = w.min + rng.randint(0, steps) * w.step
+        w.set_value(int(value) if isinstance(w.value, int) else value)
+    elif kind == "number_input":
+        value = _number(w, rng, initial)
+        if value is None:
+            return False
+        w.set_value(value)
+    return True
+
+
+def _session(path: str, reruns: int, think: float, seed: int, timeout: float, start: threading.Barrier, out: dict):
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed)
+    initial = {}
+    at = AppTest.from_file(path, default_timeout=timeout)
+    start.wait()
+    for i in range(reruns + 1):
+        if i and think > 0:
+            time.sleep(rng.expovariate(1.0 / think))
+        try:
+            if i and not interact(at, rng, initial):
+                out["skipped"] += 1
+        except Exception:
+            #a widget value the testing API cannot express; rerun unchanged
+            out["skipped"] += 1
+        t0 = time.perf_counter()
+        try:
+            at.run()
+        except Exception as e:
+            out["errors"].append(f"{type(e).__name__}: {e}")
+            return
+        out["latency"].append(time.perf_counter() - t0)
+        if at.exception:
+            out["errors"].append(at.exception[0].value)
+
+
+def _quantile(values: list, q: float) -> float:
+    values = sorted(values)
+    if not values:
+        return float("nan")
+    pos = q * (len(values) - 1)
+    lo = int(pos)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+
+def run_level(path: str, sessions: int, reruns: int, think: float, seed: int, timeout: float) -> dict:
+    outs = [{"latency": [], "errors": [], "skipped": 0} for _ in range(sessions)]
+    start = threading.Barrier(sessions + 1)
+    threads = [
+        threading.Thread(target=_session, args=(path, reruns, think, seed * 1000 + i, timeout, start, outs[i]), daemon=True)
+        for i in range(sessions)
+    ]
+    for t in threads:
+        t.start()
+    with PeakRSS() as rss:
+        start.wait()
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        for t in threads:
+            t.join()
+        wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+
+    latency = [x for o in outs for x in o["latency"]]
+    errors = [e for o in outs for e in o["errors"]]
+    return {
+        "sessions": sessions,
+        "reruns": len(latency),
+        "p50 ms": 1000 * _quantile(latency, 0.50),
+        "p95 ms": 1000 * _quantile(latency, 0.95),
+        "p99 ms": 1000 * _quantile(latency, 0.99),
+        "max ms": 1000 * max(latency, default=float("nan")),
+        "reruns/s": len(latency) / wall if wall > 0 else float("nan"),
+        "cpu cores": cpu / wall if wall > 0 else float("nan"),
+        "cpu ms/rerun": 1000 * cpu / len(latency) if latency else float("nan"),
+        "peak rss MB": rss.peak / 2**20,
+        "skipped": sum(o["skipped"] for o in outs),
+        "errors": len(errors),
+        "first error": errors[0][:200] if errors else "",
+    }
+
+
+#one page, every concurrency level, inside this process
+def worker(page: str, levels: list[int], reruns: int, think: float, latency: float, seed: int, timeout: float) -> list[dict]:
+    os.chdir(ROOT)
+    sys.path.insert(0, APP_DIR)
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    import fake_backend
+
+    fake_backend.install(latency)
+    _pin_apptest_globals()
+    path = os.path.join(APP_DIR, f"{page}.py")
+
+    #one untimed session first, so the levels measure warm caches rather than the first fetch
+    warm = run_level(path, 1, 0, 0.0, seed, timeout)
+    results = []
+    for n in levels:
+        results.append({"page": page, "cold ms": warm["p50 ms"]} | run_level(path, n, reruns, think, seed, timeout))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline concurrent-session load test of the OptionLab pages.")
+    parser.add_argument("--pages", default=",".join(PAGES), help="comma-separated page modules")
+    parser.add_argument("--sessions", default="1,2,4,8", help="comma-separated concurrency levels")
+    parser.add_argument("--reruns", type=int, default=5, help="random interactions per session after the first run")
+    parser.add_argument("--think", type=float, default=0.0, help="mean pause between interactions, seconds (0 = closed loop)")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated network latency per fake upstream call, seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=300.0, help="per-rerun timeout, seconds")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    levels = [int(n) for n in args.sessions.split(",") if n]
+
+    if args.worker:
+        results = worker(args.worker, levels, args.reruns, args.think, args.latency, args.seed, args.timeout)
+        with open(args.out, "w") as f:
+            json.dump(results, f)
+        #script threads of timed-out reruns may still be running; do not wait for them
+        sys.stdout.flush()
+        os._exit(0)
+
+    import pandas as pd
+
+    results = []
+    for page in [p.removesuffix(".py") for p in args.pages.split(",") if p]:
+        with tempfile.TemporaryDirectory(prefix="optionlab-load-") as tmp:
+            out = os.path.join(tmp, "results.json")
+            env = os.environ | {
+                "OPTIONLAB_CACHE_DIR": os.path.join(tmp, "cache"),
+                "OPTIONLAB_DATA_DIR": os.path.join(tmp, "data"),
+                "OPTIONLAB_RECORD_INTERVAL": "0",
+            }
+            cmd = [
+                sys.executable, os.path.abspath(__file__), "--worker", page, "--out", out,
+                "--sessions", args.sessions, "--reruns", str(args.reruns), "--think", str(args.think),
+                "--latency", str(args.latency), "--seed", str(args.seed), "--timeout", str(args.timeout),
+            ]
+            print(f"{page}: sessions {args.sessions} ...", file=sys.stderr, flush=True)
+            proc = subprocess.run(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+            if proc.returncode != 0:
+                print(f"{page}: worker failed\n{proc.stderr[-2000:]}", file=sys.stderr)
+                continue
+            with open(out) as f:
+                results.extend(json.load(f))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    table = pd.DataFrame(results)
+    if table.empty:
+        return
+    with pd.option_context("display.width", 200, "display.max_columns", None, "display.max_colwidth", 60):
+        print(table.drop(columns="first error").round(1).to_string(index=False))
+    failed = table[table["errors"] > 0]
+    for _, row in failed.iterrows():
+        print(f"{row['page']} x{row['sessions']}: {row['errors']} errors, first: {row['first error']}")
+
+
+if __name__ == "__main__":
+    main()
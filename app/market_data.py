@@ -0,0 +1,147 @@
+from collections import namedtuple
+import math
+import re
+
+import pandas as pd
+import yfinance as yf
+
+import disk_cache
+import metrics
+from chain_snapshot import ChainSnapshot
+import upstream
+
+OptionChain = namedtuple("OptionChain", ["calls", "puts"])
+
+
+def _period_days(period: str) -> float:
+    if period == "max":
+        return math.inf
+    if period == "ytd":
+        today = pd.Timestamp.today()
+        return (today - pd.Timestamp(year=today.year, month=1, day=1)).days + 1
+    m = re.fullmatch(r"(\d+)(d|wk|mo|y)", period)
+    if m is None:
+        raise ValueError(f"unsupported period: {period}")
+    n, unit = int(m.group(1)), m.group(2)
+    return n * {"d": 1, "wk": 7, "mo": 31, "y": 366}[unit]
+
+
+def _slice(frame: pd.DataFrame, period: str) -> pd.DataFrame:
+    if frame.empty or period == "max":
+        return frame
+    m = re.fullmatch(r"(\d+)d", period)
+    if m is not None:
+        #Yahoo counts "Nd" ranges in sessions, not calendar days
+        return frame.tail(int(m.group(1)))
+    cutoff = frame.index[-1] - pd.Timedelta(days=_period_days(period))
+    return frame[frame.index > cutoff]
+
+
+def _download(symbol: str, interval: str, **kwargs) -> pd.DataFrame:
+    frame = upstream.fetch(
+        "yfinance", ("history", symbol, interval) + tuple(sorted(kwargs.items())),
+        yf.Ticker(symbol).history, interval=interval, **kwargs
+    )
+    return frame if frame is not None else pd.DataFrame()
+
+
+#price history: served from disk while fresh; once stale only the bars from the
+#last stored one onwards are refetched (the last bar may have been partial)
+def history(symbol: str, period: str = "10d", interval: str = "1d") -> pd.DataFrame:
+    cache = disk_cache.get_cache()
+    key = f"{symbol}|{interval}"
+    entry, age = cache.get_any("history", key)
+
+    if entry is not None and _period_days(entry["period"]) >= _period_days(period):
+        frame = entry["frame"]
+        metrics.count(f"cache.history.{'stale' if age > cache.ttls['history'] else 'hit'}")
+        if age > cache.ttls["history"]:
+            tail = _download(symbol, interval, start=frame.index[-1])
+            if not tail.empty:
+                frame = pd.concat([frame[frame.index < tail.index[0]], tail])
+                frame = _slice(frame, entry["period"])
+            cache.put("history", key, {"period": entry["period"], "frame": frame})
+        return _slice(frame, period)
+
+    metrics.count("cache.history.miss")
+    frame = _download(symbol, interval, period=period)
+    if not frame.empty:
+        cache.put("history", key, {"period": period, "frame": frame})
+    return frame
+
+
+#trailing twelve-month dividends over the last close, as a continuous yield
+def dividend_yield(symbol: str) -> float:
+    hist = history(symbol, period="1y")
+    if hist is None or hist.empty or "Dividends" not in hist:
+        return 0.0
+    return math.log1p(float(hist["Dividends"].sum() / hist["Close"].iloc[-1]))
+
+
+#aligned closes for several symbols; days where any of them is missing are dropped
+def closes(symbols: list[str], period: str = "10y", interval: str = "1d") -> pd.DataFrame:
+    frames = {}
+    for symbol in symbols:
+        frame = history(symbol, period=period, interval=interval)
+        if not frame.empty:
+            series = frame["Close"].copy()
+            series.index = series.index.tz_localize(None) if series.index.tz is not None else series.index
+            frames[symbol] = series
+    if not frames:
+        return pd.DataFrame(columns=symbols)
+    return pd.DataFrame(frames).reindex(columns=symbols).dropna()
+
+
+def expirations(symbol: str) -> tuple:
+    cache = disk_cache.get_cache()
+    value = cache.get("expirations", symbol)
+    if value is None:
+        value = tuple(upstream.fetch("yfinance", ("options", symbol), lambda: yf.Ticker(symbol).options))
+        if value:
+            cache.put("expirations", symbol, value)
+    return value
+
+
+def option_chain(symbol: str, exp: str) -> OptionChain:
+    cache = disk_cache.get_cache()
+    key = f"{symbol}|{exp}"
+    value = cache.get("option_chain", key)
+    if value is None:
+        chain = upstream.fetch("yfinance", ("option_chain", symbol, exp), yf.Ticker(symbol).option_chain, exp)
+        value = OptionChain(chain.calls, chain.puts)
+        cache.put("option_chain", key, value)
+    return value
+
+
+
+#compact array form of a chain; cached on its own so a rerun unpickles a few
+#arrays instead of two object-heavy DataFrames
+@metrics.timed("chain.snapshot")
+def chain_snapshot(symbol: str, exp: str) -> ChainSnapshot:
+    cache = disk_cache.get_cache()
+    key = f"{symbol}|{exp}"
+    value = cache.get("chain_snapshot", key)
+    if value is None:
+        chain = option_chain(symbol, exp)
+        value = ChainSnapshot.from_chain(chain.calls, chain.puts)
+        cache.put("chain_snapshot", key, value)
+    return value
+
+
+#version of a cached dataset entry (its stored time), refreshing it first once it is
+#stale; live page regions poll this and only redo their work when it moved
+def _version(dataset: str, key: str, refresh):
+    cache = disk_cache.get_cache()
+    stored, age = cache.stamp(dataset, key)
+    if stored is None or age > cache.ttls.get(dataset, 0):
+        refresh()
+        stored, _ = cache.stamp(dataset, key)
+    return stored
+
+
+def history_version(symbol: str, period: str = "10d", interval: str = "1d"):
+    return _version("history", f"{symbol}|{interval}", lambda: history(symbol, period, interval))
+
+
+def chain_version(symbol: str, exp: str):
+    return _version("chain_snapshot", f"{symbol}|{exp}", lambda: chain_snapshot(symbol, exp))
@@ -1,11 +1,12 @@
-from bs4 import BeautifulSoup
 import streamlit as st
 import finnhub
-import pandas as pd
-import html
 import numpy as np
-import matplotlib.pyplot as plt
-import yfinance as yf
+import market_data
+import news_store
+import regime as regime_lib
+import sparkline
+import variance_term
+from regime import check_market_regime
 
 st.set_page_config(layout="wide")
 
@@ -147,25 +148,19 @@ client = finnhub.Client(api_key=st.secrets["FINNHUB_API_KEY"])
 
 
 #functions for news
-def html_to_text(s: str) -> str:
-    if not s:
-        return ""
-    s = html.unescape(s)              # turns &lt;div&gt; into <div>
-    soup = BeautifulSoup(s, "html.parser")
-    return soup.get_text(" ", strip=True)
-
-@st.cache_data(ttl=300)
-def get_news(category: str, limit: int) -> list[dict]:
-    items = client.general_news(category, min_id=0) or []
-    return items[:limit]
+def get_news(category: str, limit: int) -> list[str]:
+    return news_store.get_cards(client, category, limit)
 
 #functions for markets
+TILE_REFRESH = 60 #seconds between polls of the shared cache by the live regions
+
+#`version` (the cached history's stored time) is part of the cache key, so a poll
+#only recomputes a tile after its bars actually changed
 @st.cache_data(ttl=300)
-def fetch_tile_yf(symbol: str, period="10d", interval="1d"):
-    t = yf.Ticker(symbol)
-    hist = t.history(period=period, interval=interval)
+def fetch_tile_yf(symbol: str, version=None, period="10d", interval="1d"):
+    hist = market_data.history(symbol, period=period, interval=interval)
     if hist is None or hist.empty:
-        return 0.0, 0.0, 0.0, np.array([0.0, 0.0])
+        return 0.0, 0.0, 0.0, np.array([0.0, 0.0]), None
     closes = hist["Close"].dropna()
     last = float(closes.iloc[-1])
     if len(closes) >= 2:
@@ -175,20 +170,11 @@ def fetch_tile_yf(symbol: str, period="10d", interval="1d"):
     change = last - prev
     pct = (change / prev * 100.0) if prev else 0.0
     series = closes.to_numpy()[-80:]
-    return last, change, pct, series
-
-def sparkline(series: np.ndarray, change):
-    line_color = "#22c55e" if change >= 0 else "#ef4444"
-    fig, ax = plt.subplots(figsize=(3.2, 0.85))
-    ax.plot(series, linewidth=2.0, color=line_color)
-    ax.fill_between(np.arange(len(series)), series, np.min(series), alpha=0.18, color = line_color)
-    ax.set_axis_off()
-    fig.tight_layout(pad=0)
-    fig.patch.set_facecolor("#0E1117")
-    return fig
-
-def render_tile(title: str, symbol: str):
-    last, change, pct, series = fetch_tile_yf(symbol)
+    stamp = closes.index[-1]
+    return last, change, pct, series, stamp
+
+def render_tile(title: str, symbol: str, version=None):
+    last, change, pct, series, stamp = fetch_tile_yf(symbol, version)
     if change > 0:
         cls, sign = "pos", "+"
     elif change < 0:
@@ -209,16 +195,16 @@ def render_tile(title: str, symbol: str):
                 unsafe_allow_html=True,
             )
         with right:
-            fig = sparkline(series, change)
-            st.pyplot(fig, use_container_width=True)
-            plt.close(fig)
+            line_color = "#22c55e" if change >= 0 else "#ef4444"
+            st.markdown(
+                sparkline.cached_sparkline(symbol, stamp, line_color, series),
+                unsafe_allow_html=True,
+            )
 
-def change_step(x:float, small: float = 0.20):
-    if x>small:
-        return 1
-    elif x<-small:
-        return -1
-    return 0
+@st.cache_data(ttl=3600)
+def load_regime_report(period: str):
+    closes = market_data.closes(regime_lib.SYMBOLS, period=period)
+    return regime_lib.regime_report(closes)
 
 def text_info_color(pct_change):
     if pct_change > 0:
@@ -229,101 +215,16 @@ def text_info_color(pct_change):
         color = "#0E1117"
     return color
 
-@st.cache_data(ttl=300)
-def check_market_regime(
-        pct_spy: float, pct_qqq: float, pct_iwm: float,
-        pct_vxx: float, pct_tlt: float, pct_gld: float,
-        eps: float = 0.20
-):
-    SPY = change_step(pct_spy, eps)
-    QQQ = change_step(pct_qqq, eps)
-    IWM = change_step(pct_iwm, eps)
-    VXX = change_step(pct_vxx, eps)
-    TLT = change_step(pct_tlt, eps)
-    GLD = change_step(pct_gld, eps)
-
-    equities_up = (SPY == +1 and QQQ==+1)
-    equities_down = (SPY == -1 and QQQ==-1)
-
-    volatility_up = (VXX == +1)
-    volatility_down = (VXX == -1)
-
-    participation_up = (IWM == +1)
-    participation_down = (IWM == -1)
-
-    safety_bid = (TLT == +1)
-    macro_hedging = (GLD == +1)
-
-    if pct_gld>2.0:
-        regime = "Macro Hedge Rotation"
-        scenario = "Capital is rotating into macro hedges. Strong gold inflows indicate rising demand for protection, outweighing short-term equity dispersion and signaling a defensive market posture."
-        return regime, scenario
-    if equities_up and volatility_down:
-        regime = "Equity Expansion and Risk Acceptance"
-        if participation_up and not safety_bid:
-            scenario = "Broad-based risk appetite: equities are advancing with declining implied volatility and limited demand for defensive duration."
-        elif participation_down:
-            scenario = "Concentrated leadership: large caps are driving gains while small caps lag, suggesting narrower participation and a more fragile uptrend."
-        else:
-            scenario = "Risk-on with mixed cross-asset confirmation: trend remains constructive, but monitoring for volatility re-expansion is warranted."
-        return regime, scenario
-
-    if equities_up and volatility_up:
-        regime = "Risk acceptance with Elevated Volatility"
-        if safety_bid or macro_hedging:
-            scenario = "Risk assets are higher, but hedging demand persists: volatility is rising alongside a defensive bid, indicating elevated uncertainty beneath the rally."
-        else:
-            scenario = "Uptrend with volatility expansion: price action is positive, but risk premia are rising, consistent with an unstable or news-driven advance."
-        return regime, scenario
-
-    if equities_down and volatility_up:
-        regime = "Deleveraging Phase"
-        if safety_bid and macro_hedging:
-            scenario = "Systemic risk-off: equities are repricing lower as volatility spikes, accompanied by broad demand for safe-haven duration and macro hedges."
-        elif safety_bid:
-            scenario = "Classic flight-to-quality: equities are weakening while volatility rises and Treasuries rally, consistent with risk aversion and capital preservation."
-        else:
-            scenario = "Equity drawdown with limited duration support: volatility is rising without a meaningful Treasury bid, suggesting a rates/inflation-driven shock risk."
-        return regime, scenario
-
-    if equities_down and volatility_down:
-        regime = "Controlled De-risking"
-        if safety_bid:
-            scenario = "Orderly de-risking: equities are drifting lower with contained volatility and supportive duration, consistent with a controlled rotation into safety."
-        else:
-            scenario = "Low-vol weakness: equities are softer without a volatility spike, indicating complacent selling pressure that can transition quickly if a catalyst emerges."
-        return regime, scenario
-
-    regime = "Mixed Signals"
-    if (SPY != QQQ):
-        scenario = "Divergent leadership: SPY and QQQ are sending conflicting signals, implying an unsettled tape and reduced directional conviction."
-    elif VXX == 0:
-        scenario = "Volatility is broadly unchanged: markets are awaiting information, and near-term regime classification remains low confidence."
-    else:
-        scenario = "Cross-asset signals are mixed: confirmation is limited across risk and defensive assets, indicating a transitional environment."
-    return regime, scenario
-
 
 general_news = get_news("general", 2)
-crypto_news  = get_news("crypto", 2)
-merger_news = get_news("merger", 2)
-
-general1 = general_news[0]
-general2 = general_news[1]
-merger1 = merger_news[0]
-crypto1  = crypto_news[0]
+crypto_news  = get_news("crypto", 1)
+merger_news = get_news("merger", 1)
 
 
 st.markdown(
     "<h1 style='text-align: center;'>Market Overview</h1>",
     unsafe_allow_html=True
 )
-row1 = st.columns(3)
-row2 = st.columns(3)
-market_regime = st.container()
-col1, col2 = st.columns(2)
-col3, col4 = st.columns(2)
-
 tiles = [
     ("S&P 500 (SPY)", "SPY"),
     ("Nasdaq 100 (QQQ)", "QQQ"),
@@ -333,24 +234,34 @@ tiles = [
     ("Gold (GLD)", "GLD"),
 ]
 
-for i, (title, sym) in enumerate(tiles[:3]):
-    with row1[i]:
-        render_tile(title, sym)
-
-for i, (title, sym) in enumerate(tiles[3:]):
-    with row2[i]:
-        render_tile(title, sym)
+#live regions: each reruns on its own every TILE_REFRESH seconds instead of the whole page
+@st.fragment(run_every=TILE_REFRESH)
+def price_tiles():
+    row1 = st.columns(3)
+    row2 = st.columns(3)
+    for i, (title, sym) in enumerate(tiles[:3]):
+        with row1[i]:
+            render_tile(title, sym, market_data.history_version(sym))
+    for i, (title, sym) in enumerate(tiles[3:]):
+        with row2[i]:
+            render_tile(title, sym, market_data.history_version(sym))
+
+price_tiles()
+market_regime = st.container()
+col1, col2 = st.columns(2)
+col3, col4 = st.columns(2)
 
 
-with market_regime:
+@st.fragment(run_every=TILE_REFRESH)
+def regime_card():
     left, right = st.columns([1, 1])
     with left:
-        last_spy, change_spy, pct_spy, series_spy = fetch_tile_yf("SPY")
-        last_qqq, change_qqq, pct_qqq, series_qqq = fetch_tile_yf("QQQ")
-        last_iwm, change_iwm, pct_iwm, series_iwm = fetch_tile_yf("IWM")
-        last_vxx, change_vxx, pct_vxx, series_vxx = fetch_tile_yf("VXX")
-        last_tlt, change_tlt, pct_tlt, series_tlt = fetch_tile_yf("TLT")
-        last_gld, change_gld, pct_gld, series_gld = fetch_tile_yf("GLD")
+        last_spy, change_spy, pct_spy, series_spy, _ = fetch_tile_yf("SPY", market_data.history_version("SPY"))
+        last_qqq, change_qqq, pct_qqq, series_qqq, _ = fetch_tile_yf("QQQ", market_data.history_version("QQQ"))
+        last_iwm, change_iwm, pct_iwm, series_iwm, _ = fetch_tile_yf("IWM", market_data.history_version("IWM"))
+        last_vxx, change_vxx, pct_vxx, series_vxx, _ = fetch_tile_yf("VXX", market_data.history_version("VXX"))
+        last_tlt, change_tlt, pct_tlt, series_tlt, _ = fetch_tile_yf("TLT", market_data.history_version("TLT"))
+        last_gld, change_gld, pct_gld, series_gld, _ = fetch_tile_yf("GLD", market_data.history_version("GLD"))
         regime, scenario = check_market_regime(pct_spy,pct_qqq,pct_iwm,pct_vxx,pct_tlt,pct_gld)
         color_spy = text_info_color(pct_spy)
         color_qqq = text_info_color(pct_qqq)
@@ -383,115 +294,48 @@ with market_regime:
         </div>
         """, unsafe_allow_html=True)
 
+with market_regime:
+    regime_card()
 
-with col1:
-    clean_summary = html.escape(html_to_text(general1.get("summary", "")))
-    safe_title = html.escape(general1["headline"])
-    safe_url = html.escape(general1["url"], quote=True)
+with market_regime:
+    if st.toggle("Show regime history"):
+        period = st.selectbox("History", ["2y", "5y", "10y"], index=2)
+        report = load_regime_report(period)
+        labels = report["labels"]
+        if labels.empty:
+            st.warning("Not enough price history to classify regimes.")
+        else:
+            st.caption(
+                f"{len(labels)} trading days from {labels.index[0]:%Y-%m-%d} to {labels.index[-1]:%Y-%m-%d}, "
+                "classified with the same rules as today's regime."
+            )
+            st.markdown("**Regime durations (trading days)**")
+            st.dataframe(report["durations"].round(2), use_container_width=True)
+            st.markdown("**Next-day transition probabilities**")
+            st.dataframe(report["transitions"].round(2), use_container_width=True)
+            st.markdown("**Forward SPY returns by regime**")
+            st.dataframe(report["forward"].round(2), use_container_width=True)
 
-    st.markdown("""
-    <div class="card">
-      <div class="row">
-        <div>
-          <div class="tag">GENERAL</div>
-          <div class="tag">""" + html.escape(general1["source"].upper()) + """</div>
-        </div>
-        <div>
-          <div class="title">
-            <a href=\"""" + safe_url + """\" target="_blank">
-            """ + safe_title + """
-            </a>
-          </div>
-          <div class="muted">""" +
-            pd.to_datetime(general1["datetime"], unit="s").strftime("%Y-%m-%d %H:%M")
-          + """</div>
-        </div>
-      </div>
-
-      <div class="summary">""" + clean_summary + """</div>
-    </div>
-    """, unsafe_allow_html=True)
-
-with col2:
-    clean_summary = html.escape(html_to_text(merger1.get("summary", "")))
-    safe_title = html.escape(merger1["headline"])
-    safe_url = html.escape(merger1["url"], quote=True)
-
-    st.markdown("""
-    <div class="card">
-      <div class="row">
-        <div>
-          <div class="tag">MERGER</div>
-          <div class="tag">""" + html.escape(merger1["source"].upper()) + """</div>
-        </div>
-        <div>
-          <div class="title">
-            <a href=\"""" + safe_url + """\" target="_blank">
-            """ + safe_title + """
-            </a>
-          </div>
-          <div class="muted">""" +
-            pd.to_datetime(merger1["datetime"], unit="s").strftime("%Y-%m-%d %H:%M")
-          + """</div>
-        </div>
-      </div>
-
-      <div class="summary">""" + clean_summary + """</div>
-    </div>
-    """, unsafe_allow_html=True)
-
-with col3:
-    clean_summary = html.escape(html_to_text(general2.get("summary", "")))
-    safe_title = html.escape(general2["headline"])
-    safe_url = html.escape(general2["url"], quote=True)
-
-    st.markdown("""
-    <div class="card">
-      <div class="row">
-        <div>
-          <div class="tag">GENERAL</div>
-          <div class="tag">""" + html.escape(general2["source"].upper()) + """</div>
-        </div>
-        <div>
-          <div class="title">
-            <a href=\"""" + safe_url + """\" target="_blank">
-            """ + safe_title + """
-            </a>
-          </div>
-          <div class="muted">""" +
-            pd.to_datetime(general2["datetime"], unit="s").strftime("%Y-%m-%d %H:%M")
-          + """</div>
-        </div>
-      </div>
-
-      <div class="summary">""" + clean_summary + """</div>
-    </div>
-    """, unsafe_allow_html=True)
-
-with col4:
-    clean_summary = html.escape(html_to_text(crypto1.get("summary", "")))
-    safe_title = html.escape(crypto1["headline"])
-    safe_url = html.escape(crypto1["url"], quote=True)
-
-    st.markdown("""
-    <div class="card">
-      <div class="row">
-        <div>
-          <div class="tag">CRYPTO</div>
-          <div class="tag">""" + html.escape(crypto1["source"].upper()) + """</div>
-        </div>
-        <div>
-          <div class="title">
-            <a href=\"""" + safe_url + """\" target="_blank">
-            """ + safe_title + """
-            </a>
-          </div>
-          <div class="muted">""" +
-            pd.to_datetime(crypto1["datetime"], unit="s").strftime("%Y-%m-%d %H:%M")
-          + """</div>
-        </div>
-      </div>
+@st.cache_data(ttl=300)
+def load_vol_term(symbols: tuple):
+    return variance_term.universe(symbols, r=0.04)
 
-      <div class="summary">""" + clean_summary + """</div>
-    </div>
-    """, unsafe_allow_html=True)
\ No newline at end of file
+with market_regime:
+    if st.toggle("Show volatility term structure"):
+        st.caption(
+            "Model-free implied volatility (CBOE VIX method) at constant 30/60/90-day maturities from each "
+            "ETF's option chains. A positive 90d-30d slope (contango) is the calm norm; an inverted curve "
+            "means near-term stress is priced above the long run."
+        )
+        st.dataframe(load_vol_term(("SPY", "QQQ", "IWM", "TLT", "GLD")).round(2), use_container_width=True)
+
+news_cards = [
+    (col1, general_news[0:1]),
+    (col2, merger_news[0:1]),
+    (col3, general_news[1:2]),
+    (col4, crypto_news[0:1]),
+]
+for col, cards in news_cards:
+    with col:
+        for card in cards:
+            st.markdown(card, unsafe_allow_html=True)
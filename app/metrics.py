@@ -0,0 +1,227 @@
+from bisect import bisect_left
+from contextlib import nullcontext
+import functools
+import json
+import os
+import threading
+import time
+
+ENABLED = os.environ.get("OPTIONLAB_METRICS", "0").lower() in ("1", "true", "yes")
+DUMP_DIR = os.environ.get("OPTIONLAB_METRICS_DUMP", "") #metrics.json / metrics.prom are rewritten here
+DUMP_INTERVAL = 15.0 #seconds
+
+#log-spaced latency buckets (upper bounds in seconds), 1us .. ~20min, 20% apart
+BUCKETS = [1e-6 * 1.2 ** i for i in range(115)]
+EXPOSED = BUCKETS[::4] #coarser bounds for the Prometheus histogram
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    #linear interpolation inside the bucket holding the q-th observation
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lo = BUCKETS[i - 1] if i > 0 else 0.0
+                hi = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(lo + (hi - lo) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_in_flight = {}
+
+
+def observe(name: str, seconds: float):
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = Histogram()
+        hist.observe(seconds)
+
+
+def count(name: str, n: int = 1):
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        with _lock:
+            _in_flight[self.name] = _in_flight.get(self.name, 0) + 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        with _lock:
+            _in_flight[self.name] -= 1
+            hist = _histograms.get(self.name)
+            if hist is None:
+                hist = _histograms[self.name] = Histogram()
+            hist.observe(elapsed)
+        return False
+
+
+_NOOP = nullcontext()
+
+
+#timing span: latency histogram plus an in-flight gauge under `name`
+def span(name: str):
+    return _Span(name) if ENABLED else _NOOP
+
+
+#decorator form of span; when disabled the function is returned untouched
+def timed(name: str):
+    def wrap(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with _Span(name):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+#consecutive page sections without re-indenting the page: every end(label) records
+#the time since the previous one as "<page>.<label>"
+class Sections:
+    def __init__(self, page: str):
+        self.page = page
+        self.last = time.perf_counter()
+
+    def end(self, label: str):
+        if not ENABLED:
+            return
+        now = time.perf_counter()
+        observe(f"{self.page}.{label}", now - self.last)
+        self.last = now
+
+
+def sections(page: str) -> Sections:
+    return Sections(page)
+
+
+def snapshot() -> dict:
+    with _lock:
+        spans = {}
+        #spans still running for the first time have no histogram yet
+        for name in sorted(set(_histograms) | {n for n, v in _in_flight.items() if v}):
+            h = _histograms.get(name) or Histogram()
+            spans[name] = {
+                "count": h.count,
+                "sum": h.total,
+                "mean": h.total / h.count if h.count else 0.0,
+                "max": h.max,
+                **{f"p{int(q * 100)}": h.quantile(q) for q in QUANTILES},
+                "in_flight": _in_flight.get(name, 0),
+            }
+        return {"enabled": ENABLED, "time": time.time(), "spans": spans, "counters": dict(sorted(_counters.items()))}
+
+
+def to_json() -> str:
+    return json.dumps(snapshot(), indent=2)
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+#Prometheus text exposition format
+def to_prometheus() -> str:
+    with _lock:
+        hists = {name: (list(h.counts), h.count, h.total) for name, h in sorted(_histograms.items())}
+        counters = dict(sorted(_counters.items()))
+        flight = dict(sorted(_in_flight.items()))
+    lines = [
+        "# HELP optionlab_span_seconds Latency of instrumented spans.",
+        "# TYPE optionlab_span_seconds histogram",
+    ]
+    for name, (counts, n, total) in hists.items():
+        cumulative, i = 0, 0
+        for bound in EXPOSED:
+            while i < len(BUCKETS) and BUCKETS[i] <= bound:
+                cumulative += counts[i]
+                i += 1
+            lines.append(f'optionlab_span_seconds_bucket{{span="{_label(name)}",le="{bound:.6g}"}} {cumulative}')
+        lines.append(f'optionlab_span_seconds_bucket{{span="{_label(name)}",le="+Inf"}} {n}')
+        lines.append(f'optionlab_span_seconds_sum{{span="{_label(name)}"}} {total:.9g}')
+        lines.append(f'optionlab_span_seconds_count{{span="{_label(name)}"}} {n}')
+    lines += ["# HELP optionlab_in_flight Spans currently running.", "# TYPE optionlab_in_flight gauge"]
+    lines += [f'optionlab_in_flight{{span="{_label(name)}"}} {n}' for name, n in flight.items()]
+    lines += ["# HELP optionlab_events_total Event counters (cache hits/misses, ...).", "# TYPE optionlab_events_total counter"]
+    lines += [f'optionlab_events_total{{event="{_label(name)}"}} {n}' for name, n in counters.items()]
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def _write(path: str, text: str):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def dump(directory: str = DUMP_DIR):
+    os.makedirs(directory, exist_ok=True)
+    _write(os.path.join(directory, "metrics.json"), to_json())
+    _write(os.path.join(directory, "metrics.prom"), to_prometheus())
+
+
+_dumper = None
+_dumper_lock = threading.Lock()
+
+
+#rewrites the dump files every DUMP_INTERVAL seconds (e.g. for node_exporter's
+#textfile collector); a no-op unless metrics and OPTIONLAB_METRICS_DUMP are set
+def start_dumper():
+    global _dumper
+    if not (ENABLED and DUMP_DIR):
+        return
+    with _dumper_lock:
+        if _dumper is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(DUMP_INTERVAL)
+                try:
+                    dump()
+                except OSError:
+                    pass
+
+        _dumper = threading.Thread(target=loop, name="metrics-dump", daemon=True)
+        _dumper.start()
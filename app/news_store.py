@@ -0,0 +1,129 @@
+from collections import deque
+import html
+import threading
+import time
+
+from bs4 import BeautifulSoup
+import pandas as pd
+
+import disk_cache
+import upstream
+
+BUFFER_SIZE = 50 #cards kept per category
+POLL_INTERVAL = disk_cache.TTLS["news"] #seconds between polls of the same category
+
+
+def html_to_text(s: str) -> str:
+    if not s:
+        return ""
+    s = html.unescape(s)              # turns &lt;div&gt; into <div>
+    soup = BeautifulSoup(s, "html.parser")
+    return soup.get_text(" ", strip=True)
+
+
+def render_card(item: dict, tag: str) -> str:
+    summary = html.escape(html_to_text(item.get("summary", "")))
+    title = html.escape(item.get("headline", ""))
+    url = html.escape(item.get("url", ""), quote=True)
+    source = html.escape(item.get("source", "").upper())
+    stamp = pd.to_datetime(item.get("datetime", 0), unit="s").strftime("%Y-%m-%d %H:%M")
+    return f"""
+    <div class="card">
+      <div class="row">
+        <div>
+          <div class="tag">{html.escape(tag)}</div>
+          <div class="tag">{source}</div>
+        </div>
+        <div>
+          <div class="title">
+            <a href="{url}" target="_blank">
+            {title}
+            </a>
+          </div>
+          <div class="muted">{stamp}</div>
+        </div>
+      </div>
+
+      <div class="summary">{summary}</div>
+    </div>
+    """
+
+
+#one ring buffer of pre-rendered cards per category, newest first; each poll
+#asks Finnhub only for ids above the last one seen
+class NewsStore:
+    def __init__(self, buffer_size: int = BUFFER_SIZE, poll_interval: float = POLL_INTERVAL):
+        self.buffer_size = buffer_size
+        self.poll_interval = poll_interval
+        self._cards = {}
+        self._last_id = {}
+        self._polled_at = {}
+        self._lock = threading.Lock()
+
+    def _load(self, category: str):
+        if category in self._cards:
+            return
+        state, _ = disk_cache.get_cache().get_any("news", category)
+        cards = deque(maxlen=self.buffer_size)
+        last_id = 0
+        if isinstance(state, dict):
+            cards.extend(state["cards"])
+            last_id = state["last_id"]
+        self._cards[category] = cards
+        self._last_id[category] = last_id
+        self._polled_at[category] = 0.0
+
+    def ingest(self, category: str, items: list[dict]) -> int:
+        with self._lock:
+            self._load(category)
+            cards = self._cards[category]
+            seen = {c["id"] for c in cards}
+            fresh = {}
+            for item in items:
+                item_id = item.get("id")
+                if item_id is None or item_id in seen or item_id in fresh:
+                    continue
+                fresh[item_id] = {
+                    "id": item_id,
+                    "datetime": item.get("datetime", 0),
+                    "html": render_card(item, category.upper()),
+                }
+            if not fresh:
+                return 0
+            merged = sorted(list(cards) + list(fresh.values()), key=lambda c: (c["datetime"], c["id"]), reverse=True)
+            self._cards[category] = deque(merged[:self.buffer_size], maxlen=self.buffer_size)
+            self._last_id[category] = max(self._last_id[category], max(fresh))
+            state = {"cards": list(self._cards[category]), "last_id": self._last_id[category]}
+        disk_cache.get_cache().put("news", category, state)
+        return len(fresh)
+
+    def poll(self, client, category: str, force: bool = False) -> int:
+        with self._lock:
+            self._load(category)
+            if not force and time.time() - self._polled_at[category] < self.poll_interval:
+                return 0
+            self._polled_at[category] = time.time()
+            min_id = self._last_id[category]
+        items = upstream.fetch(
+            "finnhub", ("general_news", category, min_id),
+            client.general_news, category, min_id=min_id
+        ) or []
+        return self.ingest(category, items)
+
+    def latest(self, category: str, limit: int) -> list[str]:
+        with self._lock:
+            self._load(category)
+            return [c["html"] for c in list(self._cards[category])[:limit]]
+
+
+_store = NewsStore()
+
+
+def get_cards(client, category: str, limit: int) -> list[str]:
+    try:
+        _store.poll(client, category)
+    except Exception:
+        #keep serving the cards we already have if Finnhub is unavailable
+        if not _store.latest(category, limit):
+            raise
+    return _store.latest(category, limit)
@@ -0,0 +1,253 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+
+import metrics
+import strategy as strat
+import strategy_stats
+
+#legs as (kind, quantity) in ascending strike order
+TEMPLATES = {
+    "Bull Call Spread": [("call", 1), ("call", -1)],
+    "Bear Call Spread (credit)": [("call", -1), ("call", 1)],
+    "Bear Put Spread": [("put", -1), ("put", 1)],
+    "Bull Put Spread (credit)": [("put", 1), ("put", -1)],
+    "Long Call Butterfly": [("call", 1), ("call", -2), ("call", 1)],
+    "Long Put Butterfly": [("put", 1), ("put", -2), ("put", 1)],
+    "Iron Condor": [("put", 1), ("put", -1), ("call", -1), ("call", 1)],
+}
+
+OBJECTIVES = {
+    "Expected P&L / max loss": "exp_to_loss",
+    "Expected P&L": "expected",
+    "Probability of profit": "pop",
+    "Max profit / max loss": "reward_to_risk",
+}
+
+BATCH_SIZE = 50_000 #combinations evaluated per NumPy batch
+PARALLEL_MIN = 200_000 #below this many combinations a process pool costs more than it saves
+
+
+#liquid quotes of one side of the chain as sorted arrays
+def quotes(side: pd.DataFrame, min_oi: int = 0, max_spread: float = 0.5) -> dict:
+    bid = side["bid"].to_numpy(dtype=float)
+    ask = side["ask"].to_numpy(dtype=float)
+    oi = side["openInterest"].fillna(0).to_numpy(dtype=float)
+    mid = 0.5 * (bid + ask)
+    ok = (bid > 0) & (ask >= bid) & (oi >= min_oi) & ((ask - bid) <= max_spread * mid)
+    order = np.argsort(side["strike"].to_numpy(dtype=float)[ok], kind="stable")
+    return {
+        "strike": side["strike"].to_numpy(dtype=float)[ok][order],
+        "bid": bid[ok][order],
+        "ask": ask[ok][order],
+        "iv": side["impliedVolatility"].to_numpy(dtype=float)[ok][order],
+    }
+
+
+def _pairs(K: np.ndarray, max_width: float):
+    i, j = np.triu_indices(len(K), 1)
+    keep = (K[j] - K[i]) <= max_width
+    return i[keep], j[keep]
+
+
+#index matrices (n, legs) into each leg's quote arrays, yielded in batches
+def _combinations(template: str, calls: dict, puts: dict, S0: float, max_width: float, batch_size: int):
+    if template in ("Bull Call Spread", "Bear Call Spread (credit)", "Bear Put Spread", "Bull Put Spread (credit)"):
+        side = calls if TEMPLATES[template][0][0] == "call" else puts
+        i, j = _pairs(side["strike"], max_width)
+        for start in range(0, len(i), batch_size):
+            yield np.stack([i[start:start + batch_size], j[start:start + batch_size]], axis=1)
+
+    elif template in ("Long Call Butterfly", "Long Put Butterfly"):
+        side = calls if template == "Long Call Butterfly" else puts
+        K = side["strike"]
+        i, j = _pairs(K, max_width / 2)
+        #equal wings: the upper strike has to be listed exactly
+        k = np.searchsorted(K, 2 * K[j] - K[i])
+        k = np.minimum(k, len(K) - 1)
+        ok = np.isclose(K[k], 2 * K[j] - K[i]) & (k > j)
+        idx = np.stack([i[ok], j[ok], k[ok]], axis=1)
+        for start in range(0, len(idx), batch_size):
+            yield idx[start:start + batch_size]
+
+    elif template == "Iron Condor":
+        pi, pj = _pairs(puts["strike"], max_width)
+        ok = puts["strike"][pj] <= S0 #short put out of the money
+        pi, pj = pi[ok], pj[ok]
+        ci, cj = _pairs(calls["strike"], max_width)
+        ok = calls["strike"][ci] >= S0 #short call out of the money
+        ci, cj = ci[ok], cj[ok]
+        if len(pi) == 0 or len(ci) == 0:
+            return
+        step = max(1, batch_size // len(ci))
+        for start in range(0, len(pi), step):
+            a, b = pi[start:start + step], pj[start:start + step]
+            yield np.column_stack([
+                np.repeat(a, len(ci)), np.repeat(b, len(ci)),
+                np.tile(ci, len(a)), np.tile(cj, len(a)),
+            ])
+    else:
+        raise ValueError(f"unknown template: {template}")
+
+
+def _price_batch(template: str, idx: np.ndarray, calls: dict, puts: dict):
+    legs = TEMPLATES[template]
+    strikes = np.empty(idx.shape)
+    F = np.empty(idx.shape)
+    G = np.empty(idx.shape)
+    cost = np.zeros(len(idx))
+    for col, (kind, qty) in enumerate(legs):
+        side = calls if kind == "call" else puts
+        strikes[:, col] = side["strike"][idx[:, col]]
+        F[:, col] = side["F"][idx[:, col]]
+        G[:, col] = side["G"][idx[:, col]]
+        #buy at the ask, sell at the bid
+        cost += qty * (side["ask"] if qty > 0 else side["bid"])[idx[:, col]]
+    return strikes, cost, F, G
+
+
+#exact expiry metrics of a batch: P&L of every combination at each of its kinks
+def evaluate_batch(job: dict) -> dict:
+    legs = TEMPLATES[job["template"]]
+    strikes, cost = job["strikes"], job["cost"]
+    is_call = np.array([kind == "call" for kind, _ in legs])
+    qty = np.array([q for _, q in legs], dtype=float)
+
+    zeros = np.zeros((len(strikes), 1))
+    kinks = np.concatenate([zeros, strikes], axis=1)
+    values = np.repeat(-cost[:, None], kinks.shape[1], axis=1)
+    for col in range(len(legs)):
+        K = strikes[:, col:col + 1]
+        values += qty[col] * (np.maximum(kinks - K, 0.0) if is_call[col] else np.maximum(K - kinks, 0.0))
+    slope_up = float(qty[is_call].sum())
+
+    max_profit = values.max(axis=1) if slope_up <= 0 else np.full(len(values), np.inf)
+    max_loss = values.min(axis=1) if slope_up >= 0 else np.full(len(values), -np.inf)
+    expected, pop = strategy_stats.batch_stats(
+        kinks, values, slope_up, job["m"], job["s"],
+        np.concatenate([zeros, job["F"]], axis=1), np.concatenate([zeros, job["G"]], axis=1),
+    )
+
+    risk = np.where(max_loss < 0, -max_loss, np.nan)
+    scores = {
+        "exp_to_loss": expected / risk,
+        "expected": expected,
+        "pop": pop,
+        "reward_to_risk": max_profit / risk,
+    }
+    score = np.nan_to_num(scores[job["objective"]], nan=-np.inf)
+
+    top = np.argpartition(-score, job["top_n"] - 1)[:job["top_n"]] if len(score) > job["top_n"] else np.arange(len(score))
+    return {
+        "strikes": strikes[top], "cost": cost[top], "max_profit": max_profit[top],
+        "max_loss": max_loss[top], "expected": expected[top], "pop": pop[top], "score": score[top],
+        "order": job["offset"] + top,
+    }
+
+
+#best top_n rows of two partial results; ties go to the combination generated first
+def _merge(best: dict | None, res: dict, top_n: int) -> dict:
+    if best is not None:
+        res = {key: np.concatenate([best[key], res[key]]) for key in res}
+    keep = np.lexsort((res["order"], -res["score"]))[:top_n]
+    return {key: value[keep] for key, value in res.items()}
+
+
+def _describe(template: str, strikes: np.ndarray) -> str:
+    return " / ".join(
+        f"{qty:+d} {kind[0].upper()} {K:g}" for (kind, qty), K in zip(TEMPLATES[template], strikes)
+    )
+
+
+@metrics.timed("pricing.optimize")
+def optimize(
+    template: str,
+    calls: pd.DataFrame,
+    puts: pd.DataFrame,
+    S0: float,
+    sigma: float,
+    T: float,
+    r: float = 0.0,
+    objective: str = "Expected P&L / max loss",
+    max_width: float = 20.0,
+    max_cost: float | None = None, #largest net debit accepted
+    min_oi: int = 0,
+    max_spread: float = 0.5, #(ask - bid) / mid
+    top_n: int = 20,
+    workers: int | None = None,
+):
+    call_q = quotes(calls, min_oi, max_spread)
+    put_q = quotes(puts, min_oi, max_spread)
+    m, s = strategy_stats.lognormal_params(S0, sigma, T, r)
+    #every kink is a listed strike, so the lognormal CDF is computed once per strike
+    for side in (call_q, put_q):
+        side["F"], side["G"] = strategy_stats.cdf_terms(side["strike"], m, s)
+
+    count = [0] #combinations passing the filters, updated as batches are generated
+
+    def jobs():
+        for idx in _combinations(template, call_q, put_q, S0, max_width, BATCH_SIZE):
+            strikes, cost, F, G = _price_batch(template, idx, call_q, put_q)
+            if max_cost is not None:
+                keep = cost <= max_cost
+                strikes, cost, F, G = strikes[keep], cost[keep], F[keep], G[keep]
+            if len(cost) == 0:
+                continue
+            offset = count[0]
+            count[0] += len(cost)
+            yield {
+                "template": template, "strikes": strikes, "cost": cost, "F": F, "G": G, "m": m, "s": s,
+                "objective": OBJECTIVES[objective], "top_n": top_n, "offset": offset,
+            }
+
+    #batches are evaluated as they are generated and only the running top_n is kept,
+    #so memory follows the batch size rather than the size of the search space
+    stream = jobs()
+    head = []
+    for job in stream:
+        head.append(job)
+        if count[0] >= PARALLEL_MIN:
+            break
+    stream = itertools.chain(head, stream)
+
+    best = None
+    workers = workers if workers is not None else (os.cpu_count() or 1)
+    if workers > 1 and count[0] >= PARALLEL_MIN:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            for job in stream:
+                pending.add(pool.submit(evaluate_batch, job))
+                #a bounded number of batches in flight
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        best = _merge(best, future.result(), top_n)
+            for future in pending:
+                best = _merge(best, future.result(), top_n)
+    else:
+        for job in stream:
+            best = _merge(best, evaluate_batch(job), top_n)
+
+    n_total = count[0]
+    if best is None:
+        return pd.DataFrame(), n_total
+    rows = []
+    for i in range(len(best["score"])):
+        legs = [
+            strat.Leg(kind, qty, K, 0.0) for (kind, qty), K in zip(TEMPLATES[template], best["strikes"][i])
+        ]
+        legs[0].premium = best["cost"][i] / legs[0].quantity #net premium carried on one leg
+        rows.append({
+            "legs": _describe(template, best["strikes"][i]),
+            "net cost": best["cost"][i],
+            "max profit": best["max_profit"][i],
+            "max loss": best["max_loss"][i],
+            "expected P&L": best["expected"][i],
+            "P(profit)": best["pop"][i],
+            "breakevens": ", ".join(f"{be:.2f}" for be in strat.analyze(legs).breakevens),
+            objective: best["score"][i],
+        })
+    return pd.DataFrame(rows), n_total
@@ -1,6 +1,11 @@
 import streamlit as st
 import numpy as np
+import pandas as pd
 import matplotlib.pyplot as plt
+import market_data
+import optimizer
+import strategy as strat
+import strategy_stats
 
 st.set_page_config(layout="wide")
 st.markdown(
@@ -9,172 +14,318 @@ st.markdown(
 )
 strategy = st.selectbox(
     "Choose strategy",
-    ["Long Call", "Long Put", "Long Butterfly", "Short Butterfly"]
+    [
+        "Long Call", "Long Put", "Bull Call Spread", "Bear Put Spread",
+        "Long Butterfly", "Short Butterfly", "Long Straddle", "Short Strangle",
+        "Iron Condor", "Call Ratio Spread", "Covered Call", "Custom",
+    ]
 )
 
-if strategy == "Long Call":
-    S0 = st.number_input("Current underlying price (S₀)", value=100.0, step=1.0)
-    K = st.number_input("Strike (K)", value=S0 + 5, step=1.0)
-    premium = st.number_input("Premium paid (p)", value=5.0, min_value=0.0, step=0.5)
-    iv = st.number_input("Implied vol (annual, %)", value=20.0, min_value=0.0, step=1.0)
-    dte = st.number_input("Days to expiry", value=30, min_value=1)
-    k = st.slider("k (number of sigmas)", 1.0, 3.0, 2.0)
-    sigma = iv / 100.0
-    T = dte / 365.0
-    band_low = S0 * np.exp(-k * sigma * np.sqrt(T))
-    band_high = S0 * np.exp(k * sigma * np.sqrt(T))
-    n_points = 5000
-    S = np.linspace(band_low, band_high, n_points)
-    profit = np.maximum(S - K, 0.0) - premium
-    breakeven = K + premium
-
-elif strategy == "Long Put":
-    S0 = st.number_input("Current underlying price (S₀)", value=100.0, step=1.0)
+S0 = st.number_input("Current underlying price (S₀)", value=100.0, step=1.0)
+
+def premium_input(kind: str, K: float, value: float):
+    return st.number_input(f"Premium {kind} for ${K} option", value=value, min_value=0.0, step=0.5)
+
+if strategy in ("Long Call", "Long Put"):
     K = st.number_input("Strike (K)", value=S0 + 5, step=1.0)
     premium = st.number_input("Premium paid (p)", value=5.0, min_value=0.0, step=0.5)
-    iv = st.number_input("Implied vol (annual, %)", value=20.0, min_value=0.0, step=1.0)
-    dte = st.number_input("Days to expiry", value=30, min_value=1)
-    k = st.slider("k (number of sigmas)", 1.0, 3.0, 2.0)
-    sigma = iv / 100.0
-    T = dte / 365.0
-    band_low = S0 * np.exp(-k * sigma * np.sqrt(T))
-    band_high = S0 * np.exp(k * sigma * np.sqrt(T))
-    n_points = 5000
-    S = np.linspace(band_low, band_high, n_points)
-    profit = np.maximum(K - S, 0.0) - premium
-    breakeven = K - premium
-
-elif strategy == "Long Butterfly":
-    S0 = st.number_input("Current underlying price (S₀)", value=100.0, step=1.0)
+    legs = strat.long_call(K, premium) if strategy == "Long Call" else strat.long_put(K, premium)
+
+elif strategy in ("Bull Call Spread", "Bear Put Spread"):
+    kind = "Call" if strategy == "Bull Call Spread" else "Put"
+    w = st.number_input("Spread width", value=10.0, step=1.0, min_value=1.0)
+    K_long = st.number_input("Long strike", value=float(round(S0)), step=1.0)
+    K_short = K_long + w if kind == "Call" else K_long - w
+    p_long = premium_input(kind, K_long, 5.0)
+    p_short = premium_input(kind, K_short, 2.0)
+    legs = strat.vertical(kind, K_long, K_short, p_long, p_short)
+
+elif strategy in ("Long Butterfly", "Short Butterfly"):
     K2 = st.number_input("Center strike (K2)", value=float(round(S0)), step=1.0)
     w = st.number_input("Wing width", value=10.0, step=1.0, min_value=1.0)
     K1 = K2 - w
     K3 = K2 + w
-    premium1 = st.number_input(f"Premium Call for ${K1} option", value=12.0, step=0.5)
-    premium2 = st.number_input(f"Premium Call for ${K2} option", value=6.0, step=0.5)
-    premium3 = st.number_input(f"Premium Call for ${K3} option", value=2.0, step=0.5)
-    premium = premium1 - 2 * premium2 + premium3
-    iv = st.number_input("Implied vol (annual, %)", value=20.0, min_value=0.0, step=1.0)
-    dte = st.number_input("Days to expiry", value=30, min_value=1)
-    k = st.slider("k (number of sigmas)", 1.0, 3.0, 2.0)
-    sigma = iv / 100.0
-    T = dte / 365.0
-    band_low = S0 * np.exp(-k * sigma * np.sqrt(T))
-    band_high = S0 * np.exp(k * sigma * np.sqrt(T))
-    n_points = 5000
-    S = np.linspace(band_low, band_high, n_points)
-    payoff_K1 = np.maximum(S - K1, 0.0)
-    payoff_K2 = np.maximum(S - K2, 0.0)
-    payoff_K3 = np.maximum(S - K3, 0.0)
-    profit = payoff_K1 - 2 * payoff_K2 + payoff_K3 - premium
-    breakeven_low = K1+premium
-    breakeven_high = K3-premium
-
-elif strategy == "Short Butterfly":
-    S0 = st.number_input("Current underlying price (S₀)", value=100.0, step=1.0)
-    K2 = st.number_input("Center strike (K2)", value=float(round(S0)), step=1.0)
-    w = st.number_input("Wing width", value=10.0, step=1.0, min_value=1.0)
+    premium1 = premium_input("Call", K1, 12.0)
+    premium2 = premium_input("Call", K2, 6.0)
+    premium3 = premium_input("Call", K3, 2.0)
+    direction = 1 if strategy == "Long Butterfly" else -1
+    legs = strat.butterfly("call", K1, K2, K3, premium1, premium2, premium3, direction)
+
+elif strategy == "Long Straddle":
+    K = st.number_input("Strike (K)", value=float(round(S0)), step=1.0)
+    p_call = premium_input("Call", K, 4.0)
+    p_put = premium_input("Put", K, 4.0)
+    legs = strat.straddle(K, p_call, p_put)
+
+elif strategy == "Short Strangle":
+    w = st.number_input("Distance from S₀", value=10.0, step=1.0, min_value=1.0)
+    K_put = float(round(S0)) - w
+    K_call = float(round(S0)) + w
+    p_put = premium_input("Put", K_put, 1.5)
+    p_call = premium_input("Call", K_call, 1.5)
+    legs = strat.strangle(K_put, K_call, p_put, p_call, direction=-1)
+
+elif strategy == "Iron Condor":
+    inner = st.number_input("Short strikes distance from S₀", value=5.0, step=1.0, min_value=1.0)
+    w = st.number_input("Wing width", value=5.0, step=1.0, min_value=1.0)
+    K2 = float(round(S0)) - inner
+    K3 = float(round(S0)) + inner
     K1 = K2 - w
-    K3 = K2 + w
-    premium1 = st.number_input(f"Premium Call for ${K1} option", value=8.0, step=0.5)
-    premium2 = st.number_input(f"Premium Call for ${K2} option", value=6.0, step=0.5)
-    premium3 = st.number_input(f"Premium Call for ${K3} option", value=2.0, step=0.5)
-    premium = -premium1 + 2 * premium2 - premium3
-    iv = st.number_input("Implied vol (annual, %)", value=20.0, min_value=0.0, step=1.0)
-    dte = st.number_input("Days to expiry", value=30, min_value=1)
-    k = st.slider("k (number of sigmas)", 1.0, 3.0, 2.0)
-    sigma = iv / 100.0
-    T = dte / 365.0
-    band_low = S0 * np.exp(-k * sigma * np.sqrt(T))
-    band_high = S0 * np.exp(k * sigma * np.sqrt(T))
-    n_points = 5000
-    S = np.linspace(band_low, band_high, n_points)
-    payoff_K1 = np.maximum(S-K1, 0.0)
-    payoff_K2 = np.maximum(S-K2, 0.0)
-    payoff_K3 = np.maximum(S-K3, 0.0)
-    profit = (-payoff_K1 + 2 * payoff_K2 - payoff_K3) + premium
-    breakeven_low = K1 + premium
-    breakeven_high = K3 - premium
-
-max_profit = float(np.max(profit))
-max_loss = float(np.min(profit))
+    K4 = K3 + w
+    p1 = premium_input("Put", K1, 0.8)
+    p2 = premium_input("Put", K2, 2.0)
+    p3 = premium_input("Call", K3, 2.0)
+    p4 = premium_input("Call", K4, 0.8)
+    legs = strat.iron_condor(K1, K2, K3, K4, p1, p2, p3, p4)
+
+elif strategy == "Call Ratio Spread":
+    K_long = st.number_input("Long strike", value=float(round(S0)), step=1.0)
+    w = st.number_input("Distance to short strike", value=10.0, step=1.0, min_value=1.0)
+    ratio = st.number_input("Contracts sold per contract bought", value=2, min_value=1, step=1)
+    K_short = K_long + w
+    p_long = premium_input("Call", K_long, 5.0)
+    p_short = premium_input("Call", K_short, 2.0)
+    legs = strat.ratio_spread("call", K_long, K_short, p_long, p_short, ratio)
+
+elif strategy == "Covered Call":
+    K = st.number_input("Call strike (K)", value=S0 + 5, step=1.0)
+    premium = premium_input("Call", K, 2.0)
+    legs = strat.covered_call(S0, K, premium)
+
+elif strategy == "Custom":
+    st.caption("Quantity: positive = long, negative = short. For stock legs the premium is the entry price and the strike is ignored.")
+    table = st.data_editor(
+        pd.DataFrame({
+            "kind": ["call", "call"],
+            "quantity": [1.0, -1.0],
+            "strike": [float(round(S0)), float(round(S0)) + 10],
+            "premium": [5.0, 2.0],
+        }),
+        column_config={"kind": st.column_config.SelectboxColumn("kind", options=list(strat.KINDS), required=True)},
+        num_rows="dynamic",
+        use_container_width=True,
+    )
+    try:
+        legs = [
+            strat.Leg(row.kind, float(row.quantity), float(row.strike), float(row.premium))
+            for row in table.dropna().itertuples()
+        ]
+    except ValueError as e:
+        st.error(str(e))
+        st.stop()
+
+iv = st.number_input("Implied vol (annual, %)", value=20.0, min_value=0.0, step=1.0)
+dte = st.number_input("Days to expiry", value=30, min_value=1, max_value=1095) #LEAPS run out to about three years
+k = st.slider("k (number of sigmas)", 1.0, 3.0, 2.0)
+sigma = iv / 100.0
+T = dte / 365.0
+band_low = S0 * np.exp(-k * sigma * np.sqrt(T))
+band_high = S0 * np.exp(k * sigma * np.sqrt(T))
+
+try:
+    metrics = strat.analyze(legs)
+except ValueError as e:
+    st.error(str(e))
+    st.stop()
+strikes = sorted({leg.strike for leg in legs if leg.kind != "stock"})
+
+#metrics are exact; the grid is only for drawing, with every kink inside the band added
+n_points = 500
+S = np.linspace(band_low, band_high, n_points)
+S = np.union1d(S, metrics.kinks[(metrics.kinks > band_low) & (metrics.kinks < band_high)])
+profit = strat.pnl(legs, S)
+
+def money(x: float) -> str:
+    if np.isinf(x):
+        return "Unlimited" if x > 0 else "-Unlimited"
+    return f"{x:.2f}"
 
 plot_col, info_col = st.columns([2, 1])
 
-if strategy == "Long Call" or strategy == "Long Put":
-    with plot_col:
-        fig, ax = plt.subplots(figsize=(6, 4))
-
-        ax.plot(S, profit)
-        ax.axhline(0)
-        ax.axvline(K, linestyle="--")
-        ax.axvline(breakeven, linestyle="--")
-        ax.axvline(band_low, linestyle="--")
-        ax.axvline(band_high, linestyle="--")
-        ax.axvspan(band_low, band_high, alpha=0.12)
-
-        ax.set_xlabel("Underlying price at expiry (S_T)")
-        ax.set_ylabel("Profit")
-        ax.set_title(strategy)
-
-        st.pyplot(fig, use_container_width=True)
-
-    with info_col:
-        st.subheader("Key metrics")
-        st.write(f"Breakeven: {breakeven:.2f}")
-        st.write(f"Max profit : {max_profit:.2f}")
-        st.write(f"Max loss : {max_loss:.2f}")
-        st.write(f"Underlying min price: {band_low:.2f}")
-        st.latex(r"S_{\min} = S_0 e^{-k\sigma\sqrt{T}}")
-        st.write(f"Underlying max price: {band_high:.2f}")
-        st.latex(r"S_{\max} = S_0 e^{k\sigma\sqrt{T}}")
-        if max_loss<0:
-            rr = max_profit/abs(max_loss)
-        else:
-            rr = float("inf")
-        st.write("Risk-Reward")
-        st.latex(r"(\frac{MaxProfit}{MaxLoss}):" + f"{rr:.2f}")
+with plot_col:
+    fig, ax = plt.subplots(figsize=(6, 4))
 
-elif strategy == "Long Butterfly" or strategy == "Short Butterfly":
-    with plot_col:
-        fig, ax = plt.subplots(figsize=(6, 4))
+    ax.plot(S, profit)
+    ax.axhline(0)
 
-        ax.plot(S, profit)
-        ax.axhline(0)
+    for i, K in enumerate(strikes):
+        ax.axvline(K, linestyle=":", label="Strikes" if i == 0 else None)
+    for i, be in enumerate(metrics.breakevens):
+        ax.axvline(be, linestyle="--", color="red", label="Breakeven" if i == 0 else None)
+    ax.axvspan(band_low, band_high, alpha=0.12)
 
-        ax.axvline(K1, linestyle=":", label="Strike K1")
-        ax.axvline(K2, linestyle=":", label="Strike K2")
-        ax.axvline(K3, linestyle=":", label="Strike K3")
+    ax.set_xlabel("Underlying price at expiry $S_T$")
+    ax.set_ylabel("Profit")
+    ax.set_title(strategy)
+    ax.legend()
 
-        ax.axvline(breakeven_low, linestyle="--", label="Lower BE", color = "red")
-        ax.axvline(breakeven_high, linestyle="--", label="Upper BE", color = "red")
+    st.pyplot(fig, use_container_width=True)
+    plt.close(fig)
 
-        ax.set_xlabel("Underlying price at expiry $S_T$")
-        ax.set_ylabel("Profit")
-        ax.set_title(strategy)
-        ax.legend()
+with info_col:
+    st.subheader("Key metrics")
+    if metrics.breakevens:
+        st.write("Breakeven: " + ", ".join(f"{be:.2f}" for be in metrics.breakevens))
+    else:
+        st.write("Breakeven: none")
+    st.write(f"Net premium : {strat.net_cost(legs):.2f} ({'debit' if strat.net_cost(legs) >= 0 else 'credit'})")
+    st.write(f"Max profit : {money(metrics.max_profit)}")
+    st.write(f"Max loss : {money(metrics.max_loss)}")
+    st.write(f"Underlying min price: {band_low:.2f}")
+    st.latex(r"S_{\min} = S_0 e^{-k\sigma\sqrt{T}}")
+    st.write(f"Underlying max price: {band_high:.2f}")
+    st.latex(r"S_{\max} = S_0 e^{k\sigma\sqrt{T}}")
+    st.write("Risk-Reward")
+    if metrics.unbounded_loss or metrics.max_loss >= 0:
+        rr = 0.0 if metrics.unbounded_loss else float("inf")
+    else:
+        rr = metrics.max_profit / abs(metrics.max_loss)
+    st.latex(r"(\frac{MaxProfit}{MaxLoss}):" + (r"\infty" if np.isinf(rr) else f"{rr:.2f}"))
 
-        st.pyplot(fig, use_container_width=True)
+st.markdown(
+    "<h3 style='text-align: center;'>P&L before expiry</h3>",
+    unsafe_allow_html=True
+)
+surf_col1, surf_col2 = st.columns(2)
+with surf_col1:
+    r = st.number_input("Risk-free rate (r, decimal)", value=0.05, step=0.01)
+with surf_col2:
+    vol_shift = st.select_slider("Implied vol shift (vol points)", options=[-10, -5, 0, 5, 10], value=0)
+
+#one broadcast over spot x days remaining x vol shift
+spots = np.linspace(band_low, band_high, 200)
+days_left = np.linspace(dte, 0, 60)
+vol_shifts = np.array([-10, -5, 0, 5, 10]) / 100.0
+surface = strat.mark_to_model(legs, spots, days_left, r, sigma, vol_shifts)
+surface_now = surface[:, :, [-10, -5, 0, 5, 10].index(vol_shift)]
+
+heat_col, slice_col = st.columns(2)
 
-    with info_col:
-        st.subheader("Key metrics")
-        st.write(f"Breakeven: {breakeven_low:.2f}, {breakeven_high:.2f}")
-        st.write(f"Max profit : {max_profit:.2f}")
-        if strategy == "Long Butterfly":
-            st.write(f"Max loss : {-premium:.2f}")
-        elif strategy == "Short Butterfly":
-            st.write(f"Max loss : {max_loss:.2f}")
-        st.write(f"Underlying min price: {band_low:.2f}")
-        st.latex(r"S_{\min} = S_0 e^{-k\sigma\sqrt{T}}")
-        st.write(f"Underlying max price: {band_high:.2f}")
-        st.latex(r"S_{\max} = S_0 e^{k\sigma\sqrt{T}}")
-        st.write(f"Risk-Reward")
-        if strategy == "Long Butterfly":
-            st.latex(r"(\frac{MaxProfit}{MaxLoss}):" + f"{max_profit/premium:.2f}")
-        elif strategy == "Short Butterfly":
-            st.latex(r"(\frac{MaxProfit}{MaxLoss}):" + f"{max_profit/abs(max_loss):.2f}")
+with heat_col:
+    fig, ax = plt.subplots(figsize=(6, 4))
+    limit = float(np.abs(surface_now).max()) or 1.0
+    mesh = ax.pcolormesh(days_left, spots, surface_now, cmap="RdYlGn", vmin=-limit, vmax=limit, shading="auto")
+    ax.contour(days_left, spots, surface_now, levels=[0.0], colors="black", linewidths=1.0)
+    ax.invert_xaxis()
+    ax.set_xlabel("Days to expiry")
+    ax.set_ylabel("Underlying price")
+    ax.set_title("P&L heatmap")
+    fig.colorbar(mesh, ax=ax, label="Profit")
+    st.pyplot(fig, use_container_width=True)
+    plt.close(fig)
+
+with slice_col:
+    fig, ax = plt.subplots(figsize=(6, 4))
+    for j in np.unique(np.linspace(0, len(days_left) - 1, 4).round().astype(int)):
+        ax.plot(spots, surface_now[:, j], label=f"{days_left[j]:.0f} days left")
+    ax.axhline(0)
+    ax.set_xlabel("Underlying price")
+    ax.set_ylabel("Profit")
+    ax.set_title("P&L over time")
+    ax.legend()
+    st.pyplot(fig, use_container_width=True)
+    plt.close(fig)
+
+st.markdown(
+    "<h3 style='text-align: center;'>Probability analytics</h3>",
+    unsafe_allow_html=True
+)
 
+@st.cache_data(ttl=3600)
+def load_closes(ticker: str) -> np.ndarray:
+    hist = market_data.history(ticker, period="10y")
+    return hist["Close"].dropna().to_numpy() if not hist.empty else np.array([])
 
+prob_col1, prob_col2, prob_col3 = st.columns(3)
+with prob_col1:
+    distribution = st.radio("Terminal distribution", ["Lognormal", "Empirical returns"], horizontal=True)
+with prob_col2:
+    drift = st.number_input("Annual drift (μ, decimal)", value=float(r), step=0.01)
+with prob_col3:
+    alpha = st.select_slider("Shortfall tail", options=[0.01, 0.025, 0.05, 0.10], value=0.05)
 
+rows = {}
+if distribution == "Lognormal":
+    rows["Analytic"] = strategy_stats.analytic_stats(legs, S0, sigma, T, drift, alpha, metrics)
+    rows["Monte Carlo"] = strategy_stats.monte_carlo_stats(legs, S0, sigma, T, drift, alpha, metrics=metrics)
+else:
+    ticker = st.text_input("Ticker for historical returns", value="SPY").strip().upper()
+    closes = load_closes(ticker) if ticker else np.array([])
+    try:
+        rows[f"Empirical ({ticker}, {int(dte)}-day windows)"] = strategy_stats.empirical_stats(legs, S0, closes, int(dte), alpha, metrics)
+    except ValueError as e:
+        st.warning(str(e))
 
+if rows:
+    table = pd.DataFrame({
+        name: {
+            "Probability of profit": f"{res['pop']:.1%}",
+            "Expected P&L": f"{res['expected']:.2f}",
+            f"VaR ({alpha:.1%})": f"{res['var']:.2f}",
+            f"Expected shortfall ({alpha:.1%})": f"{res['es']:.2f}",
+            **{f"P(touch {be:.2f})": f"{p:.1%}" for be, p in res["touch"].items()},
+        }
+        for name, res in rows.items()
+    })
+    st.dataframe(table, use_container_width=True)
+    st.caption(
+        "Analytic values integrate the piecewise-linear payoff segment by segment under a lognormal terminal price. "
+        "Touch probabilities assume continuous monitoring; the Monte Carlo check monitors daily, so it reads slightly lower."
+    )
 
+st.markdown(
+    "<h3 style='text-align: center;'>Optimize on the live chain</h3>",
+    unsafe_allow_html=True
+)
+
+@st.cache_data(ttl=300)
+def load_chain(ticker: str, exp: str):
+    chain = market_data.option_chain(ticker, exp)
+    spot = float(market_data.history(ticker, period="5d")["Close"].iloc[-1])
+    return chain.calls, chain.puts, spot
+
+if st.toggle("Search strikes on a live chain"):
+    opt_col1, opt_col2 = st.columns(2)
+    with opt_col1:
+        opt_ticker = st.text_input("Ticker", value="SPY").strip().upper()
+    with opt_col2:
+        opt_exp = st.selectbox("Expiration", market_data.expirations(opt_ticker) if opt_ticker else [])
+
+    with st.form("optimizer"):
+        form_col1, form_col2, form_col3 = st.columns(3)
+        with form_col1:
+            template = st.selectbox("Template", list(optimizer.TEMPLATES))
+            objective = st.selectbox("Rank by", list(optimizer.OBJECTIVES))
+        with form_col2:
+            max_width = st.number_input("Max distance between strikes", value=20.0, min_value=0.5, step=0.5)
+            max_cost = st.number_input("Max net debit", value=10.0, step=0.5)
+        with form_col3:
+            min_oi = st.number_input("Min open interest per leg", value=10, min_value=0, step=10)
+            max_spread = st.number_input("Max bid/ask spread (fraction of mid)", value=0.25, min_value=0.01, step=0.05)
+        submitted = st.form_submit_button("Search")
+
+    if submitted and opt_exp:
+        calls, puts, spot = load_chain(opt_ticker, opt_exp)
+        T_opt = max((pd.Timestamp(opt_exp) - pd.Timestamp.today().normalize()).days, 1) / 365.0
+        near = pd.concat([calls, puts])
+        near = near[near["impliedVolatility"] > 0]
+        near = near.iloc[(near["strike"] - spot).abs().argsort()[:6]]
+        atm_iv = float(near["impliedVolatility"].median()) if len(near) else sigma
+        with st.spinner("Evaluating strike combinations..."):
+            result, n_evaluated = optimizer.optimize(
+                template, calls, puts, spot, atm_iv, T_opt, r,
+                objective=objective, max_width=max_width, max_cost=max_cost,
+                min_oi=int(min_oi), max_spread=max_spread,
+            )
+        st.session_state["optimizer_result"] = (result, n_evaluated, spot, atm_iv)
+
+    if "optimizer_result" in st.session_state:
+        result, n_evaluated, spot, atm_iv = st.session_state["optimizer_result"]
+        st.caption(
+            f"{n_evaluated:,} combinations evaluated at S₀ = {spot:.2f}, ATM IV = {atm_iv:.1%}. "
+            "Buys fill at the ask and sells at the bid; metrics are per share at expiry."
+        )
+        if result.empty:
+            st.warning("No combination passes the filters.")
+        else:
+            st.dataframe(result.round(4), use_container_width=True)
@@ -0,0 +1,303 @@
+import numpy as np
+import pandas as pd
+
+import metrics
+from pricers import bs_greeks, bs_price
+
+KIND_CODES = {"stock": 0, "call": 1, "put": 2}
+KIND_NAMES = {code: name for name, code in KIND_CODES.items()}
+GREEKS = ["value", "delta", "gamma", "vega", "theta"]
+
+#column name -> dtype of the structure-of-arrays
+COLUMNS = {
+    "id": np.int64,
+    "underlying": np.int32, #index into Book.underlyings
+    "kind": np.int8,
+    "quantity": np.float64, #contracts or shares, negative = short
+    "strike": np.float64,
+    "expiry": "datetime64[D]",
+    "iv": np.float64,
+    "multiplier": np.float64,
+    "cost": np.float64, #price paid per unit
+    "active": np.bool_,
+    #cached position-level contributions (already times quantity * multiplier)
+    "value": np.float64,
+    "delta": np.float64, #share-equivalent delta
+    "gamma": np.float64, #delta change per 1.00 move in the underlying
+    "vega": np.float64, #per 1 vol point
+    "theta": np.float64, #per calendar day
+}
+
+
+#many option and stock positions across underlyings, stored column by column so
+#one pricer call revalues the whole book; per-underlying totals are kept up to
+#date incrementally when single positions are added or closed
+class Book:
+    def __init__(self, r: float = 0.05, asof=None, capacity: int = 64):
+        self.r = r
+        self.asof = np.datetime64(pd.Timestamp(asof or pd.Timestamp.today()).date(), "D")
+        self.underlyings = []
+        self._codes = {}
+        self.spot = np.zeros(0)
+        self.dirty = np.zeros(0, dtype=bool) #spot moved since the underlying was last priced
+        self.totals = np.zeros((0, len(GREEKS)))
+        self._rows_by_code = [] #active rows of every underlying
+        self.cols = {name: np.zeros(capacity, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self.size = 0 #rows in use, active or not
+        self._free = [] #closed rows that can be reused
+        self._row_of = {} #position id -> row
+        self._next_id = 1
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def _code(self, underlying: str) -> int:
+        code = self._codes.get(underlying)
+        if code is None:
+            code = len(self.underlyings)
+            self._codes[underlying] = code
+            self.underlyings.append(underlying)
+            self.spot = np.append(self.spot, np.nan)
+            self.dirty = np.append(self.dirty, False)
+            self._rows_by_code.append(set())
+            self.totals = np.vstack([self.totals, np.zeros(len(GREEKS))])
+        return code
+
+    def _grow(self, needed: int):
+        capacity = len(self.cols["id"])
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, 2 * capacity)
+        for name, col in self.cols.items():
+            grown = np.zeros(new_capacity, dtype=col.dtype)
+            grown[:capacity] = col
+            self.cols[name] = grown
+
+    def _alloc(self, n: int) -> np.ndarray:
+        reused = [self._free.pop() for _ in range(min(n, len(self._free)))]
+        fresh = np.arange(self.size, self.size + n - len(reused))
+        self._grow(self.size + len(fresh))
+        self.size += len(fresh)
+        return np.concatenate([np.array(reused, dtype=np.int64), fresh]).astype(np.int64)
+
+    #value and Greeks of the given rows at current spots, times quantity * multiplier
+    def _greeks(self, rows: np.ndarray) -> np.ndarray:
+        c = self.cols
+        kind = c["kind"][rows]
+        S = self.spot[c["underlying"][rows]]
+        scale = c["quantity"][rows] * c["multiplier"][rows]
+        out = np.zeros((len(rows), len(GREEKS)))
+
+        stock = kind == KIND_CODES["stock"]
+        out[stock, 0] = S[stock]
+        out[stock, 1] = 1.0
+
+        opt = ~stock
+        if opt.any():
+            T = (c["expiry"][rows][opt] - self.asof).astype(float) / 365.0
+            S_opt = np.where(np.isfinite(S[opt]), S[opt], np.nan)
+            option_type = np.where(kind[opt] == KIND_CODES["call"], "call", "put")
+            K, iv = c["strike"][rows][opt], c["iv"][rows][opt]
+            g = bs_greeks(S_opt, K, self.r, iv, T, option_type)
+            out[opt, 0] = bs_price(S_opt, K, self.r, iv, T, option_type)
+            out[opt, 1] = g["delta"]
+            out[opt, 2] = g["gamma"]
+            out[opt, 3] = g["vega"] / 100.0
+            out[opt, 4] = g["theta"] / 365.0
+        return out * scale[:, None]
+
+    def _store(self, rows: np.ndarray, contrib: np.ndarray):
+        for j, name in enumerate(GREEKS):
+            self.cols[name][rows] = contrib[:, j]
+
+    def _cached(self, rows: np.ndarray) -> np.ndarray:
+        return np.column_stack([self.cols[name][rows] for name in GREEKS])
+
+    def set_spot(self, underlying: str, spot: float):
+        code = self._code(underlying)
+        if self.spot[code] != spot:
+            self.spot[code] = spot
+            self.dirty[code] = True
+
+    def add(
+        self,
+        underlying: str,
+        kind: str,
+        quantity: float,
+        strike: float = 0.0,
+        expiry=None,
+        iv: float = 0.0,
+        multiplier: float | None = None, #100 for options, 1 for stock
+        cost: float = 0.0,
+        spot: float | None = None,
+        position_id: int | None = None, #defaults to the next free id
+    ) -> int:
+        if spot is not None:
+            self.set_spot(underlying, spot)
+            self.refresh()
+        code = KIND_CODES.get(kind.lower())
+        if code is None:
+            raise ValueError("kind must be 'call', 'put' or 'stock'.")
+        is_option = code != KIND_CODES["stock"]
+        if is_option and strike <= 0:
+            raise ValueError("option strike must be positive.")
+        expiry = pd.Timestamp(expiry).to_datetime64().astype("datetime64[D]")
+        if is_option and np.isnat(expiry):
+            raise ValueError("options need an expiry date.")
+
+        pid = self._next_id if position_id is None else int(position_id)
+        if pid in self._row_of:
+            raise ValueError(f"position {pid} is already in the book.")
+        self._next_id = max(self._next_id, pid + 1)
+        row = self._alloc(1)
+        self._write(
+            row, id=pid, underlying=self._code(underlying), kind=code, quantity=quantity, strike=strike,
+            expiry=expiry, iv=iv, cost=cost, active=True,
+            multiplier=multiplier if multiplier is not None else (100.0 if is_option else 1.0),
+        )
+        self._row_of[pid] = int(row[0])
+        self._rows_by_code[self.cols["underlying"][row[0]]].add(int(row[0]))
+        contrib = self._greeks(row)
+        self._store(row, contrib)
+        self.totals[self.cols["underlying"][row[0]]] += np.nan_to_num(contrib[0])
+        return pid
+
+    def _write(self, rows: np.ndarray, **values):
+        for name, value in values.items():
+            self.cols[name][rows] = value
+
+    @staticmethod
+    def _numbers(positions: pd.DataFrame, column: str) -> np.ndarray:
+        if column not in positions:
+            return np.zeros(len(positions))
+        return pd.to_numeric(positions[column]).fillna(0).to_numpy(dtype=float)
+
+    #bulk insert; only the new rows are priced and their contributions added to the
+    #totals. An "id" column keeps ids assigned elsewhere (e.g. by the position store)
+    def add_many(self, positions: pd.DataFrame, spots: dict | None = None) -> np.ndarray:
+        for underlying, spot in (spots or {}).items():
+            self.set_spot(underlying, spot)
+        #existing rows of moved underlyings first, so the new rows price at the same marks
+        self.refresh()
+        kinds = positions["kind"].str.lower().map(KIND_CODES)
+        if kinds.isna().any():
+            raise ValueError("kind must be 'call', 'put' or 'stock'.")
+        options = (kinds != KIND_CODES["stock"]).to_numpy()
+        strikes = self._numbers(positions, "strike")
+        if (strikes[options] <= 0).any():
+            raise ValueError("option strike must be positive.")
+        if "expiry" in positions:
+            expiry = pd.to_datetime(positions["expiry"]).to_numpy().astype("datetime64[D]")
+        else:
+            expiry = np.full(len(positions), np.datetime64("NaT"), dtype="datetime64[D]")
+        if np.isnat(expiry[options]).any():
+            raise ValueError("options need an expiry date.")
+
+        multiplier = np.where(options, 100.0, 1.0)
+        if "multiplier" in positions:
+            multiplier = pd.to_numeric(positions["multiplier"]).fillna(pd.Series(multiplier, index=positions.index))
+
+        if "id" in positions:
+            ids = positions["id"].to_numpy(dtype=np.int64)
+            if len(np.unique(ids)) < len(ids) or any(int(pid) in self._row_of for pid in ids):
+                raise ValueError("position ids must be unique.")
+        else:
+            ids = np.arange(self._next_id, self._next_id + len(positions))
+        if len(ids):
+            self._next_id = max(self._next_id, int(ids.max()) + 1)
+        rows = self._alloc(len(positions))
+        self._write(
+            rows,
+            id=ids,
+            underlying=[self._code(u) for u in positions["underlying"]],
+            kind=kinds.to_numpy(),
+            quantity=positions["quantity"].to_numpy(dtype=float),
+            strike=strikes,
+            expiry=expiry,
+            iv=self._numbers(positions, "iv"),
+            multiplier=np.asarray(multiplier, dtype=float),
+            cost=self._numbers(positions, "cost"),
+            active=True,
+        )
+        for pid, row, code in zip(ids, rows, self.cols["underlying"][rows]):
+            self._row_of[int(pid)] = int(row)
+            self._rows_by_code[code].add(int(row))
+
+        contrib = self._greeks(rows)
+        self._store(rows, contrib)
+        self._accumulate(self.cols["underlying"][rows], contrib)
+        return ids
+
+    def _accumulate(self, codes: np.ndarray, contrib: np.ndarray, sign: float = 1.0):
+        contrib = np.nan_to_num(contrib)
+        for j in range(len(GREEKS)):
+            self.totals[:, j] += sign * np.bincount(codes, weights=contrib[:, j], minlength=len(self.underlyings))
+
+    #O(1): subtract the cached contribution and free the row
+    def close(self, position_id: int):
+        row = self._row_of.pop(position_id)
+        code = int(self.cols["underlying"][row])
+        self.totals[code] -= np.nan_to_num(self._cached(np.array([row]))[0])
+        self.cols["active"][row] = False
+        self._rows_by_code[code].discard(row)
+        self._free.append(row)
+
+    def active_rows(self) -> np.ndarray:
+        return np.nonzero(self.cols["active"][:self.size])[0]
+
+    #full revaluation: one vectorized pricer pass over every active row, then a
+    #grouped reduction per underlying
+    @metrics.timed("book.revalue")
+    def revalue(self, rows: np.ndarray | None = None):
+        if rows is None:
+            rows = self.active_rows()
+            self.dirty[:] = False
+        if len(rows) == 0:
+            return
+        contrib = self._greeks(rows)
+        codes = self.cols["underlying"][rows]
+        self._accumulate(codes, self._cached(rows), sign=-1.0)
+        self._store(rows, contrib)
+        self._accumulate(codes, contrib)
+
+    #reprice only the rows of underlyings whose spot moved since they were last priced
+    @metrics.timed("book.refresh")
+    def refresh(self) -> int:
+        codes = np.nonzero(self.dirty)[0]
+        rows = [row for code in codes for row in self._rows_by_code[code]]
+        self.dirty[codes] = False
+        self.revalue(np.array(rows, dtype=np.int64))
+        return len(rows)
+
+    def summary(self) -> pd.DataFrame:
+        table = pd.DataFrame(self.totals, index=pd.Index(self.underlyings, name="underlying"), columns=GREEKS)
+        table.insert(0, "spot", self.spot)
+        table["positions"] = np.bincount(
+            self.cols["underlying"][self.active_rows()], minlength=len(self.underlyings)
+        )
+        return table[table["positions"] > 0]
+
+    #aggregate (delta, gamma, vega) of one underlying or of the whole book
+    def greek_vector(self, underlying: str | None = None) -> np.ndarray:
+        cols = [GREEKS.index(g) for g in ("delta", "gamma", "vega")]
+        if underlying is None:
+            return self.totals[:, cols].sum(axis=0)
+        return self.totals[self._codes[underlying], cols]
+
+    def positions(self) -> pd.DataFrame:
+        rows = self.active_rows()
+        c = self.cols
+        table = pd.DataFrame({
+            "id": c["id"][rows],
+            "underlying": np.array(self.underlyings, dtype=object)[c["underlying"][rows]] if len(rows) else [],
+            "kind": [KIND_NAMES[k] for k in c["kind"][rows]],
+            "quantity": c["quantity"][rows],
+            "strike": c["strike"][rows],
+            "expiry": c["expiry"][rows],
+            "iv": c["iv"][rows],
+            "multiplier": c["multiplier"][rows],
+            "cost": c["cost"][rows],
+            **{name: c[name][rows] for name in GREEKS},
+        })
+        table["pnl"] = table["value"] - table["cost"] * table["quantity"] * table["multiplier"]
+        return table
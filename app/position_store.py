@@ -0,0 +1,173 @@
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from portfolio import KIND_CODES, Book
+
+DATA_DIR = os.environ.get("OPTIONLAB_DATA_DIR", ".optionlab")
+
+FIELDS = ["underlying", "kind", "quantity", "strike", "expiry", "iv", "multiplier", "cost"]
+REQUIRED = ["underlying", "kind", "quantity"]
+
+
+#positions, the trades that opened/closed them and the last spot of every
+#underlying, in one SQLite file; the in-memory Book is rebuilt from it on startup
+class PositionStore:
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS positions (
+                id INTEGER PRIMARY KEY,
+                underlying TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                quantity REAL NOT NULL,
+                strike REAL,
+                expiry TEXT,
+                iv REAL,
+                multiplier REAL,
+                cost REAL,
+                opened REAL NOT NULL,
+                closed REAL
+            );
+            CREATE INDEX IF NOT EXISTS positions_open ON positions(closed);
+            CREATE TABLE IF NOT EXISTS trades (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                position_id INTEGER NOT NULL,
+                ts REAL NOT NULL,
+                action TEXT NOT NULL,
+                quantity REAL NOT NULL,
+                price REAL
+            );
+            CREATE TABLE IF NOT EXISTS marks (
+                underlying TEXT PRIMARY KEY,
+                spot REAL NOT NULL,
+                updated REAL NOT NULL
+            );
+        """)
+
+    @staticmethod
+    def _normalize(frame: pd.DataFrame) -> pd.DataFrame:
+        frame = frame.rename(columns=str.lower)
+        missing = [col for col in REQUIRED if col not in frame]
+        if missing:
+            raise ValueError(f"missing columns: {', '.join(missing)}")
+        frame = frame.reindex(columns=FIELDS)
+        frame["underlying"] = frame["underlying"].astype(str).str.strip().str.upper()
+        frame["kind"] = frame["kind"].astype(str).str.strip().str.lower()
+        frame["expiry"] = pd.to_datetime(frame["expiry"]).dt.strftime("%Y-%m-%d")
+        if not frame["kind"].isin(KIND_CODES).all():
+            raise ValueError("kind must be 'call', 'put' or 'stock'.")
+        options = frame["kind"] != "stock"
+        if (frame.loc[options, "strike"].fillna(0) <= 0).any():
+            raise ValueError("option strike must be positive.")
+        if frame.loc[options, "expiry"].isna().any():
+            raise ValueError("options need an expiry date.")
+        return frame
+
+    #bulk insert in one transaction; returns the frame with its new ids
+    def import_frame(self, frame: pd.DataFrame, action: str = "import") -> pd.DataFrame:
+        frame = self._normalize(frame)
+        now = time.time()
+        rows = [
+            tuple(None if pd.isna(v) else v for v in rec) + (now,)
+            for rec in frame.itertuples(index=False, name=None)
+        ]
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                start = self._db.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM positions").fetchone()[0]
+                ids = list(range(start, start + len(rows)))
+                self._db.executemany(
+                    f"INSERT INTO positions (id, {', '.join(FIELDS)}, opened) VALUES (?, {', '.join('?' * len(FIELDS))}, ?)",
+                    [(pid,) + row for pid, row in zip(ids, rows)],
+                )
+                self._db.executemany(
+                    "INSERT INTO trades (position_id, ts, action, quantity, price) VALUES (?, ?, ?, ?, ?)",
+                    [(pid, now, action, q, c) for pid, q, c in zip(ids, frame["quantity"], frame["cost"].where(frame["cost"].notna(), None))],
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        frame.insert(0, "id", ids)
+        return frame
+
+    def import_file(self, source, name: str) -> pd.DataFrame:
+        if name.lower().endswith(".parquet"):
+            frame = pd.read_parquet(source)
+        elif name.lower().endswith(".csv"):
+            frame = pd.read_csv(source)
+        else:
+            raise ValueError("positions must be a .csv or .parquet file.")
+        return self.import_frame(frame)
+
+    def open(self, **position) -> int:
+        return int(self.import_frame(pd.DataFrame([position]), action="open")["id"].iloc[0])
+
+    def close(self, position_id: int, price: float | None = None):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT quantity FROM positions WHERE id=? AND closed IS NULL", (position_id,)
+            ).fetchone()
+            if row is None:
+                return
+            self._db.execute("BEGIN")
+            self._db.execute("UPDATE positions SET closed=? WHERE id=?", (now, position_id))
+            self._db.execute(
+                "INSERT INTO trades (position_id, ts, action, quantity, price) VALUES (?, ?, 'close', ?, ?)",
+                (position_id, now, -row[0], price),
+            )
+            self._db.execute("COMMIT")
+
+    def open_positions(self) -> pd.DataFrame:
+        with self._lock:
+            return pd.read_sql_query(
+                f"SELECT id, {', '.join(FIELDS)} FROM positions WHERE closed IS NULL ORDER BY id", self._db
+            )
+
+    def trades(self, limit: int = 200) -> pd.DataFrame:
+        with self._lock:
+            return pd.read_sql_query(
+                "SELECT * FROM trades ORDER BY id DESC LIMIT ?", self._db, params=(limit,)
+            )
+
+    def save_marks(self, spots: dict):
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO marks VALUES (?, ?, ?)",
+                [(u, float(s), now) for u, s in spots.items() if pd.notna(s)],
+            )
+
+    def marks(self) -> dict:
+        with self._lock:
+            return dict(self._db.execute("SELECT underlying, spot FROM marks").fetchall())
+
+    #columnar book of every open position, priced at the last saved marks
+    def load_book(self, r: float = 0.05, asof=None) -> Book:
+        book = Book(r=r, asof=asof)
+        positions = self.open_positions()
+        if not positions.empty:
+            book.add_many(positions, spots=self.marks())
+        return book
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> PositionStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PositionStore(os.path.join(DATA_DIR, "positions.sqlite3"))
+        return _store
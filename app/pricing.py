@@ -3,6 +3,7 @@ import numpy as np
 import pandas as pd
 import math
 from matplotlib import pyplot as plt
+from pricers import bs_price
 
 st.set_page_config(layout="wide")
 st.markdown(
@@ -186,17 +187,7 @@ S_min = 0.5 * min(K_eu, K_am)
 S_max = 1.5 * max(K_eu, K_am)
 
 spots = np.linspace(S_min, S_max, 80)
-eu_prices = [
-    black_scholes_european(
-        s,
-        K_eu,
-        r_eu,
-        sigma_eu,
-        T_eu,
-        eu_type.lower()
-    )
-    for s in spots
-]
+eu_prices = bs_price(spots, K_eu, r_eu, sigma_eu, T_eu, eu_type.lower())
 
 am_prices = [
     american_option(
@@ -0,0 +1,211 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+
+import pandas as pd
+import streamlit as st
+
+DATA_DIR = os.environ.get("OPTIONLAB_DATA_DIR", ".optionlab")
+#"query": only reruns opened with ?profile=1, "1": every rerun, "0": never (query param ignored)
+MODE = os.environ.get("OPTIONLAB_PROFILE", "query").lower()
+PROFILE_DIR = os.environ.get("OPTIONLAB_PROFILE_DIR", os.path.join(DATA_DIR, "profiles"))
+INTERVAL = float(os.environ.get("OPTIONLAB_PROFILE_INTERVAL_MS", "5")) / 1000.0
+KEEP = int(os.environ.get("OPTIONLAB_PROFILE_KEEP", "200")) #reruns kept on disk
+MAX_BYTES = int(float(os.environ.get("OPTIONLAB_PROFILE_MAX_MB", "100")) * 1024 * 1024)
+TOP_N = 25
+
+_prune_lock = threading.Lock()
+
+
+def requested() -> bool:
+    if MODE in ("0", "off", "false", "no"):
+        return False
+    if MODE in ("1", "on", "true", "yes", "always"):
+        return True
+    return st.query_params.get("profile", "0").lower() in ("1", "true", "yes")
+
+
+#wall-clock sampler of one thread: every INTERVAL the stack of the profiled thread is
+#read from another thread, down to (not including) the frame that started it. Each
+#sample is weighted by the real time since the previous one, so time spent in native
+#code holding the GIL is charged to the Python frame that called it
+class Sampler:
+    def __init__(self, root=None, interval: float = INTERVAL):
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.root = root or sys._getframe(1)
+        self.frames = {} #(name, file, line) -> index
+        self.samples = [] #(stack of frame indices root..leaf, seconds)
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="profiler", daemon=True)
+
+    def _stack(self, frame) -> tuple:
+        stack = []
+        while frame is not None and frame is not self.root:
+            code = frame.f_code
+            key = (code.co_qualname, code.co_filename, code.co_firstlineno)
+            index = self.frames.get(key)
+            if index is None:
+                index = self.frames[key] = len(self.frames)
+            stack.append(index)
+            frame = frame.f_back
+        return tuple(reversed(stack))
+
+    def _loop(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is not None:
+                stack = self._stack(frame)
+                if stack:
+                    self.samples.append((stack, now - last))
+            last = now
+            del frame
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def _names(self) -> list[str]:
+        return [f"{name} ({os.path.basename(file)}:{line})" for name, file, line in self.frames]
+
+    #flamegraph.pl / speedscope "collapsed stack" text, weights in microseconds
+    def collapsed(self) -> str:
+        names = self._names()
+        folded = defaultdict(float)
+        for stack, dt in self.samples:
+            folded[";".join(names[i] for i in stack)] += dt
+        return "".join(f"{stack} {round(dt * 1e6)}\n" for stack, dt in folded.items() if round(dt * 1e6) > 0)
+
+    def speedscope(self, name: str) -> dict:
+        total = sum(dt for _, dt in self.samples) * 1000
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "optionlab",
+            "shared": {"frames": [{"name": n, "file": f, "line": l} for n, f, l in self.frames]},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": total,
+                "samples": [list(stack) for stack, _ in self.samples],
+                "weights": [dt * 1000 for _, dt in self.samples],
+            }],
+        }
+
+    #self (leaf) and total (anywhere on the stack, counted once per sample) time per function
+    def top(self, n: int = TOP_N) -> pd.DataFrame:
+        names = self._names()
+        own = defaultdict(float)
+        inclusive = defaultdict(float)
+        for stack, dt in self.samples:
+            own[stack[-1]] += dt
+            for i in set(stack):
+                inclusive[i] += dt
+        sampled = sum(dt for _, dt in self.samples) or 1.0
+        out = pd.DataFrame({
+            "function": [names[i] for i in inclusive],
+            "self ms": [own.get(i, 0.0) * 1000 for i in inclusive],
+            "total ms": [inclusive[i] * 1000 for i in inclusive],
+        })
+        out["self %"] = out["self ms"] / (sampled * 1000)
+        return out.sort_values(["self ms", "total ms"], ascending=False).head(n).reset_index(drop=True)
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "-", text).strip("-").lower() or "page"
+
+
+def _write(path: str, text: str):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+#oldest reruns go first once more than KEEP are stored or they exceed MAX_BYTES
+def prune(directory: str = PROFILE_DIR, keep: int = KEEP, max_bytes: int = MAX_BYTES):
+    with _prune_lock:
+        runs = defaultdict(list)
+        for entry in os.scandir(directory):
+            if entry.name.endswith((".speedscope.json", ".folded")):
+                runs[entry.name.split(".", 1)[0]].append(entry)
+        stems = sorted(runs)
+        size = sum(e.stat().st_size for stem in stems for e in runs[stem])
+        while stems and (len(stems) > keep or size > max_bytes):
+            for entry in runs[stems.pop(0)]:
+                try:
+                    size -= entry.stat().st_size
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+
+def save(sampler: Sampler, page: str, directory: str = PROFILE_DIR) -> str:
+    os.makedirs(directory, exist_ok=True)
+    #timestamp first so names sort by age; the thread id keeps concurrent sessions apart
+    ns = time.time_ns()
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(ns // 10**9))
+    stem = os.path.join(directory, f"{stamp}-{ns % 10**9:09d}-{sampler.thread_id % 10**6}-{_slug(page)}")
+    _write(stem + ".speedscope.json", json.dumps(sampler.speedscope(page)))
+    _write(stem + ".folded", sampler.collapsed())
+    prune(directory)
+    return stem + ".speedscope.json"
+
+
+class _Profile:
+    def __init__(self, page: str):
+        self.page = page
+
+    def __enter__(self):
+        self.sampler = Sampler(root=sys._getframe(1))
+        self.sampler.start()
+        return self.sampler
+
+    def __exit__(self, *exc):
+        self.sampler.stop()
+        try:
+            path = save(self.sampler, self.page)
+        except OSError as e:
+            path = None
+            st.warning(f"Profile could not be saved: {e}")
+        #also shown after st.stop(); after st.rerun() the page is redrawn anyway
+        render(self.sampler, path)
+        return False
+
+
+#profile the page run when requested; otherwise a no-op context
+def profile(page: str):
+    return _Profile(page) if requested() else nullcontext()
+
+
+def render(sampler: Sampler, path: str | None = None, n: int = TOP_N):
+    sampled = sum(dt for _, dt in sampler.samples)
+    with st.expander(f"Profile: {sampler.elapsed * 1000:.0f} ms, {len(sampler.samples)} samples", expanded=True):
+        if not sampler.samples:
+            st.write("The rerun finished before the first sample; lower OPTIONLAB_PROFILE_INTERVAL_MS to see it.")
+        else:
+            st.dataframe(
+                sampler.top(n).style.format({"self ms": "{:.1f}", "total ms": "{:.1f}", "self %": "{:.1%}"}),
+                use_container_width=True,
+                hide_index=True,
+            )
+        st.caption(
+            f"Wall-clock sampling every {sampler.interval * 1000:.0f} ms, {sampled * 1000:.0f} ms sampled."
+            + (f" Saved to {path} (open at speedscope.app); the .folded file next to it is for flamegraph.pl." if path else "")
+        )
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+import market_data
+import metrics
+
+TRADING_DAYS = 252
+WINDOWS = (10, 21, 63)
+ESTIMATORS = ["close_to_close", "parkinson", "garman_klass", "yang_zhang"]
+HISTORY_PERIOD = "5y" #loaded once; later calls only append the new bars
+
+
+#sum of the last n values at every position, from one cumulative sum (NaN until n are in)
+def _window_sum(x: np.ndarray, n: int) -> np.ndarray:
+    c = np.concatenate([[0.0], np.cumsum(x)])
+    out = np.full(len(x), np.nan)
+    if len(x) >= n:
+        out[n - 1:] = c[n:] - c[:-n]
+    return out
+
+
+def _window_var(x: np.ndarray, n: int) -> np.ndarray:
+    s1, s2 = _window_sum(x, n), _window_sum(x * x, n)
+    return np.maximum(s2 - s1 * s1 / n, 0.0) / (n - 1)
+
+
+#annualized rolling vol of every estimator over an n-day window, from daily OHLC bars
+@metrics.timed("vol.realized_estimators")
+def estimators(bars: pd.DataFrame, n: int = 21) -> pd.DataFrame:
+    o, h, l, c = (bars[col].to_numpy(dtype=float) for col in ("Open", "High", "Low", "Close"))
+    prev = np.concatenate([[np.nan], c[:-1]])
+    oc = np.log(c / o)
+    hl = np.log(h / l)
+    rs = np.log(h / c) * np.log(h / o) + np.log(l / c) * np.log(l / o)
+
+    #the first bar has no previous close; drop it from the return-based windows
+    r = np.log(c / prev)[1:]
+    overnight = np.log(o / prev)[1:]
+    pad = lambda x: np.concatenate([[np.nan], x])
+
+    close_to_close = pad(_window_var(r, n))
+    parkinson = _window_sum(hl * hl, n) / (4.0 * n * np.log(2.0))
+    garman_klass = _window_sum(0.5 * hl * hl - (2.0 * np.log(2.0) - 1.0) * oc * oc, n) / n
+    k = 0.34 / (1.34 + (n + 1) / (n - 1))
+    yang_zhang = pad(_window_var(overnight, n) + k * _window_var(oc[1:], n) + (1 - k) * _window_sum(rs[1:], n) / n)
+
+    return pd.DataFrame(
+        {name: np.sqrt(var * TRADING_DAYS) for name, var in zip(ESTIMATORS, (close_to_close, parkinson, garman_klass, yang_zhang))},
+        index=bars.index,
+    )
+
+
+def load_bars(symbol: str) -> pd.DataFrame:
+    bars = market_data.history(symbol, period=HISTORY_PERIOD, interval="1d")
+    if bars is None or bars.empty:
+        return pd.DataFrame(columns=["Open", "High", "Low", "Close"])
+    return bars[["Open", "High", "Low", "Close"]].dropna()
+
+
+#latest realized vol per estimator (rows) and window (columns), and its spread to `implied`
+def snapshot(bars: pd.DataFrame, implied: float, windows=WINDOWS) -> pd.DataFrame:
+    latest = pd.DataFrame({f"{n}d": estimators(bars, n).iloc[-1] for n in windows}) if len(bars) else pd.DataFrame(
+        index=ESTIMATORS, columns=[f"{n}d" for n in windows], dtype=float
+    )
+    for n in windows:
+        latest[f"IV - {n}d"] = implied - latest[f"{n}d"]
+    return latest
@@ -0,0 +1,196 @@
+import numpy as np
+import pandas as pd
+
+SYMBOLS = ["SPY", "QQQ", "IWM", "VXX", "TLT", "GLD"]
+
+MACRO_HEDGE = "Macro Hedge Rotation"
+EXPANSION = "Equity Expansion and Risk Acceptance"
+ELEVATED_VOL = "Risk acceptance with Elevated Volatility"
+DELEVERAGING = "Deleveraging Phase"
+DE_RISKING = "Controlled De-risking"
+MIXED = "Mixed Signals"
+REGIMES = [MACRO_HEDGE, EXPANSION, ELEVATED_VOL, DELEVERAGING, DE_RISKING, MIXED]
+
+SCENARIOS = {
+    "macro_hedge": "Capital is rotating into macro hedges. Strong gold inflows indicate rising demand for protection, outweighing short-term equity dispersion and signaling a defensive market posture.",
+    "broad_risk": "Broad-based risk appetite: equities are advancing with declining implied volatility and limited demand for defensive duration.",
+    "concentrated": "Concentrated leadership: large caps are driving gains while small caps lag, suggesting narrower participation and a more fragile uptrend.",
+    "risk_on_mixed": "Risk-on with mixed cross-asset confirmation: trend remains constructive, but monitoring for volatility re-expansion is warranted.",
+    "hedged_rally": "Risk assets are higher, but hedging demand persists: volatility is rising alongside a defensive bid, indicating elevated uncertainty beneath the rally.",
+    "unstable_rally": "Uptrend with volatility expansion: price action is positive, but risk premia are rising, consistent with an unstable or news-driven advance.",
+    "systemic": "Systemic risk-off: equities are repricing lower as volatility spikes, accompanied by broad demand for safe-haven duration and macro hedges.",
+    "flight_to_quality": "Classic flight-to-quality: equities are weakening while volatility rises and Treasuries rally, consistent with risk aversion and capital preservation.",
+    "rates_shock": "Equity drawdown with limited duration support: volatility is rising without a meaningful Treasury bid, suggesting a rates/inflation-driven shock risk.",
+    "orderly": "Orderly de-risking: equities are drifting lower with contained volatility and supportive duration, consistent with a controlled rotation into safety.",
+    "low_vol_weakness": "Low-vol weakness: equities are softer without a volatility spike, indicating complacent selling pressure that can transition quickly if a catalyst emerges.",
+    "divergent": "Divergent leadership: SPY and QQQ are sending conflicting signals, implying an unsettled tape and reduced directional conviction.",
+    "vol_unchanged": "Volatility is broadly unchanged: markets are awaiting information, and near-term regime classification remains low confidence.",
+    "transitional": "Cross-asset signals are mixed: confirmation is limited across risk and defensive assets, indicating a transitional environment.",
+}
+
+
+def change_step(x:float, small: float = 0.20):
+    if x>small:
+        return 1
+    elif x<-small:
+        return -1
+    return 0
+
+def check_market_regime(
+        pct_spy: float, pct_qqq: float, pct_iwm: float,
+        pct_vxx: float, pct_tlt: float, pct_gld: float,
+        eps: float = 0.20
+):
+    SPY = change_step(pct_spy, eps)
+    QQQ = change_step(pct_qqq, eps)
+    IWM = change_step(pct_iwm, eps)
+    VXX = change_step(pct_vxx, eps)
+    TLT = change_step(pct_tlt, eps)
+    GLD = change_step(pct_gld, eps)
+
+    equities_up = (SPY == +1 and QQQ==+1)
+    equities_down = (SPY == -1 and QQQ==-1)
+
+    volatility_up = (VXX == +1)
+    volatility_down = (VXX == -1)
+
+    participation_up = (IWM == +1)
+    participation_down = (IWM == -1)
+
+    safety_bid = (TLT == +1)
+    macro_hedging = (GLD == +1)
+
+    if pct_gld>2.0:
+        return MACRO_HEDGE, SCENARIOS["macro_hedge"]
+    if equities_up and volatility_down:
+        if participation_up and not safety_bid:
+            scenario = SCENARIOS["broad_risk"]
+        elif participation_down:
+            scenario = SCENARIOS["concentrated"]
+        else:
+            scenario = SCENARIOS["risk_on_mixed"]
+        return EXPANSION, scenario
+
+    if equities_up and volatility_up:
+        if safety_bid or macro_hedging:
+            scenario = SCENARIOS["hedged_rally"]
+        else:
+            scenario = SCENARIOS["unstable_rally"]
+        return ELEVATED_VOL, scenario
+
+    if equities_down and volatility_up:
+        if safety_bid and macro_hedging:
+            scenario = SCENARIOS["systemic"]
+        elif safety_bid:
+            scenario = SCENARIOS["flight_to_quality"]
+        else:
+            scenario = SCENARIOS["rates_shock"]
+        return DELEVERAGING, scenario
+
+    if equities_down and volatility_down:
+        if safety_bid:
+            scenario = SCENARIOS["orderly"]
+        else:
+            scenario = SCENARIOS["low_vol_weakness"]
+        return DE_RISKING, scenario
+
+    if (SPY != QQQ):
+        scenario = SCENARIOS["divergent"]
+    elif VXX == 0:
+        scenario = SCENARIOS["vol_unchanged"]
+    else:
+        scenario = SCENARIOS["transitional"]
+    return MIXED, scenario
+
+
+#vectorized version of check_market_regime: one label per row of a
+#(days x 6) table of daily % moves in SYMBOLS order, same branch priority
+def classify_regimes(pct, eps: float = 0.20):
+    pct = pd.DataFrame(pct, columns=SYMBOLS) if not isinstance(pct, pd.DataFrame) else pct[SYMBOLS]
+    x = pct.to_numpy(dtype=float)
+    step = np.where(x > eps, 1, np.where(x < -eps, -1, 0))
+    spy, qqq, iwm, vxx, tlt, gld = step.T
+
+    equities_up = (spy == 1) & (qqq == 1)
+    equities_down = (spy == -1) & (qqq == -1)
+    volatility_up = vxx == 1
+    volatility_down = vxx == -1
+    participation_up = iwm == 1
+    participation_down = iwm == -1
+    safety_bid = tlt == 1
+    macro_hedging = gld == 1
+
+    macro = x[:, 5] > 2.0
+    expansion = ~macro & equities_up & volatility_down
+    elevated = ~macro & equities_up & volatility_up
+    deleveraging = ~macro & equities_down & volatility_up
+    de_risking = ~macro & equities_down & volatility_down
+
+    regimes = np.select(
+        [macro, expansion, elevated, deleveraging, de_risking],
+        [MACRO_HEDGE, EXPANSION, ELEVATED_VOL, DELEVERAGING, DE_RISKING],
+        default=MIXED,
+    )
+    scenario_keys = np.select(
+        [
+            macro,
+            expansion & participation_up & ~safety_bid,
+            expansion & participation_down,
+            expansion,
+            elevated & (safety_bid | macro_hedging),
+            elevated,
+            deleveraging & safety_bid & macro_hedging,
+            deleveraging & safety_bid,
+            deleveraging,
+            de_risking & safety_bid,
+            de_risking,
+            spy != qqq,
+            vxx == 0,
+        ],
+        [
+            "macro_hedge", "broad_risk", "concentrated", "risk_on_mixed",
+            "hedged_rally", "unstable_rally",
+            "systemic", "flight_to_quality", "rates_shock",
+            "orderly", "low_vol_weakness",
+            "divergent", "vol_unchanged",
+        ],
+        default="transitional",
+    )
+    return pd.DataFrame({"regime": regimes, "scenario": scenario_keys}, index=pct.index)
+
+
+def daily_moves(closes: pd.DataFrame) -> pd.DataFrame:
+    return closes[SYMBOLS].pct_change(fill_method=None).mul(100.0).iloc[1:]
+
+
+def _runs(labels: pd.Series) -> pd.DataFrame:
+    run_id = (labels != labels.shift()).cumsum()
+    runs = labels.groupby(run_id.to_numpy()).agg(["first", "size"])
+    return runs.rename(columns={"first": "regime", "size": "days"}).reset_index(drop=True)
+
+
+#durations, day-to-day transition probabilities and forward returns per regime
+def regime_report(closes: pd.DataFrame, eps: float = 0.20, horizons=(1, 5, 20), asset: str = "SPY") -> dict:
+    moves = daily_moves(closes)
+    labels = classify_regimes(moves, eps)["regime"]
+
+    runs = _runs(labels)
+    durations = runs.groupby("regime")["days"].agg(
+        episodes="size", mean_days="mean", median_days="median", max_days="max"
+    )
+    durations["share_of_days"] = labels.value_counts(normalize=True)
+    durations = durations.reindex([r for r in REGIMES if r in durations.index])
+
+    transitions = pd.crosstab(labels.iloc[:-1].to_numpy(), labels.iloc[1:].to_numpy(), normalize="index")
+    transitions.index.name = "from"
+    transitions.columns.name = "to"
+
+    px = closes[asset].reindex(labels.index)
+    forward = {}
+    for h in horizons:
+        fwd = (px.shift(-h) / px - 1.0) * 100.0
+        forward[f"{h}d mean %"] = fwd.groupby(labels).mean()
+        forward[f"{h}d hit rate"] = (fwd > 0).where(fwd.notna()).groupby(labels).mean()
+    forward = pd.DataFrame(forward).reindex(durations.index)
+
+    return {"labels": labels, "durations": durations, "transitions": transitions, "forward": forward}
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+import metrics
+from portfolio import KIND_CODES, Book
+from pricers import bs_price
+
+MEMORY_BUDGET = 256 * 2**20 #bytes of scenario temporaries per chunk
+_TEMPORARIES = 16 #float64 arrays of size positions x scenarios alive inside bs_price
+
+#approximate S&P 500 close-to-close move and VIX change (vol points) on the day
+STRESS_DAYS = {
+    "2008-10-15 post-Lehman selloff": (-0.090, 16.0),
+    "2008-10-13 relief rally": (0.116, -15.0),
+    "2011-08-08 US downgrade": (-0.067, 16.0),
+    "2018-02-05 Volmageddon": (-0.041, 20.0),
+    "2020-03-16 COVID crash": (-0.120, 25.0),
+    "2024-08-05 carry unwind": (-0.030, 15.0),
+}
+
+DEFAULT_SPOT_SHOCKS = np.linspace(-0.30, 0.30, 13)
+DEFAULT_VOL_SHOCKS = np.array([-10.0, -5.0, 0.0, 5.0, 10.0, 20.0])
+DEFAULT_DAYS = np.array([0, 1, 5, 21])
+
+
+#full revaluation of every active position under n scenarios. spot_moves has
+#shape (underlyings, n) of simple returns, vol_shifts (n,) or (underlyings, n)
+#in vol points, days (n,) calendar days forward. Positions x scenarios is one
+#broadcast through bs_price, cut into position chunks that fit `memory_budget`.
+#Returns P&L against the current book value, shape (underlyings, n)
+@metrics.timed("risk.revalue_scenarios")
+def revalue_scenarios(book: Book, spot_moves, vol_shifts=0.0, days=0, memory_budget: int = MEMORY_BUDGET) -> np.ndarray:
+    rows = book.active_rows()
+    U = len(book.underlyings)
+    spot_moves = np.atleast_2d(np.asarray(spot_moves, dtype=float))
+    n = spot_moves.shape[1]
+    vol_shifts = np.broadcast_to(np.asarray(vol_shifts, dtype=float), (U, n)) / 100.0
+    days = np.broadcast_to(np.asarray(days, dtype=float), (n,))
+    out = np.zeros((U, n))
+    if len(rows) == 0 or n == 0:
+        return out
+
+    c = book.cols
+    chunk = max(1, int(memory_budget // (n * 8 * _TEMPORARIES)))
+    for start in range(0, len(rows), chunk):
+        r = rows[start:start + chunk]
+        code = c["underlying"][r]
+        kind = c["kind"][r]
+        scale = (c["quantity"][r] * c["multiplier"][r])[:, None]
+        S = book.spot[code][:, None] * (1.0 + spot_moves[code])
+        S = np.where(np.isfinite(S), np.maximum(S, 1e-8), np.nan)
+        value = np.array(S)
+
+        opt = kind != KIND_CODES["stock"]
+        if opt.any():
+            T = ((c["expiry"][r][opt] - book.asof).astype(float)[:, None] - days[None, :]) / 365.0
+            value[opt] = bs_price(
+                S[opt],
+                c["strike"][r][opt][:, None],
+                book.r,
+                np.maximum(c["iv"][r][opt][:, None] + vol_shifts[code[opt]], 0.0),
+                T,
+                np.where(kind[opt] == KIND_CODES["call"], "call", "put")[:, None],
+            )
+        pnl = np.nan_to_num(value * scale - c["value"][r][:, None])
+        #grouped reduction: one-hot (underlyings x positions) times (positions x scenarios)
+        onehot = np.zeros((U, len(r)))
+        onehot[code, np.arange(len(r))] = 1.0
+        out += onehot @ pnl
+    return out
+
+
+#P&L cube over spot shock x vol shock x days forward, every underlying shocked
+#by the same relative move; shape (underlyings, spots, vols, days)
+@metrics.timed("risk.scenario_grid")
+def grid(book: Book, spot_shocks=DEFAULT_SPOT_SHOCKS, vol_shocks=DEFAULT_VOL_SHOCKS, days=DEFAULT_DAYS, memory_budget: int = MEMORY_BUDGET) -> dict:
+    spot_shocks, vol_shocks, days = (np.asarray(a, dtype=float) for a in (spot_shocks, vol_shocks, days))
+    S, V, D = np.meshgrid(spot_shocks, vol_shocks, days, indexing="ij")
+    U = len(book.underlyings)
+    pnl = revalue_scenarios(
+        book, np.broadcast_to(S.ravel(), (U, S.size)), V.ravel(), D.ravel(), memory_budget
+    )
+    return {
+        "pnl": pnl.reshape(U, *S.shape),
+        "underlyings": list(book.underlyings),
+        "spot_shocks": spot_shocks,
+        "vol_shocks": vol_shocks,
+        "days": days,
+    }
+
+
+#P&L of the book on each named stress day; `betas` scales the index move per underlying
+@metrics.timed("risk.stress")
+def stress(book: Book, stress_days: dict = STRESS_DAYS, betas: dict | None = None) -> pd.DataFrame:
+    names = list(stress_days)
+    moves = np.array([stress_days[name][0] for name in names])
+    vols = np.array([stress_days[name][1] for name in names])
+    beta = np.array([(betas or {}).get(u, 1.0) for u in book.underlyings])
+    pnl = revalue_scenarios(book, beta[:, None] * moves[None, :], vols, 1)
+    table = pd.DataFrame(pnl.T, index=pd.Index(names, name="stress day"), columns=book.underlyings)
+    table = table.loc[:, book.summary().index]
+    table.insert(0, "index move", moves)
+    table.insert(1, "vol change", vols)
+    table["total"] = pnl.sum(axis=0)
+    return table
@@ -0,0 +1,58 @@
+from collections import OrderedDict
+import threading
+
+import numpy as np
+
+import metrics
+
+WIDTH = 320
+HEIGHT = 85
+PAD = 2.0 #keeps the stroke from being clipped at the edges
+MAX_ENTRIES = 256
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def _coords(x: np.ndarray, y: np.ndarray) -> str:
+    return " ".join(f"{a:.1f},{b:.1f}" for a, b in zip(x.tolist(), y.tolist()))
+
+
+def sparkline_svg(series: np.ndarray, color: str, width: int = WIDTH, height: int = HEIGHT) -> str:
+    y = np.asarray(series, dtype=float)
+    y = y[np.isfinite(y)]
+    if len(y) < 2:
+        y = np.zeros(2)
+    lo, hi = y.min(), y.max()
+    span = hi - lo if hi > lo else 1.0
+    px = np.linspace(PAD, width - PAD, len(y))
+    py = (height - PAD) - (y - lo) / span * (height - 2 * PAD)
+    line = _coords(px, py)
+    area = f"{px[0]:.1f},{height} {line} {px[-1]:.1f},{height}"
+    return (
+        f'<svg viewBox="0 0 {width} {height}" width="100%" height="{height}" '
+        f'preserveAspectRatio="none" xmlns="http://www.w3.org/2000/svg">'
+        f'<polygon points="{area}" fill="{color}" fill-opacity="0.18" stroke="none"/>'
+        f'<polyline points="{line}" fill="none" stroke="{color}" stroke-width="2" '
+        f'stroke-linejoin="round" vector-effect="non-scaling-stroke"/>'
+        f'</svg>'
+    )
+
+
+#rendered markup keyed by (symbol, last bar timestamp, color); the last value
+#is part of the key too because today's bar keeps moving until the close
+def cached_sparkline(symbol: str, last_stamp, color: str, series: np.ndarray) -> str:
+    key = (symbol, last_stamp, color, float(series[-1]) if len(series) else 0.0)
+    with _lock:
+        svg = _cache.get(key)
+        if svg is not None:
+            _cache.move_to_end(key)
+            metrics.count("cache.sparkline.hit")
+            return svg
+    metrics.count("cache.sparkline.miss")
+    svg = sparkline_svg(series, color)
+    with _lock:
+        _cache[key] = svg
+        while len(_cache) > MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return svg
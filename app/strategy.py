@@ -0,0 +1,186 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from pricers import bs_price
+
+KINDS = ("call", "put", "stock")
+
+
+@dataclass
+class Leg:
+    kind: str #call/put/stock
+    quantity: float #positive = long, negative = short
+    strike: float = 0.0 #ignored for stock
+    premium: float = 0.0 #price paid per unit (entry price for stock)
+    iv: float | None = None #leg's own implied vol, defaults to the strategy vol
+
+    def __post_init__(self):
+        self.kind = self.kind.lower()
+        if self.kind not in KINDS:
+            raise ValueError("kind must be 'call', 'put' or 'stock'.")
+        if self.kind != "stock" and self.strike <= 0:
+            raise ValueError("option strike must be positive.")
+
+
+@dataclass
+class StrategyMetrics:
+    kinks: np.ndarray #spot of every vertex of the payoff, starting at S=0
+    values: np.ndarray #P&L at each kink
+    slope_up: float #P&L slope beyond the last kink
+    breakevens: list = field(default_factory=list)
+    max_profit: float = 0.0 #+inf when unbounded
+    max_loss: float = 0.0 #-inf when unbounded (can only happen to the upside)
+    max_profit_at: float = 0.0
+    max_loss_at: float = 0.0
+
+    @property
+    def unbounded_profit(self) -> bool:
+        return np.isinf(self.max_profit)
+
+    @property
+    def unbounded_loss(self) -> bool:
+        return np.isinf(self.max_loss)
+
+
+def _arrays(legs: list[Leg]):
+    kind = np.array([leg.kind for leg in legs])
+    qty = np.array([leg.quantity for leg in legs], dtype=float)
+    strike = np.array([leg.strike for leg in legs], dtype=float)
+    premium = np.array([leg.premium for leg in legs], dtype=float)
+    return kind, qty, strike, premium
+
+
+def net_cost(legs: list[Leg]) -> float:
+    _, qty, _, premium = _arrays(legs)
+    return float(qty @ premium)
+
+
+#(legs x grid) payoff of one unit of every leg at expiry
+def payoff_matrix(legs: list[Leg], S: np.ndarray) -> np.ndarray:
+    kind, _, strike, _ = _arrays(legs)
+    S = np.asarray(S, dtype=float)[None, :]
+    K = strike[:, None]
+    return np.where(
+        (kind == "call")[:, None], np.maximum(S - K, 0.0),
+        np.where((kind == "put")[:, None], np.maximum(K - S, 0.0), S)
+    )
+
+
+def pnl(legs: list[Leg], S: np.ndarray) -> np.ndarray:
+    _, qty, _, premium = _arrays(legs)
+    return qty @ payoff_matrix(legs, S) - qty @ premium
+
+
+#P&L at sorted spots x from prefix sums over sorted strikes, O((legs + x) log legs)
+def _pnl_at(kind, qty, strike, premium, x: np.ndarray) -> np.ndarray:
+    out = np.full(len(x), -(qty @ premium))
+    out += qty[kind == "stock"].sum() * x
+
+    is_call = kind == "call"
+    if is_call.any():
+        order = np.argsort(strike[is_call])
+        k, q = strike[is_call][order], qty[is_call][order]
+        cq, cqk = np.concatenate([[0.0], np.cumsum(q)]), np.concatenate([[0.0], np.cumsum(q * k)])
+        i = np.searchsorted(k, x, side="right") #calls with K <= x are in the money
+        out += x * cq[i] - cqk[i]
+
+    is_put = kind == "put"
+    if is_put.any():
+        order = np.argsort(strike[is_put])
+        k, q = strike[is_put][order], qty[is_put][order]
+        cq, cqk = np.concatenate([[0.0], np.cumsum(q)]), np.concatenate([[0.0], np.cumsum(q * k)])
+        i = np.searchsorted(k, x, side="left") #puts with K > x are in the money
+        out += (cqk[-1] - cqk[i]) - x * (cq[-1] - cq[i])
+    return out
+
+
+def analyze(legs: list[Leg]) -> StrategyMetrics:
+    if not legs:
+        raise ValueError("strategy needs at least one leg.")
+    kind, qty, strike, premium = _arrays(legs)
+
+    options = kind != "stock"
+    kinks = np.unique(np.concatenate([[0.0], strike[options]]))
+    values = _pnl_at(kind, qty, strike, premium, kinks)
+    slope_up = float(qty[(kind == "call") | (kind == "stock")].sum())
+
+    m = StrategyMetrics(kinks=kinks, values=values, slope_up=slope_up)
+
+    i_max, i_min = int(np.argmax(values)), int(np.argmin(values))
+    m.max_profit, m.max_profit_at = float(values[i_max]), float(kinks[i_max])
+    m.max_loss, m.max_loss_at = float(values[i_min]), float(kinks[i_min])
+    if slope_up > 0:
+        m.max_profit, m.max_profit_at = np.inf, np.inf
+    elif slope_up < 0:
+        m.max_loss, m.max_loss_at = -np.inf, np.inf
+
+    m.breakevens = _breakevens(kinks, values, slope_up)
+    return m
+
+
+def _breakevens(kinks: np.ndarray, values: np.ndarray, slope_up: float) -> list[float]:
+    roots = list(kinks[(values == 0.0) & (kinks > 0)])
+    a, b = values[:-1], values[1:]
+    cross = (a * b) < 0
+    if cross.any():
+        x0, x1 = kinks[:-1][cross], kinks[1:][cross]
+        roots += list(x0 + a[cross] * (x1 - x0) / (a[cross] - b[cross]))
+    last = values[-1]
+    if last != 0 and slope_up != 0 and np.sign(last) != np.sign(slope_up):
+        roots.append(kinks[-1] - last / slope_up)
+    return sorted(float(r) for r in set(roots))
+
+
+#P&L before expiry over spot x days-remaining x vol shift: every option leg is
+#repriced with bs_price in a single broadcast; result has shape (spots, days, shifts)
+def mark_to_model(legs: list[Leg], spots, days_left, r: float, iv: float, vol_shifts=(0.0,)) -> np.ndarray:
+    kind, qty, strike, premium = _arrays(legs)
+    spots = np.asarray(spots, dtype=float)
+    days_left = np.asarray(days_left, dtype=float)
+    vol_shifts = np.asarray(vol_shifts, dtype=float)
+    leg_iv = np.array([iv if leg.iv is None else leg.iv for leg in legs], dtype=float)
+
+    shape = (len(legs), len(spots), len(days_left), len(vol_shifts))
+    value = np.broadcast_to(spots[None, :, None, None], shape).copy()
+    options = kind != "stock"
+    if options.any():
+        value[options] = bs_price(
+            spots[None, :, None, None],
+            strike[options][:, None, None, None],
+            r,
+            np.maximum(leg_iv[options][:, None, None, None] + vol_shifts[None, None, None, :], 0.0),
+            days_left[None, None, :, None] / 365.0,
+            kind[options][:, None, None, None],
+        )
+    return np.tensordot(qty, value, axes=1) - qty @ premium
+
+
+#templates: quantities are per unit, premiums are per-leg prices
+def long_call(K, p):
+    return [Leg("call", 1, K, p)]
+
+def long_put(K, p):
+    return [Leg("put", 1, K, p)]
+
+def vertical(kind, K_long, K_short, p_long, p_short):
+    return [Leg(kind, 1, K_long, p_long), Leg(kind, -1, K_short, p_short)]
+
+def butterfly(kind, K1, K2, K3, p1, p2, p3, direction=1):
+    return [Leg(kind, direction, K1, p1), Leg(kind, -2 * direction, K2, p2), Leg(kind, direction, K3, p3)]
+
+def straddle(K, p_call, p_put, direction=1):
+    return [Leg("call", direction, K, p_call), Leg("put", direction, K, p_put)]
+
+def strangle(K_put, K_call, p_put, p_call, direction=1):
+    return [Leg("put", direction, K_put, p_put), Leg("call", direction, K_call, p_call)]
+
+def iron_condor(K1, K2, K3, K4, p1, p2, p3, p4):
+    #long K1 put, short K2 put, short K3 call, long K4 call
+    return [Leg("put", 1, K1, p1), Leg("put", -1, K2, p2), Leg("call", -1, K3, p3), Leg("call", 1, K4, p4)]
+
+def ratio_spread(kind, K_long, K_short, p_long, p_short, ratio=2):
+    return [Leg(kind, 1, K_long, p_long), Leg(kind, -ratio, K_short, p_short)]
+
+def covered_call(S0, K, p):
+    return [Leg("stock", 1, 0.0, S0), Leg("call", -1, K, p)]
@@ -0,0 +1,196 @@
+import numpy as np
+
+from pricers import norm_cdf
+import strategy as strat
+
+
+#ln(S_T) ~ N(m, s^2) for a GBM with drift mu
+def lognormal_params(S0: float, sigma: float, T: float, mu: float = 0.0):
+    s = max(sigma, 1e-12) * np.sqrt(max(T, 1e-12))
+    return np.log(S0) + (mu - 0.5 * sigma * sigma) * T, s
+
+
+#P&L = a + b*S on [x0, x1); the last segment runs to infinity
+def _segments(metrics: strat.StrategyMetrics):
+    x0 = metrics.kinks
+    x1 = np.append(metrics.kinks[1:], np.inf)
+    b = np.append(np.diff(metrics.values) / np.diff(metrics.kinks), metrics.slope_up)
+    a = metrics.values - b * x0
+    return x0, x1, a, b
+
+
+#probability and partial expectation of S over [lo, hi) under the lognormal
+def _mass(lo, hi, m, s):
+    with np.errstate(divide="ignore"):
+        zl = (np.log(lo) - m) / s
+        zh = (np.log(hi) - m) / s
+    prob = norm_cdf(zh) - norm_cdf(zl)
+    first = np.exp(m + 0.5 * s * s) * (norm_cdf(zh - s) - norm_cdf(zl - s))
+    return np.maximum(prob, 0.0), np.maximum(first, 0.0)
+
+
+#part of every segment where P&L <= level
+def _below(x0, x1, a, b, level):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        root = (level - a) / b
+    lo = np.where(b < 0, np.maximum(x0, root), x0)
+    hi = np.where(b > 0, np.minimum(x1, root), x1)
+    flat = b == 0
+    empty = np.where(flat, a > level, lo >= hi)
+    return np.where(empty, x0, lo), np.where(empty, x0, hi)
+
+
+def _below_stats(seg, level, m, s):
+    x0, x1, a, b = seg
+    lo, hi = _below(x0, x1, a, b, level)
+    prob, first = _mass(lo, hi, m, s)
+    return prob.sum(), (a * prob + b * first).sum()
+
+
+#lognormal CDF terms at spot levels: F = P(S_T < x), G = E[S_T; S_T < x] / E[S_T]
+def cdf_terms(x, m: float, s: float):
+    with np.errstate(divide="ignore"):
+        z = (np.log(x) - m) / s
+    return norm_cdf(z), norm_cdf(z - s)
+
+
+#expected P&L and probability of profit for many strategies at once: row i has
+#sorted kinks[i] (starting at 0), P&L values[i] there and a common upside slope.
+#F and G (from cdf_terms) can be passed in when the kinks come from a fixed strike
+#list, so norm_cdf only runs at the breakeven crossings
+def batch_stats(kinks: np.ndarray, values: np.ndarray, slope_up: float, m: float, s: float, F=None, G=None):
+    if F is None or G is None:
+        F, G = cdf_terms(kinks, m, s)
+    n = len(kinks)
+    ones = np.ones((n, 1))
+    F1 = np.concatenate([F[:, 1:], ones], axis=1)
+    G1 = np.concatenate([G[:, 1:], ones], axis=1)
+
+    dx = np.diff(kinks, axis=1)
+    b = np.where(dx > 0, np.diff(values, axis=1) / np.where(dx > 0, dx, 1.0), 0.0)
+    b = np.concatenate([b, np.full((n, 1), float(slope_up))], axis=1)
+    a = values - b * kinks
+
+    prob = F1 - F
+    expected = (a * prob + b * np.exp(m + 0.5 * s * s) * (G1 - G)).sum(axis=1)
+
+    #loss mass: whole segments below zero plus the losing part of crossing segments
+    end = np.sign(slope_up) * np.inf if slope_up != 0 else values[:, -1:]
+    v0 = values
+    v1 = np.concatenate([values[:, 1:], np.broadcast_to(end, (n, 1))], axis=1)
+    loss0, loss1 = v0 <= 0, v1 <= 0
+    p_loss = np.where(loss0 & loss1, prob, 0.0).sum(axis=1)
+    cross = loss0 != loss1
+    if cross.any():
+        rows = np.nonzero(cross)[0]
+        root = -a[cross] / b[cross]
+        F_root = cdf_terms(root, m, s)[0]
+        part = np.where(loss0[cross], F_root - F[cross], F1[cross] - F_root)
+        p_loss += np.bincount(rows, weights=part, minlength=n)
+    return expected, 1.0 - p_loss
+
+
+def _touch_prob(S0, barrier, sigma, T, mu):
+    nu = mu - 0.5 * sigma * sigma
+    x = np.log(barrier / S0)
+    #no volatility (or no time): the path is the drift line, which crosses or it does not
+    if sigma * np.sqrt(max(T, 0.0)) < 1e-10:
+        end = nu * max(T, 0.0)
+        return float(end >= x if barrier >= S0 else end <= x)
+    vol_t = sigma * np.sqrt(T)
+    #reflection term (B/S0)^(2 nu / sigma^2), clipped in log space so tiny vols cannot overflow
+    power = np.exp(np.clip(2.0 * nu / (sigma * sigma) * x, -700.0, 700.0))
+    if barrier >= S0:
+        p = norm_cdf((-x + nu * T) / vol_t) + power * norm_cdf((-x - nu * T) / vol_t)
+    else:
+        p = norm_cdf((x - nu * T) / vol_t) + power * norm_cdf((x + nu * T) / vol_t)
+    return float(min(max(p, 0.0), 1.0))
+
+
+#probability of profit, expected P&L, VaR/expected shortfall at `alpha` and
+#probability of touching each breakeven before expiry, all in closed form
+def analytic_stats(legs, S0: float, sigma: float, T: float, mu: float = 0.0, alpha: float = 0.05, metrics=None) -> dict:
+    metrics = metrics or strat.analyze(legs)
+    m, s = lognormal_params(S0, sigma, T, mu)
+    seg = _segments(metrics)
+    x0, x1, a, b = seg
+
+    prob, first = _mass(x0, x1, m, s)
+    expected = float((a * prob + b * first).sum())
+    p_loss, _ = _below_stats(seg, 0.0, m, s)
+
+    #smallest level whose lower tail holds alpha of the mass, by bisection
+    far = np.exp(m + np.array([-12.0, 12.0]) * s)
+    candidates = np.concatenate([metrics.values, strat.pnl(legs, far)])
+    lo, hi = float(candidates.min()), float(candidates.max())
+    for _ in range(60):
+        mid = 0.5 * (lo + hi)
+        if _below_stats(seg, mid, m, s)[0] >= alpha:
+            hi = mid
+        else:
+            lo = mid
+    var = hi
+    p_tail, e_tail = _below_stats(seg, var, m, s)
+    shortfall = (e_tail - var * (p_tail - alpha)) / alpha
+
+    return {
+        "pop": float(1.0 - p_loss),
+        "expected": expected,
+        "var": float(var),
+        "es": float(shortfall),
+        "touch": {be: _touch_prob(S0, be, sigma, T, mu) for be in metrics.breakevens},
+    }
+
+
+def _sample_stats(legs, S0, terminal, path_max, path_min, breakevens, alpha) -> dict:
+    pnl = strat.pnl(legs, terminal)
+    var = float(np.quantile(pnl, alpha))
+    tail = np.sort(pnl)[:max(1, int(np.ceil(alpha * len(pnl))))]
+    touch = {
+        be: float(np.mean(path_max >= be) if be >= S0 else np.mean(path_min <= be))
+        for be in breakevens
+    }
+    return {
+        "pop": float(np.mean(pnl > 0)),
+        "expected": float(pnl.mean()),
+        "var": var,
+        "es": float(tail.mean()),
+        "touch": touch,
+    }
+
+
+#cross-check: daily-monitored GBM paths, terminal P&L evaluated in one matrix product.
+#Paths are simulated in blocks of about CHUNK_CELLS draws, keeping only the terminal
+#value and the running max/min, so memory does not grow with the horizon
+CHUNK_CELLS = 1_000_000
+
+
+def monte_carlo_stats(legs, S0, sigma, T, mu=0.0, alpha=0.05, n_paths=20000, steps=None, seed=0, metrics=None) -> dict:
+    metrics = metrics or strat.analyze(legs)
+    steps = steps or max(1, int(round(T * 365)))
+    dt = T / steps
+    rng = np.random.default_rng(seed)
+    terminal, path_max, path_min = (np.empty(n_paths) for _ in range(3))
+    chunk = max(1, CHUNK_CELLS // steps)
+    for start in range(0, n_paths, chunk):
+        rows = slice(start, min(start + chunk, n_paths))
+        #same draws, in the same order, as one (n_paths, steps) matrix
+        z = rng.standard_normal((rows.stop - rows.start, steps))
+        z *= sigma * np.sqrt(dt)
+        z += (mu - 0.5 * sigma * sigma) * dt
+        np.cumsum(z, axis=1, out=z)
+        terminal[rows] = S0 * np.exp(z[:, -1])
+        path_max[rows] = S0 * np.exp(z.max(axis=1))
+        path_min[rows] = S0 * np.exp(z.min(axis=1))
+    return _sample_stats(legs, S0, terminal, path_max, path_min, metrics.breakevens, alpha)
+
+
+#empirical: every overlapping `days`-long window of the close history, rescaled to S0
+def empirical_stats(legs, S0, closes, days: int, alpha=0.05, metrics=None) -> dict:
+    metrics = metrics or strat.analyze(legs)
+    closes = np.asarray(closes, dtype=float)
+    if len(closes) <= days:
+        raise ValueError("not enough price history for this horizon.")
+    windows = np.lib.stride_tricks.sliding_window_view(closes, days + 1)
+    rel = windows / windows[:, :1]
+    return _sample_stats(legs, S0, S0 * rel[:, -1], S0 * rel.max(axis=1), S0 * rel.min(axis=1), metrics.breakevens, alpha)
@@ -0,0 +1,185 @@
+from collections import OrderedDict
+import threading
+
+import numpy as np
+import pandas as pd
+
+import metrics
+
+PARAMS = ("a", "b", "rho", "m", "sigma")
+MAX_ITER = 100
+MAX_ENTRIES = 256 #warm-start parameters kept per (symbol, expiry)
+MIN_POINTS = 6
+
+
+#raw SVI total variance w(k) = a + b (rho (k - m) + sqrt((k - m)^2 + sigma^2));
+#params (..., 5) broadcast against k (..., n)
+def total_variance(params, k):
+    a, b, rho, m, sigma = (params[..., i:i + 1] for i in range(5))
+    x = k - m
+    return a + b * (rho * x + np.sqrt(x * x + sigma * sigma))
+
+
+def implied_vol(params, k, T):
+    return np.sqrt(np.maximum(total_variance(params, k), 0.0) / T)
+
+
+#the fit runs in unconstrained coordinates (log v, log b, atanh rho, m, log sigma)
+#where v = a + b sigma sqrt(1 - rho^2) is the smile's minimum total variance, so
+#every iterate has b > 0, |rho| < 1, sigma > 0 and w > 0 everywhere
+def _to_raw(free):
+    v, b, rho, m, sigma = np.exp(free[:, 0]), np.exp(free[:, 1]), np.tanh(free[:, 2]), free[:, 3], np.exp(free[:, 4])
+    return np.stack([v - b * sigma * np.sqrt(1.0 - rho * rho), b, rho, m, sigma], axis=1)
+
+
+def _to_free(raw):
+    a, b, rho, m, sigma = raw.T
+    b = np.maximum(b, 1e-8)
+    sigma = np.maximum(sigma, 1e-8)
+    rho = np.clip(rho, -0.999, 0.999)
+    v = np.maximum(a + b * sigma * np.sqrt(1.0 - rho * rho), 1e-10)
+    return np.stack([np.log(v), np.log(b), np.arctanh(rho), m, np.log(sigma)], axis=1)
+
+
+#analytic Jacobian of w(k) with respect to the free coordinates, shape (slices, n, 5)
+def _jacobian(free, k):
+    raw = _to_raw(free)
+    a, b, rho, m, sigma = (raw[:, i:i + 1] for i in range(5))
+    v = np.exp(free[:, :1])
+    x = k - m
+    r = np.sqrt(x * x + sigma * sigma)
+    s1 = np.sqrt(1.0 - rho * rho)
+    #raw partials
+    d_a = np.ones_like(x)
+    d_b = rho * x + r
+    d_rho = b * x
+    d_m = -b * (rho + x / r)
+    d_sigma = b * sigma / r
+    #chain rule through a = v - b sigma sqrt(1 - rho^2)
+    return np.stack([
+        d_a * v,
+        (d_b - sigma * s1 * d_a) * b,
+        (d_rho + b * sigma * rho / s1 * d_a) * (1.0 - rho * rho),
+        d_m,
+        (d_sigma - b * s1 * d_a) * sigma,
+    ], axis=-1)
+
+
+def _initial(k, w, weight):
+    has = weight > 0
+    w_min = np.where(has, w, np.inf).min(axis=1)
+    k_min = np.take_along_axis(k, np.argmin(np.where(has, w, np.inf), axis=1)[:, None], axis=1)[:, 0]
+    raw = np.stack([0.8 * w_min, np.full(len(k), 0.1), np.full(len(k), -0.3), k_min, np.full(len(k), 0.1)], axis=1)
+    return _to_free(raw)
+
+
+#Levenberg-Marquardt on many slices at once: k, w, weight are (slices, n), padded
+#with weight 0. Every iteration solves all the 5x5 damped normal equations in one
+#batched call. Returns raw params (slices, 5), iterations and weighted RMSE per slice
+def fit_slices(k, w, weight, init=None, max_iter: int = MAX_ITER, tol: float = 1e-10, step_tol: float = 1e-6):
+    k, w, weight = (np.atleast_2d(np.asarray(a, dtype=float)) for a in (k, w, weight))
+    sqrt_w = np.sqrt(weight)
+    free = _initial(k, w, weight) if init is None else _to_free(np.atleast_2d(np.asarray(init, dtype=float)))
+    lam = np.full(len(k), 1e-3)
+
+    def sse(theta):
+        e = sqrt_w * (total_variance(_to_raw(theta), k) - w)
+        return e, (e * e).sum(axis=1)
+
+    e, cost = sse(free)
+    iterations = np.zeros(len(k), dtype=int)
+    active = np.ones(len(k), dtype=bool)
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        J = _jacobian(free, k) * sqrt_w[..., None]
+        JtJ = np.einsum("snp,snq->spq", J, J)
+        grad = np.einsum("snp,sn->sp", J, e)
+        damped = JtJ + lam[:, None, None] * (np.eye(5) * np.maximum(np.diagonal(JtJ, axis1=1, axis2=2), 1e-12)[:, None, :])
+        step = -np.linalg.solve(damped, grad[..., None])[..., 0]
+        trial = np.where(active[:, None], free + step, free)
+        e_new, cost_new = sse(trial)
+        better = active & np.isfinite(cost_new) & (cost_new < cost)
+        improvement = np.where(better, (cost - cost_new) / np.maximum(cost, 1e-30), 0.0)
+
+        free = np.where(better[:, None], trial, free)
+        e = np.where(better[:, None], e_new, e)
+        cost = np.where(better, cost_new, cost)
+        lam = np.where(better, lam / 3.0, lam * 3.0)
+        iterations += active
+        small = np.abs(step).max(axis=1) < step_tol
+        active &= ~((better & ((improvement < tol) | small)) | (lam > 1e10))
+
+    return _to_raw(free), iterations, np.sqrt(cost / np.maximum(weight.sum(axis=1), 1e-30))
+
+
+#Gatheral's density condition g(k) >= 0 (no butterfly arbitrage) on a k grid
+def butterfly_g(params, k):
+    a, b, rho, m, sigma = (params[..., i:i + 1] for i in range(5))
+    x = k - m
+    r = np.sqrt(x * x + sigma * sigma)
+    w = a + b * (rho * x + r)
+    w1 = b * (rho + x / r)
+    w2 = b * sigma * sigma / r ** 3
+    return (1.0 - k * w1 / (2.0 * w)) ** 2 - w1 * w1 / 4.0 * (1.0 / w + 0.25) + w2 / 2.0
+
+
+def is_arbitrage_free(params) -> bool:
+    params = np.atleast_2d(params)
+    b, rho = params[:, 1], params[:, 2]
+    #Roger Lee's moment bound: total-variance wing slopes b(1 ± rho) at most 2; and a non-negative density
+    return bool((b * (1.0 + np.abs(rho)) <= 2.0).all() and (butterfly_g(params, np.linspace(-2.0, 2.0, 401)) >= -1e-9).all())
+
+
+_warm = OrderedDict()
+_warm_lock = threading.Lock()
+
+
+#forward from put-call parity at the strike where call and put mids are closest
+def implied_forward(strikes, call_mid, put_mid, S: float, r: float, T: float) -> float:
+    ok = np.isfinite(call_mid) & np.isfinite(put_mid)
+    if not ok.any():
+        return S * np.exp(r * T)
+    i = np.argmin(np.where(ok, np.abs(call_mid - put_mid), np.inf))
+    return float(strikes[i] + np.exp(r * T) * (call_mid[i] - put_mid[i]))
+
+
+#fit one expiry from out-of-the-money quotes (puts below the forward, calls above),
+#warm-started from the last fit of the same (symbol, expiry)
+@metrics.timed("chain.svi_fit")
+def fit_chain(symbol: str, expiry: str, strikes, call_iv, put_iv, call_mid, put_mid, S: float, T: float, r: float = 0.0):
+    strikes = np.asarray(strikes, dtype=float)
+    F = implied_forward(strikes, np.asarray(call_mid, dtype=float), np.asarray(put_mid, dtype=float), S, r, T)
+    iv = np.where(strikes < F, put_iv, call_iv).astype(float)
+    ok = np.isfinite(iv) & (iv > 0.01) & (iv < 5.0)
+    if ok.sum() < MIN_POINTS:
+        return None
+    k = np.log(strikes[ok] / F)
+    w = iv[ok] ** 2 * T
+
+    key = (symbol, expiry)
+    with _warm_lock:
+        init = _warm.get(key)
+    metrics.count(f"cache.svi_warm.{'miss' if init is None else 'hit'}")
+    params, iterations, _ = fit_slices(k[None, :], w[None, :], np.ones((1, len(k))), init=None if init is None else init[None, :])
+    with _warm_lock:
+        _warm[key] = params[0]
+        _warm.move_to_end(key)
+        while len(_warm) > MAX_ENTRIES:
+            _warm.popitem(last=False)
+
+    return {
+        "params": pd.Series(params[0], index=PARAMS),
+        "forward": F,
+        "T": T,
+        "iterations": int(iterations[0]),
+        "warm_start": init is not None,
+        "rmse_vol": float(np.sqrt(np.mean((implied_vol(params, k[None, :], T)[0] - iv[ok]) ** 2))),
+        "arbitrage_free": is_arbitrage_free(params),
+    }
+
+
+#fitted smile vol at each strike
+def smile_vol(fit: dict, strikes) -> np.ndarray:
+    k = np.log(np.asarray(strikes, dtype=float) / fit["forward"])
+    return implied_vol(fit["params"].to_numpy()[None, :], k[None, :], fit["T"])[0]
@@ -0,0 +1,238 @@
+import random
+import threading
+import time
+
+from yfinance.exceptions import YFRateLimitError
+
+import metrics
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+def _status(e: BaseException):
+    status = getattr(e, "status_code", None)
+    if status is None:
+        status = getattr(getattr(e, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+#errors worth retrying and counting against the upstream: HTTP 429/5xx, rate limits
+#and transport failures (timeouts, connection errors; the HTTP clients raise OSErrors).
+#Anything else (a 404, a bad symbol, a KeyError while parsing) fails the same way
+#every time and says nothing about the upstream's health
+def transient(e: BaseException) -> bool:
+    status = _status(e)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(e, (OSError, YFRateLimitError))
+
+
+#single-flight: concurrent callers with the same key share one in-flight call
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            metrics.count("upstream.shared_calls")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+#token bucket: `rate` tokens per second, at most `capacity` saved up for bursts
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        if rate <= 0 or capacity < 1:
+            raise ValueError("rate must be > 0 and capacity >= 1")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def acquire(self, timeout: float | None = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return True
+                wait = (1.0 - self._tokens) / self.rate
+            if deadline is not None:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return False
+                wait = min(wait, left)
+            time.sleep(wait)
+
+
+#circuit breaker: closed -> open after `failure_threshold` consecutive failures,
+#half-open after `reset_timeout` seconds (one trial call), closed again on success
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = "half-open"
+                self._trial_running = False
+            if self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+            self._trial_running = False
+
+    #the allowed call never reached the upstream (e.g. the rate limiter timed out):
+    #free the half-open trial slot without judging the upstream
+    def release(self):
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self.state == "half-open" or self._failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class Provider:
+    def __init__(
+        self,
+        name: str,
+        rate: float, #requests per second
+        burst: int, #bucket capacity
+        retries: int = 3,
+        backoff: float = 0.5, #base delay in seconds, doubled every attempt
+        max_backoff: float = 8.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        acquire_timeout: float = 30.0,
+    ):
+        self.name = name
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.acquire_timeout = acquire_timeout
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.flight = SingleFlight()
+        self.upstream_calls = 0
+        self._calls_lock = threading.Lock()
+
+    def _attempt(self, fn, args, kwargs):
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.name}: circuit open, upstream temporarily disabled")
+        #every exit from here on must settle the breaker, or a half-open trial stays taken for good
+        outcome = None
+        try:
+            if not self.bucket.acquire(self.acquire_timeout):
+                raise TimeoutError(f"{self.name}: rate limiter timed out")
+            with self._calls_lock:
+                self.upstream_calls += 1
+            outcome = "failure"
+            result = fn(*args, **kwargs)
+            outcome = "success"
+            return result
+        except Exception as e:
+            if outcome == "failure" and not transient(e):
+                outcome = None
+            raise
+        finally:
+            if outcome == "success":
+                self.breaker.record_success()
+            elif outcome == "failure":
+                self.breaker.record_failure()
+            else:
+                self.breaker.release()
+
+    def _run(self, fn, args, kwargs):
+        attempt = 0
+        while True:
+            try:
+                return self._attempt(fn, args, kwargs)
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                metrics.count(f"upstream.{self.name}.errors")
+                if attempt >= self.retries or not transient(e):
+                    raise
+                delay = min(self.max_backoff, self.backoff * (2 ** attempt))
+                time.sleep(delay * (0.5 + random.random() / 2))
+                attempt += 1
+
+    #latency per endpoint as callers see it: rate limiting, retries and shared calls included
+    def call(self, key, fn, *args, **kwargs):
+        with metrics.span(f"upstream.{self.name}.{key[1] if len(key) > 1 else 'call'}"):
+            return self.flight.do(key, lambda: self._run(fn, args, kwargs))
+
+
+#finnhub free tier allows 60 calls/minute; yfinance has no published limit,
+#so stay well below the point where Yahoo starts answering 429
+PROVIDERS = {
+    "yfinance": Provider("yfinance", rate=4.0, burst=8),
+    "finnhub": Provider("finnhub", rate=1.0, burst=10),
+}
+
+
+def fetch(provider: str, key, fn, *args, **kwargs):
+    if not isinstance(key, tuple):
+        key = (key,)
+    return PROVIDERS[provider].call((provider,) + key, fn, *args, **kwargs)
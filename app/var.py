@@ -0,0 +1,94 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from portfolio import Book
+from scenarios import revalue_scenarios
+
+SCENARIO_CHUNK = 2_000 #scenarios revalued per job
+PARALLEL_MIN = 20_000 #below this many scenarios a process pool costs more than it saves
+TRADING_DAYS = 252
+
+
+def _revalue_chunk(job: dict) -> np.ndarray:
+    return revalue_scenarios(job["book"], job["moves"], 0.0, job["days"])
+
+
+#(underlyings, scenarios) P&L, scenario chunks revalued in parallel when large
+def _revalue(book: Book, moves: np.ndarray, days: float, workers: int | None) -> np.ndarray:
+    jobs = [
+        {"book": book, "moves": moves[:, start:start + SCENARIO_CHUNK], "days": days}
+        for start in range(0, moves.shape[1], SCENARIO_CHUNK)
+    ]
+    workers = workers if workers is not None else (os.cpu_count() or 1)
+    if workers > 1 and len(jobs) > 1 and moves.shape[1] >= PARALLEL_MIN:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            results = list(pool.map(_revalue_chunk, jobs))
+    else:
+        results = [_revalue_chunk(job) for job in jobs]
+    return np.concatenate(results, axis=1)
+
+
+#VaR and ES as positive losses, plus each underlying's share of the tail
+def _risk(pnl: np.ndarray, underlyings: list, confidence: float) -> dict:
+    total = pnl.sum(axis=0)
+    var = -np.quantile(total, 1.0 - confidence)
+    tail = total <= -var
+    return {
+        "var": float(var),
+        "es": float(-total[tail].mean()),
+        "pnl": total,
+        #component ES: average P&L of each underlying in the tail scenarios
+        "contributions": pd.Series(-pnl[:, tail].mean(axis=1), index=underlyings, name="ES contribution"),
+    }
+
+
+def _moves(book: Book, log_returns: np.ndarray, symbols: list) -> np.ndarray:
+    moves = np.zeros((len(book.underlyings), log_returns.shape[0]))
+    for j, symbol in enumerate(symbols):
+        moves[book.underlyings.index(symbol)] = np.expm1(log_returns[:, j])
+    return moves
+
+
+#historical simulation: every overlapping `horizon`-day window of joint returns
+#is applied to today's book and the book fully revalued `horizon` days later
+@metrics.timed("risk.historical_var")
+def historical_var(book: Book, returns: pd.DataFrame, horizon: int = 1, confidence: float = 0.99, workers: int | None = None) -> dict:
+    start = time.perf_counter()
+    daily = returns.to_numpy(dtype=float)
+    if len(daily) <= horizon:
+        raise ValueError("not enough return history for this horizon.")
+    windows = np.cumsum(np.vstack([np.zeros((1, daily.shape[1])), daily]), axis=0)
+    summed = windows[horizon:] - windows[:-horizon]
+    pnl = _revalue(book, _moves(book, summed, list(returns.columns)), horizon * 365 / TRADING_DAYS, workers)
+    out = _risk(pnl, book.underlyings, confidence)
+    out.update(method="Historical", scenarios=pnl.shape[1], seconds=time.perf_counter() - start)
+    return out
+
+
+#Monte Carlo: horizon log returns drawn from a multivariate normal with the
+#sample covariance of daily returns (correlated through its Cholesky factor)
+@metrics.timed("risk.monte_carlo_var")
+def monte_carlo_var(
+    book: Book,
+    returns: pd.DataFrame,
+    horizon: int = 1,
+    confidence: float = 0.99,
+    n_scenarios: int = 10_000,
+    seed: int = 0,
+    workers: int | None = None,
+) -> dict:
+    start = time.perf_counter()
+    daily = returns.to_numpy(dtype=float)
+    cov = np.cov(daily, rowvar=False).reshape(daily.shape[1], daily.shape[1]) * horizon
+    chol = np.linalg.cholesky(cov + 1e-14 * np.eye(len(cov)))
+    z = np.random.default_rng(seed).standard_normal((n_scenarios, len(cov)))
+    shocks = daily.mean(axis=0) * horizon + z @ chol.T
+    pnl = _revalue(book, _moves(book, shocks, list(returns.columns)), horizon * 365 / TRADING_DAYS, workers)
+    out = _risk(pnl, book.underlyings, confidence)
+    out.update(method="Monte Carlo", scenarios=pnl.shape[1], seconds=time.perf_counter() - start)
+    return out
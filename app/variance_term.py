@@ -0,0 +1,151 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import market_data
+import metrics
+
+TARGETS = (30, 60, 90) #constant-maturity points, calendar days
+MIN_DTE = 7 #like the VIX, expiries closer than a week are left out
+MAX_WORKERS = 8 #chain downloads in flight; upstream's rate limiter still applies
+
+
+def _years_to(expiry: str, now: pd.Timestamp) -> float:
+    #options stop trading at the 16:00 close of their expiry date
+    return max((pd.Timestamp(expiry) + pd.Timedelta(hours=16) - now).total_seconds(), 60.0) / (365 * 86400)
+
+
+#strikes kept on one side, walking away from K0: quotes with a zero bid are
+#skipped and the walk stops at the first two zero bids in a row (CBOE rule)
+def _otm(zero: np.ndarray) -> np.ndarray:
+    pair = zero[:-1] & zero[1:]
+    stop = int(np.argmax(pair)) if pair.any() else len(zero)
+    keep = ~zero
+    keep[stop:] = False
+    return keep
+
+
+#CBOE VIX-methodology variance of one expiry:
+#sigma^2 = 2/T sum(dK/K^2 e^{rT} Q(K)) - 1/T (F/K0 - 1)^2
+def expiry_variance(snap, T: float, r: float = 0.0) -> dict | None:
+    K = snap.strikes
+    c_bid, p_bid = snap.cols["C_bid"].astype(float), snap.cols["P_bid"].astype(float)
+    c_mid, p_mid = snap.mid("C"), snap.mid("P")
+    growth = np.exp(r * T)
+
+    #forward from the strike where call and put mids are closest
+    both = np.isfinite(c_mid) & np.isfinite(p_mid) & (c_bid > 0) & (p_bid > 0)
+    if not both.any():
+        return None
+    i = np.argmin(np.where(both, np.abs(c_mid - p_mid), np.inf))
+    F = K[i] + growth * (c_mid[i] - p_mid[i])
+    below = np.flatnonzero(K <= F)
+    if len(below) == 0:
+        return None
+    k0 = below[-1]
+
+    #puts below K0 (walking down), calls above it (walking up), the average at K0
+    put_zero = ~(p_bid[:k0][::-1] > 0)
+    call_zero = ~(c_bid[k0 + 1:] > 0)
+    puts = np.arange(k0)[::-1][_otm(put_zero)]
+    calls = np.arange(k0 + 1, len(K))[_otm(call_zero)]
+    rows = np.concatenate([puts[::-1], [k0], calls])
+    Q = np.concatenate([p_mid[puts[::-1]], [(c_mid[k0] + p_mid[k0]) / 2], c_mid[calls]])
+    if len(rows) < 3 or not np.isfinite(Q).all():
+        return None
+
+    strikes = K[rows]
+    dK = np.empty(len(strikes))
+    dK[1:-1] = (strikes[2:] - strikes[:-2]) / 2
+    dK[0] = strikes[1] - strikes[0]
+    dK[-1] = strikes[-1] - strikes[-2]
+    variance = 2.0 / T * np.sum(dK / strikes ** 2 * growth * Q) - (F / K[k0] - 1.0) ** 2 / T
+    return {"T": T, "forward": F, "K0": K[k0], "strikes": len(rows), "variance": variance}
+
+
+#variance per expiry and the constant-maturity vols (in vol points, like the VIX),
+#interpolated linearly in total variance between the expiries around each target
+@metrics.timed("chain.variance_term")
+def term_structure(chains: dict, r: float = 0.0, now=None, targets=TARGETS) -> dict:
+    now = pd.Timestamp(now or pd.Timestamp.now())
+    rows = []
+    for expiry in sorted(chains, key=pd.Timestamp):
+        if (pd.Timestamp(expiry) - now.normalize()).days < MIN_DTE:
+            continue
+        res = expiry_variance(chains[expiry], _years_to(expiry, now), r)
+        if res is not None and res["variance"] > 0:
+            rows.append({"expiry": expiry, "dte": (pd.Timestamp(expiry) - now.normalize()).days} | res)
+    expiries = pd.DataFrame(rows, columns=["expiry", "dte", "T", "forward", "K0", "strikes", "variance"])
+    expiries["vol"] = 100 * np.sqrt(expiries["variance"])
+
+    T = expiries["T"].to_numpy()
+    total = (expiries["variance"] * expiries["T"]).to_numpy()
+    points = {}
+    for days in targets:
+        target = days / 365.0
+        j = np.searchsorted(T, target)
+        if len(T) == 0 or j == len(T) or (j == 0 and T[0] != target):
+            points[days] = np.nan
+            continue
+        if T[j] == target or j == 0:
+            w = total[j]
+        else:
+            w = total[j - 1] + (total[j] - total[j - 1]) * (target - T[j - 1]) / (T[j] - T[j - 1])
+        points[days] = 100 * np.sqrt(max(w, 0.0) / target)
+    return {"expiries": expiries, "points": pd.Series(points, name="vol")}
+
+
+#expiries needed for the targets: everything up to the first one past the last target
+def _needed(expirations, now: pd.Timestamp, targets) -> list:
+    out = []
+    for expiry in expirations or ():
+        dte = (pd.Timestamp(expiry) - now.normalize()).days
+        if dte < MIN_DTE:
+            continue
+        out.append(expiry)
+        if dte > max(targets):
+            break
+    return out
+
+
+#term structure of one symbol, its chains fetched concurrently
+def for_symbol(symbol: str, r: float = 0.0, now=None, targets=TARGETS, max_workers: int = MAX_WORKERS) -> dict:
+    now = pd.Timestamp(now or pd.Timestamp.now())
+    needed = _needed(market_data.expirations(symbol), now, targets)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        snaps = list(pool.map(lambda e: _safe(market_data.chain_snapshot, symbol, e), needed))
+    return term_structure({e: snap for e, snap in zip(needed, snaps) if snap is not None}, r, now, targets)
+
+
+#30/60/90-day model-free vol of every symbol in one scan: expirations and then all
+#the chains are fetched concurrently, then each symbol is reduced to its term structure
+@metrics.timed("chain.variance_universe")
+def universe(symbols, r: float = 0.0, now=None, targets=TARGETS, max_workers: int = MAX_WORKERS) -> pd.DataFrame:
+    now = pd.Timestamp(now or pd.Timestamp.now())
+    symbols = list(symbols)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        listed = dict(zip(symbols, pool.map(lambda s: _safe(market_data.expirations, s), symbols)))
+        jobs = [(s, e) for s in symbols for e in _needed(listed[s], now, targets)]
+        snaps = list(pool.map(lambda job: _safe(market_data.chain_snapshot, *job), jobs))
+
+    chains = {s: {} for s in symbols}
+    for (s, e), snap in zip(jobs, snaps):
+        if snap is not None:
+            chains[s][e] = snap
+    rows = {}
+    for s in symbols:
+        term = term_structure(chains[s], r, now, targets)
+        rows[s] = {f"{d}d": term["points"][d] for d in targets} | {"expiries": len(term["expiries"])}
+    out = pd.DataFrame.from_dict(rows, orient="index")
+    out.index.name = "symbol"
+    out[f"{targets[-1]}d-{targets[0]}d"] = out[f"{targets[-1]}d"] - out[f"{targets[0]}d"]
+    return out
+
+
+def _safe(fn, *args):
+    #one symbol the provider cannot serve must not fail the whole scan
+    try:
+        return fn(*args)
+    except Exception:
+        return None